@@ -1,2 +1,41 @@
+from time import perf_counter
+
+import_started = perf_counter()
+phase_started = import_started
+phase_seconds: dict[str, float] = {}
+
+
+def _imported(phase: str) -> None:
+    # each phase only counts the modules earlier phases have not already pulled in
+    global phase_started
+    now = perf_counter()
+    phase_seconds[phase] = now - phase_started
+    phase_started = now
+
+
+import fastapi  # noqa: F401, E402
+import pydantic  # noqa: F401, E402
+
+_imported("import_fastapi")
+
+import sqlalchemy  # noqa: F401, E402
+import sqlmodel  # noqa: F401, E402
+from src.backend import models  # noqa: F401, E402
+
+_imported("import_models")
+
+from src.backend import auth  # noqa: F401, E402
+
+_imported("import_auth")
+
+from src.backend import routers  # noqa: F401, E402
+
+_imported("import_routers")
+
 # from local files
-from .api import create_api  # noqa: F401
+from .api import create_api  # noqa: F401, E402
+from .startup import import_phases  # noqa: E402
+
+_imported("import_api")
+import_phases.update({phase: round(seconds, 4) for phase, seconds in phase_seconds.items()})
+import_phases["import"] = round(perf_counter() - import_started, 4)
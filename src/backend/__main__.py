@@ -1,16 +1,42 @@
+import os
 import sys
+from tempfile import TemporaryDirectory
+from typing import Any
 
 import uvicorn
 
-from src.backend import create_api
+from src.backend.helpers import Config, get_config
 
-SERVER_PORT = 5000
-SERVER = "0.0.0.0"
-LOG_LEVEL = "debug"
+APP_FACTORY = "src.backend:create_api"
+
+
+def server_options(config: Config) -> dict[str, Any]:
+    return {
+        "host": config.server_host,
+        "port": config.server_port,
+        "workers": config.server_workers,
+        "loop": config.server_loop,
+        "http": config.server_http,
+        "timeout_keep_alive": config.server_keep_alive,
+        "backlog": config.server_backlog,
+        "limit_concurrency": config.server_limit_concurrency,
+        "timeout_graceful_shutdown": config.server_graceful_shutdown,
+        "access_log": config.server_access_log,
+        "log_level": config.log_level,
+    }
 
 
 def main() -> None:
-    uvicorn.run(create_api(), host=SERVER, port=SERVER_PORT)
+    # the app is named by its factory so that each worker process builds its own, with its own engine and caches,
+    # while the parent binds the socket they all accept on and passes shutdown signals on to them
+    config = get_config()
+    if config.server_workers == 1 or config.response_cache_shared_dir is not None:
+        uvicorn.run(APP_FACTORY, factory=True, **server_options(config))
+        return
+    # the workers read their config from the environment they inherit, so they all find the same directory
+    with TemporaryDirectory(prefix="beekind-cache-") as shared_dir:
+        os.environ["RESPONSE_CACHE_SHARED_DIR"] = shared_dir
+        uvicorn.run(APP_FACTORY, factory=True, **server_options(config))
 
 
 if __name__ == "__main__":
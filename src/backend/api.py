@@ -1,30 +1,56 @@
-from contextlib import asynccontextmanager
-from io import StringIO
+import asyncio
+from contextlib import asynccontextmanager, suppress
+from time import perf_counter
 from typing import AsyncIterator, Annotated
 from uuid import UUID
 
 from fastapi import FastAPI, Response, Request, status, Depends
-from fastapi.responses import JSONResponse
-from keycloak import KeycloakOpenID
-from sqlalchemy import delete
-from sqlmodel import Session
-from yaml import dump as yaml_dump
+from fastapi.responses import JSONResponse, PlainTextResponse
+from sqlalchemy import delete, update
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from src.backend.auth import AuthHelper
-from src.backend.helpers import get_logger
-from src.backend.models import get_session, Users, Organisations, Contacts, UserToOrgLink, Apiary, Token, Credentials
-from src.backend.routers import ResourceRouter
+from src.backend.cache import SpecDocument, render_spec, spec_encodings, spec_response
+from src.backend.compression import CompressionMiddleware
+from src.backend.helpers import get_config, get_logger
+from src.backend.helpers.serialise import FastJSONResponse
+from src.backend.metrics import METRICS_MEDIA_TYPE, MetricsMiddleware, get_metrics
+from src.backend.profiling import ProfilingMiddleware, get_profiler
+from src.backend.models import (
+    get_async_session,
+    dispose_db_engines,
+    Users,
+    Organisations,
+    Contacts,
+    UserToOrgLink,
+    Apiary,
+    SyncState,
+    SyncTombstone,
+    session_version,
+)
+from src.backend.routers import ResourceRouter, AdminRouter, TokenRouter, HealthRouter
+from src.backend.search import SearchBackend, get_search_backend
+from src.backend.startup import Readiness, prune_sync_tombstones, warm_up
 
 
 @asynccontextmanager
 async def app_lifespan_startup_and_shutdown(app: FastAPI) -> AsyncIterator[None]:
-    # before app is created
+    # before app is created, warming up in the background so /healthz answers while /readyz waits for it
+    warming = asyncio.create_task(warm_up(app, app.state.readiness))
+    pruning = asyncio.create_task(prune_sync_tombstones(app))
     # yield to the app
     yield
     # after the app shuts down
+    for task in (warming, pruning):
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    await AuthHelper.close_token_issuer()
+    await dispose_db_engines()
 
 
 def create_api() -> FastAPI:
+    started = perf_counter()
     app_logger = get_logger()
     with open("version.txt") as f:
         version = f.readline().strip()
@@ -34,6 +60,7 @@ def create_api() -> FastAPI:
         {"name": "Users", "description": "CRUD operations for the base user entities", "parent": "Resources"},
         {"name": "Organisations", "description": "CRUD operations for the base org entities", "parent": "Resources"},
         {"name": "Apiaries", "description": "CRUD operations for the base apiary entities", "parent": "Resources"},
+        {"name": "Search", "description": "Full text search over contacts and apiaries", "parent": "Resources"},
         {"name": "Admin", "description": "Administrative tools for the API"},
     ]
     app_logger.info(f"Creating the app... version: {version}")
@@ -44,9 +71,30 @@ def create_api() -> FastAPI:
         openapi_tags=tags_metadata,
         external_docs={"description": "Yaml API Spec", "url": "/openapi.yaml"},
         lifespan=app_lifespan_startup_and_shutdown,
+        default_response_class=FastJSONResponse,
     )
 
     app.include_router(ResourceRouter)
+    app.include_router(AdminRouter)
+    app.include_router(TokenRouter)
+    app.include_router(HealthRouter)
+
+    # the default openapi.json route is replaced by one serving the pre-rendered documents
+    app.router.routes = [route for route in app.router.routes if getattr(route, "path", None) != app.openapi_url]
+
+    def spec_documents() -> dict[str, SpecDocument]:
+        if getattr(app.state, "spec_documents", None) is None:
+            app.state.spec_documents = render_spec(app, spec_encodings(get_config()))
+        return app.state.spec_documents
+
+    @app.get(
+        "/openapi.json",
+        status_code=200,
+        response_class=Response,
+        include_in_schema=False,
+    )
+    async def json_spec(request: Request) -> Response:
+        return spec_response(request, spec_documents()["json"])
 
     @app.get(
         "/openapi.yaml",
@@ -54,20 +102,23 @@ def create_api() -> FastAPI:
         response_class=Response,
         include_in_schema=False,
     )
-    async def yaml_spec() -> Response:
-        spec_str = StringIO()
-        yaml_dump(app.openapi(), spec_str, sort_keys=False)
-        return Response(spec_str.getvalue(), media_type="text/yaml")
+    async def yaml_spec(request: Request) -> Response:
+        return spec_response(request, spec_documents()["yaml"])
 
     @app.get("/populate", status_code=status.HTTP_201_CREATED, response_model=None, include_in_schema=False)
-    async def populate(session: Annotated[Session, Depends(get_session)]) -> None:
-        session.exec(delete(Users))
-        session.exec(delete(Organisations))
-        session.exec(delete(Contacts))
-        session.exec(delete(UserToOrgLink))
-        session.exec(delete(Apiary))
-        session.commit()
-        session.begin()
+    async def populate(
+        session: Annotated[AsyncSession, Depends(get_async_session)],
+        search: Annotated[SearchBackend, Depends(get_search_backend)],
+    ) -> None:
+        await session.execute(delete(Apiary))
+        await session.execute(delete(UserToOrgLink))
+        await session.execute(delete(Users))
+        await session.execute(delete(Organisations))
+        await session.execute(delete(Contacts))
+        # everything is replaced without tombstones, so every sync token from before now starts again
+        await session.execute(delete(SyncTombstone))
+        await session.execute(update(SyncState).values(oldest_version=await session_version(session)))
+        await session.commit()
         user = Users(
             user_id=UUID("12345678-1234-1234-1234-123456789012"),
             username="Christopher Robin",
@@ -98,31 +149,30 @@ def create_api() -> FastAPI:
         apiary.contact = contact
         apiary.organisation = org
         session.add(apiary)
-        session.commit()
+        await session.commit()
+        async with session.begin():
+            await search.rebuild(session)
         return None
 
-    @app.post(
-        "/gettoken",
-        status_code=status.HTTP_200_OK,
-        response_model=Token,
-        tags=["Admin"],
-        summary="Get a JWT token",
-        description="an end point for getting a JWT token",
-    )
-    async def gettoken(
-        credentials: Credentials,
-        kc_client: Annotated[KeycloakOpenID, Depends(AuthHelper.get_keycloak_client)],
-    ) -> Token:
-        token = kc_client.token(username=credentials.username, password=credentials.password)
-        return Token(
-            token_type=token["token_type"],
-            access_token=token["access_token"],
-            expires_in=token["expires_in"],
-            refresh_expires_in=token["refresh_expires_in"],
-            refresh_token=token["refresh_token"],
+    if get_config().compression_encodings:
+        # added first so it sits innermost and the metrics and profiles include the time spent compressing
+        app.add_middleware(
+            CompressionMiddleware,
+            encodings=get_config().compression_encodings,
+            minimum_size=get_config().compression_minimum_size,
         )
+    app.add_middleware(ProfilingMiddleware, profiler=get_profiler(get_config()))
+    if get_config().metrics_enabled:
+        metrics = get_metrics()
+        app.add_middleware(MetricsMiddleware, metrics=metrics)
+
+        @app.get("/metrics", status_code=status.HTTP_200_OK, response_class=PlainTextResponse, include_in_schema=False)
+        async def metrics_text() -> PlainTextResponse:
+            return PlainTextResponse(metrics.registry.render(), media_type=METRICS_MEDIA_TYPE)
 
     app.add_exception_handler(status.HTTP_500_INTERNAL_SERVER_ERROR, internal_exception_handler)
+    app.state.readiness = Readiness()
+    app.state.readiness.record("create_api", perf_counter() - started)
     app_logger.info("App created")
     return app
 
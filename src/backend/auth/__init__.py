@@ -1 +1,6 @@
 from .auth_helper import AuthHelper  # noqa: F401
+from .jwks import JWKSVerifier, JWKSError  # noqa: F401
+from .org_scope import OrgScope  # noqa: F401
+from .single_flight import SingleFlight  # noqa: F401
+from .token_cache import TokenCache  # noqa: F401
+from .token_issuer import TokenIssuer, TokenIssuerError  # noqa: F401
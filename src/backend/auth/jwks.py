@@ -0,0 +1,152 @@
+import json
+from threading import Lock, Thread
+from time import monotonic
+from typing import Callable
+
+import httpx
+import jwt
+from jwt import PyJWK, PyJWKSet
+
+from src.backend.helpers import Config, get_logger
+
+
+class JWKSError(Exception):
+    pass
+
+
+class JWKSVerifier:
+    def __init__(
+        self,
+        jwks_url: str | None = None,
+        jwks_file: str | None = None,
+        algorithms: list[str] | None = None,
+        issuer: str | None = None,
+        audience: str | None = None,
+        leeway: int = 0,
+        ttl: int = 300,
+        min_refresh_interval: int = 10,
+        verify_tls: bool = True,
+    ) -> None:
+        if jwks_url is None and jwks_file is None:
+            raise ValueError("Either a JWKS url or a JWKS file is required")
+        self.jwks_url = jwks_url
+        self.jwks_file = jwks_file
+        self.algorithms = algorithms or ["RS256"]
+        self.issuer = issuer
+        self.audience = audience
+        self.leeway = leeway
+        self.ttl = ttl
+        self.min_refresh_interval = min_refresh_interval
+        self.verify_tls = verify_tls
+        self._keys: dict[str | None, PyJWK] = {}
+        self._fetched_at: float | None = None
+        self._last_attempt: float | None = None
+        self._refresh_lock = Lock()
+        self._background_refresh: Thread | None = None
+
+    @classmethod
+    def from_config(cls, config: Config) -> "JWKSVerifier":
+        jwks_url = config.jwks_url or f"{config.base_auth_url}realms/{config.realm}/{config.certs_endpoint}"
+        return cls(
+            jwks_url=jwks_url,
+            jwks_file=config.jwks_file,
+            algorithms=config.jwt_algorithms,
+            issuer=config.jwt_issuer,
+            audience=config.jwt_audience,
+            leeway=config.jwt_leeway,
+            ttl=config.jwks_ttl,
+            min_refresh_interval=config.jwks_min_refresh_interval,
+            verify_tls=config.auth_verify_tls,
+        )
+
+    @property
+    def key_ids(self) -> list[str | None]:
+        return list(self._keys)
+
+    def decode(self, token: str) -> dict:
+        header = jwt.get_unverified_header(token)
+        signing_key = self.get_signing_key(header.get("kid"))
+        if signing_key.algorithm_name not in self.algorithms:
+            raise JWKSError(f"Signing key algorithm {signing_key.algorithm_name} is not allowed")
+        return jwt.decode(
+            token,
+            key=signing_key,
+            algorithms=self.algorithms,
+            audience=self.audience,
+            issuer=self.issuer,
+            leeway=self.leeway,
+            options={"require": ["exp"], "verify_aud": self.audience is not None},
+        )
+
+    def get_signing_key(self, kid: str | None) -> PyJWK:
+        if self._fetched_at is None:
+            # until the first load succeeds it is retried at most once per minimum refresh interval, and requests in
+            # between fail at once rather than each waiting on an identity server that is down
+            if self._may_refetch():
+                self._refresh_unless(lambda: self._fetched_at is not None or not self._may_refetch())
+            if self._fetched_at is None:
+                raise JWKSError("Signing keys are not loaded yet")
+        elif monotonic() - self._fetched_at > self.ttl:
+            self._refresh_in_background()
+        keys = self._keys
+        if kid is None and len(keys) == 1:
+            return next(iter(keys.values()))
+        if kid not in keys:
+            # an unknown kid usually means the realm has rotated its keys, but refetching is rate limited so that
+            # tokens with made up kids cannot be used to hammer the identity server
+            if self._may_refetch():
+                self._refresh_unless(lambda: kid in self._keys or not self._may_refetch())
+                keys = self._keys
+        if kid not in keys:
+            raise JWKSError(f"Unknown signing key: {kid}")
+        return keys[kid]
+
+    def refresh_keys(self) -> None:
+        with self._refresh_lock:
+            self._fetch_keys()
+
+    def _may_refetch(self) -> bool:
+        return self._last_attempt is None or monotonic() - self._last_attempt >= self.min_refresh_interval
+
+    def _refresh_unless(self, done: Callable[[], bool]) -> None:
+        with self._refresh_lock:
+            # requests that queued on the lock behind a fetch find its keys here instead of fetching one after another
+            if not done():
+                self._fetch_keys()
+
+    def _fetch_keys(self) -> None:
+        self._last_attempt = monotonic()
+        jwks = self._load_jwks()
+        signing_keys = [key for key in jwks.get("keys", []) if key.get("use", "sig") == "sig"]
+        try:
+            key_set = PyJWKSet.from_dict({"keys": signing_keys})
+        except jwt.PyJWKSetError as e:
+            raise JWKSError(str(e))
+        self._keys = {key.key_id: key for key in key_set.keys}
+        self._fetched_at = monotonic()
+        get_logger().info(f"Loaded {len(self._keys)} signing keys from {self.jwks_file or self.jwks_url}")
+
+    def _load_jwks(self) -> dict:
+        try:
+            if self.jwks_file is not None:
+                with open(self.jwks_file) as f:
+                    return json.load(f)
+            response = httpx.get(self.jwks_url, verify=self.verify_tls, timeout=10)
+            response.raise_for_status()
+            return response.json()
+        except (OSError, ValueError, httpx.HTTPError) as e:
+            raise JWKSError(f"Unable to load JWKS: {e}")
+
+    def _refresh_in_background(self) -> None:
+        if self._refresh_lock.locked() or (self._background_refresh is not None and self._background_refresh.is_alive()):
+            return
+        self._background_refresh = Thread(target=self._background_refresh_keys, name="jwks-refresh", daemon=True)
+        self._background_refresh.start()
+
+    def _background_refresh_keys(self) -> None:
+        try:
+            self.refresh_keys()
+        except JWKSError as e:
+            # keep verifying with the keys we already have and try again after the minimum refresh interval
+            self._fetched_at = monotonic() - self.ttl + self.min_refresh_interval
+            get_logger().warning(f"Background JWKS refresh failed: {e}")
@@ -0,0 +1,96 @@
+from uuid import UUID
+
+from sqlalchemy import ColumnElement, and_, or_
+from sqlmodel import SQLModel, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlmodel.sql.expression import SelectOfScalar
+
+from src.backend.helpers import Config
+from src.backend.models import Apiary, Contacts, Organisations, Users, UserToOrgLink
+
+
+def _uuid(value: object) -> UUID | None:
+    try:
+        return UUID(str(value))
+    except ValueError:
+        return None
+
+
+class OrgScope:
+    def __init__(self, org_ids: frozenset[UUID] | None) -> None:
+        # None means the caller may read every org, e.g. an admin
+        self.org_ids = org_ids
+
+    @property
+    def key(self) -> str:
+        if self.org_ids is None:
+            return "all"
+        return "orgs:" + ",".join(sorted(str(org_id) for org_id in self.org_ids))
+
+    def condition(self, model: type[SQLModel]) -> ColumnElement[bool] | None:
+        # which rows of the model the caller may read, also applied to the relations loaded alongside a row
+        if self.org_ids is None:
+            return None
+        if model is Apiary:
+            return Apiary.org_id.in_(self.org_ids)
+        if model is Organisations:
+            return Organisations.org_id.in_(self.org_ids)
+        if model is Users:
+            return Users.user_id.in_(select(UserToOrgLink.user_id).where(UserToOrgLink.org_id.in_(self.org_ids)))
+        if model is UserToOrgLink:
+            return UserToOrgLink.org_id.in_(self.org_ids)
+        if model is Contacts:
+            # a contact is visible to the org that owns it and through the apiaries it looks after
+            return or_(
+                Contacts.org_id.in_(self.org_ids),
+                Contacts.contact_id.in_(select(Apiary.contact_id).where(Apiary.org_id.in_(self.org_ids))),
+            )
+        raise ValueError(f"No org scope for {model.__name__}")
+
+    def writable(self, model: type[SQLModel]) -> ColumnElement[bool] | None:
+        # which rows the caller may change or delete. A user in orgs outside the caller's is shared with another org, so
+        # only that org's callers or an admin may delete them, and only the org that owns a contact may change it
+        condition = self.condition(model)
+        if condition is None:
+            return None
+        if model is Users:
+            elsewhere = select(UserToOrgLink.user_id).where(UserToOrgLink.org_id.not_in(self.org_ids))
+            return and_(condition, Users.user_id.not_in(elsewhere))
+        if model is Contacts:
+            return Contacts.org_id.in_(self.org_ids)
+        return condition
+
+    def scoped(self, model: type[SQLModel], statement: SelectOfScalar) -> SelectOfScalar:
+        condition = self.condition(model)
+        return statement if condition is None else statement.where(condition)
+
+    def apiaries(self, statement: SelectOfScalar) -> SelectOfScalar:
+        return self.scoped(Apiary, statement)
+
+    def orgs(self, statement: SelectOfScalar) -> SelectOfScalar:
+        return self.scoped(Organisations, statement)
+
+    def users(self, statement: SelectOfScalar) -> SelectOfScalar:
+        return self.scoped(Users, statement)
+
+    def memberships(self, statement: SelectOfScalar) -> SelectOfScalar:
+        return self.scoped(UserToOrgLink, statement)
+
+    def contacts(self, statement: SelectOfScalar) -> SelectOfScalar:
+        return self.scoped(Contacts, statement)
+
+
+async def resolve_org_scope(config: Config, decoded_token: dict, db: AsyncSession) -> OrgScope:
+    if config.admin_role in decoded_token.get("realm_access", {}).get("roles", []):
+        return OrgScope(None)
+    claimed = decoded_token.get(config.org_claim)
+    if isinstance(claimed, list):
+        return OrgScope(frozenset(org_id for org_id in map(_uuid, claimed) if org_id is not None))
+    # tokens without the org claim fall back to the caller's memberships, read through the user_to_org_link index
+    user_id = _uuid(decoded_token.get("sub"))
+    if user_id is None:
+        return OrgScope(frozenset())
+    # read in a transaction of its own, so routes that write can still begin theirs on the same session
+    async with db.begin():
+        org_ids = await db.scalars(select(UserToOrgLink.org_id).where(UserToOrgLink.user_id == user_id))
+        return OrgScope(frozenset(org_ids.all()))
@@ -0,0 +1,106 @@
+import asyncio
+from hashlib import sha256
+
+import httpx
+from fastapi import status
+
+from src.backend.helpers import Config, get_logger
+from .single_flight import SingleFlight
+
+
+class TokenIssuerError(Exception):
+    def __init__(self, status_code: int, detail: str) -> None:
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+class TokenIssuer:
+    def __init__(
+        self,
+        token_url: str,
+        client_id: str,
+        client_secret: str | None = None,
+        verify_tls: bool = True,
+        timeout: float = 10.0,
+        max_connections: int = 20,
+        max_concurrency: int = 20,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ) -> None:
+        self.token_url = token_url
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.verify_tls = verify_tls
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.transport = transport
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._client: httpx.AsyncClient | None = None
+        self._refreshes = SingleFlight()
+
+    @classmethod
+    def from_config(cls, config: Config) -> "TokenIssuer":
+        token_url = config.token_url or f"{config.base_auth_url}realms/{config.realm}/{config.token_endpoint}"
+        return cls(
+            token_url=token_url,
+            client_id=config.backend_client_id,
+            client_secret=config.backend_client_secret,
+            verify_tls=config.auth_verify_tls,
+            timeout=config.token_timeout,
+            max_connections=config.token_max_connections,
+            max_concurrency=config.token_max_concurrency,
+        )
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # one client for the life of the app so logins reuse keep-alive connections to the identity provider
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                verify=self.verify_tls,
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections),
+                transport=self.transport,
+            )
+        return self._client
+
+    async def password_grant(self, username: str, password: str) -> dict:
+        return await self.request_token({"grant_type": "password", "username": username, "password": password})
+
+    async def refresh_grant(self, refresh_token: str) -> dict:
+        # a fleet reconnecting at once often presents the same refresh token many times, so only one request goes upstream
+        key = sha256(refresh_token.encode()).digest()
+        return await self._refreshes.do(
+            key, lambda: self.request_token({"grant_type": "refresh_token", "refresh_token": refresh_token})
+        )
+
+    async def request_token(self, grant: dict) -> dict:
+        form = {"client_id": self.client_id, "scope": "openid", **grant}
+        if self.client_secret is not None:
+            form["client_secret"] = self.client_secret
+        async with self._semaphore:
+            try:
+                response = await self.client.post(self.token_url, data=form)
+            except httpx.TimeoutException:
+                raise TokenIssuerError(status.HTTP_504_GATEWAY_TIMEOUT, "The identity provider timed out")
+            except httpx.HTTPError as e:
+                get_logger().warning(f"Token request to {self.token_url} failed: {type(e).__name__}, {e}")
+                raise TokenIssuerError(status.HTTP_502_BAD_GATEWAY, "The identity provider could not be reached")
+        if response.status_code in (status.HTTP_400_BAD_REQUEST, status.HTTP_401_UNAUTHORIZED):
+            raise TokenIssuerError(status.HTTP_401_UNAUTHORIZED, self._error_detail(response))
+        if response.status_code != status.HTTP_200_OK:
+            get_logger().warning(f"Token request to {self.token_url} returned {response.status_code}")
+            raise TokenIssuerError(status.HTTP_502_BAD_GATEWAY, "The identity provider returned an error")
+        return response.json()
+
+    @staticmethod
+    def _error_detail(response: httpx.Response) -> str:
+        try:
+            body = response.json()
+        except ValueError:
+            return "Invalid credentials"
+        return body.get("error_description") or body.get("error") or "Invalid credentials"
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
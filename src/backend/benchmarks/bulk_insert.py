@@ -0,0 +1,67 @@
+import asyncio
+import json
+import logging
+import sys
+from argparse import ArgumentParser
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+from src.backend.test.app import stub_app, stub_client
+
+# rows per second for the same apiary import sent one POST per row, as one JSON array and as one NDJSON stream
+
+
+def apiary_rows(rows: int, prefix: str) -> list[dict]:
+    return [
+        {"name": f"{prefix} {i}", "site_lat": 51.5, "site_lon": -0.1, "apiary_notes": "Imported by the bulk benchmark"}
+        for i in range(rows)
+    ]
+
+
+async def single_rows(client, rows: list[dict], concurrency: int) -> None:
+    queue = iter(rows)
+
+    async def worker() -> None:
+        for row in queue:
+            (await client.post("/resource/apiary/", json=row)).raise_for_status()
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+
+async def bulk_json(client, rows: list[dict]) -> None:
+    (await client.post("/resource/apiary/bulk", json=rows)).raise_for_status()
+
+
+async def bulk_ndjson(client, rows: list[dict]) -> None:
+    body = "\n".join(json.dumps(row) for row in rows)
+    response = await client.post("/resource/apiary/bulk", content=body, headers={"content-type": "application/x-ndjson"})
+    response.raise_for_status()
+
+
+async def main(rows: int, concurrency: int) -> dict:
+    results = {"rows": rows}
+    with TemporaryDirectory() as tmp:
+        app, engine = await stub_app(Path(tmp) / "bench.sqlite")
+        async with stub_client(app) as client:
+            for name, run in [
+                ("single_row_posts", lambda: single_rows(client, apiary_rows(rows, "single"), concurrency)),
+                ("bulk_json", lambda: bulk_json(client, apiary_rows(rows, "json"))),
+                ("bulk_ndjson", lambda: bulk_ndjson(client, apiary_rows(rows, "ndjson"))),
+            ]:
+                start = perf_counter()
+                await run()
+                elapsed = perf_counter() - start
+                results[name] = {"seconds": round(elapsed, 3), "rows_per_second": round(rows / elapsed, 1)}
+        await engine.dispose()
+    return results
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Single row vs bulk apiary import benchmark")
+    parser.add_argument("--rows", type=int, default=2000, help="number of apiaries imported by each method")
+    parser.add_argument("--concurrency", type=int, default=8, help="concurrent clients for the single row posts")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+    json.dump(asyncio.run(main(args.rows, args.concurrency)), sys.stdout, indent=2)
+    print()
@@ -0,0 +1,92 @@
+import asyncio
+import json
+import logging
+import sys
+from argparse import ArgumentParser
+from pathlib import Path
+from random import Random
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from uuid import uuid4
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from src.backend.benchmarks.harness import summarise
+from src.backend.cache import MemoryCacheBackend, get_response_cache
+from src.backend.compression import CODECS, compress
+from src.backend.helpers.serialise import MSGPACK_MEDIA_TYPE
+from src.backend.models import Apiary
+from src.backend.routers.pagination import NDJSON_MEDIA_TYPE
+from src.backend.test.app import stub_app, stub_client
+
+# bytes on the wire and time per request for one page of apiaries as json and msgpack and a full ndjson stream, sent
+# as they are and in each content encoding, plus the time each encoding takes to compress the json page
+
+
+async def seed(engine: AsyncEngine, rows: int) -> None:
+    rng = Random(42)
+    async with engine.begin() as conn:
+        await conn.execute(
+            insert(Apiary),
+            [
+                {
+                    "apiary_id": uuid4(),
+                    "name": f"Apiary {i}",
+                    "site_lat": rng.uniform(50.0, 55.0),
+                    "site_lon": rng.uniform(-5.0, 1.0),
+                    "apiary_notes": f"hives by the {rng.choice(['gate', 'hedge', 'river', 'barn'])} in field {i % 40}",
+                }
+                for i in range(rows)
+            ],
+        )
+
+
+async def run(client, url: str, accept: str, encoding: str, requests: int) -> dict:
+    latencies = []
+    size = 0
+    start = perf_counter()
+    for _ in range(requests):
+        begin = perf_counter()
+        async with client.stream("GET", url, headers={"accept": accept, "accept-encoding": encoding}) as response:
+            size = len(b"".join([chunk async for chunk in response.aiter_raw()]))
+        latencies.append(perf_counter() - begin)
+        response.raise_for_status()
+    return {"bytes": size, **summarise(latencies, perf_counter() - start)}
+
+
+async def main(rows: int, page: int, requests: int) -> dict:
+    results = {"rows": rows, "page": page, "requests": requests, "compress_ms": {}, "routes": {}}
+    bodies = {
+        "json page": (f"/resource/apiary/?limit={page}", "application/json"),
+        "msgpack page": (f"/resource/apiary/?limit={page}", MSGPACK_MEDIA_TYPE),
+        "ndjson stream": ("/resource/apiary/", NDJSON_MEDIA_TYPE),
+    }
+    with TemporaryDirectory() as tmp:
+        app, engine = await stub_app(Path(tmp) / "bench.sqlite")
+        app.dependency_overrides[get_response_cache] = lambda: MemoryCacheBackend(max_entries=0)
+        await seed(engine, rows)
+        async with stub_client(app) as client:
+            body = (await client.get(bodies["json page"][0], headers={"accept-encoding": "identity"})).content
+            for encoding in CODECS:
+                start = perf_counter()
+                for _ in range(requests):
+                    compress(encoding, body)
+                results["compress_ms"][encoding] = round((perf_counter() - start) / requests * 1000, 3)
+            for label, (url, accept) in bodies.items():
+                results["routes"][label] = {
+                    encoding: await run(client, url, accept, encoding, requests) for encoding in ("identity", *CODECS)
+                }
+        await engine.dispose()
+    return results
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Response size and latency for each content encoding and body format")
+    parser.add_argument("--rows", type=int, default=5000, help="number of apiaries to seed")
+    parser.add_argument("--page", type=int, default=1000, help="apiaries in each page")
+    parser.add_argument("--requests", type=int, default=50, help="requests per body format and encoding")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+    json.dump(asyncio.run(main(args.rows, args.page, args.requests)), sys.stdout, indent=2)
+    print()
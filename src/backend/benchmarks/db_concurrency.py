@@ -0,0 +1,101 @@
+import asyncio
+import json
+import sys
+from argparse import ArgumentParser
+from pathlib import Path
+from statistics import quantiles
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from uuid import uuid4
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import Session, SQLModel, create_engine, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.backend.models import Apiary
+
+# compares the old handler shape, a sync Session used directly inside an async def, with the AsyncSession path. Both
+# run the same list query from many concurrent tasks while a heartbeat task measures how late the event loop wakes up
+
+
+def seed(db_path: Path, rows: int) -> None:
+    engine = create_engine(f"sqlite+pysqlite:///{db_path}")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session, session.begin():
+        session.execute(
+            insert(Apiary),
+            [{"apiary_id": uuid4(), "name": f"Apiary {i}", "apiary_notes": "x" * 200} for i in range(rows)],
+        )
+    engine.dispose()
+
+
+async def heartbeat(stop: asyncio.Event, lags: list[float], interval: float = 0.001) -> None:
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        lags.append(loop.time() - expected)
+
+
+async def run(handler, concurrency: int, requests: int) -> dict:
+    latencies: list[float] = []
+    lags: list[float] = []
+    queue = iter(range(requests))
+
+    async def worker() -> None:
+        for _ in queue:
+            start = perf_counter()
+            await handler()
+            latencies.append(perf_counter() - start)
+
+    stop = asyncio.Event()
+    beat = asyncio.create_task(heartbeat(stop, lags))
+    start = perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = perf_counter() - start
+    stop.set()
+    await beat
+    cuts = quantiles(latencies, n=100)
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "throughput_rps": round(requests / elapsed, 1),
+        "latency_p50_ms": round(cuts[49] * 1000, 2),
+        "latency_p99_ms": round(cuts[98] * 1000, 2),
+        "loop_lag_max_ms": round(max(lags, default=0) * 1000, 2),
+    }
+
+
+async def main(rows: int, concurrency: list[int], requests: int) -> dict:
+    results = {"rows": rows, "sync_session": [], "async_session": []}
+    with TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "bench.sqlite"
+        seed(db_path, rows)
+        sync_engine = create_engine(f"sqlite+pysqlite:///{db_path}")
+        async_engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+
+        async def sync_handler() -> None:
+            with Session(sync_engine) as session:
+                session.scalars(select(Apiary)).all()
+
+        async def async_handler() -> None:
+            async with AsyncSession(async_engine) as session:
+                (await session.scalars(select(Apiary))).all()
+
+        for level in concurrency:
+            results["sync_session"].append(await run(sync_handler, level, requests))
+            results["async_session"].append(await run(async_handler, level, requests))
+        sync_engine.dispose()
+        await async_engine.dispose()
+    return results
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Event loop blocking benchmark for sync vs async db sessions")
+    parser.add_argument("--rows", type=int, default=2000, help="number of apiaries to seed")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32], help="concurrent request levels")
+    parser.add_argument("--requests", type=int, default=200, help="requests per concurrency level")
+    args = parser.parse_args()
+    json.dump(asyncio.run(main(args.rows, args.concurrency, args.requests)), sys.stdout, indent=2)
+    print()
@@ -0,0 +1,59 @@
+import asyncio
+import json
+import socket
+import subprocess
+import sys
+from pathlib import Path
+from statistics import quantiles
+from time import perf_counter
+
+import httpx
+import jwt
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jwt.algorithms import RSAAlgorithm
+
+from src.backend.test.app import stub_claims
+
+
+def summarise(latencies: list[float], elapsed: float) -> dict:
+    cuts = quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    return {
+        "requests": len(latencies),
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "latency_p50_ms": round(cuts[49] * 1000, 3),
+        "latency_p95_ms": round(cuts[94] * 1000, 3),
+        "latency_p99_ms": round(cuts[98] * 1000, 3),
+    }
+
+
+def signing_key(jwks_path: Path) -> str:
+    # for benchmarks that run the server through the launcher, which then verifies tokens against a local jwks file
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    jwk = RSAAlgorithm.to_jwk(key.public_key(), as_dict=True) | {"kid": "bench", "alg": "RS256", "use": "sig"}
+    jwks_path.write_text(json.dumps({"keys": [jwk]}))
+    return jwt.encode(stub_claims(), key, algorithm="RS256", headers={"kid": "bench"})
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(workers: int, port: int, env: dict[str, str]) -> subprocess.Popen:
+    env = env | {"SERVER_HOST": "127.0.0.1", "SERVER_PORT": str(port), "SERVER_WORKERS": str(workers)}
+    return subprocess.Popen([sys.executable, "-m", "src.backend"], env=env, stdout=subprocess.DEVNULL)
+
+
+async def wait_until_ready(client: httpx.AsyncClient, server: subprocess.Popen, timeout: float = 60) -> None:
+    deadline = perf_counter() + timeout
+    while perf_counter() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"Server exited with {server.returncode}")
+        try:
+            if (await client.get("/readyz")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.1)
+    raise RuntimeError("Server did not become ready")
@@ -0,0 +1,324 @@
+import asyncio
+import json
+import logging
+import sys
+from argparse import ArgumentParser
+from dataclasses import dataclass
+from itertools import count, islice, product
+from pathlib import Path
+from random import Random
+from statistics import median
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from typing import Any, Callable, Iterator
+from uuid import UUID, uuid4
+
+from fastapi import FastAPI
+from httpx import AsyncClient
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from src.backend.benchmarks.harness import summarise
+from src.backend.cache import MemoryCacheBackend, get_response_cache
+from src.backend.models import Apiary, Contacts, Organisations, Users, UserToOrgLink
+from src.backend.test.app import stub_app, stub_client
+
+# latency percentiles and throughput for every /resource route at several concurrency levels, against a seeded sqlite
+# db. With --baseline the run is compared to an earlier result file and exits non-zero if any route got slower by more
+# than --max-regression plus the spread seen between repeated runs
+
+FIGURES = ("throughput_rps", "latency_p50_ms", "latency_p95_ms", "latency_p99_ms")
+
+
+@dataclass
+class Seeded:
+    orgs: list[UUID]
+    users: list[UUID]
+    contacts: list[UUID]
+    apiaries: list[UUID]
+    disposable: dict[str, Iterator[UUID]]
+    spare_memberships: Iterator[tuple[UUID, UUID]]
+    free_memberships: Iterator[tuple[UUID, UUID]]
+
+
+@dataclass
+class Scenario:
+    name: str
+    method: str
+    path: Callable[[int], str]
+    body: Callable[[int], Any] | None = None
+
+
+def ids(n: int) -> list[UUID]:
+    return [uuid4() for _ in range(n)]
+
+
+async def seed(engine: AsyncEngine, n: int, disposable: int, disposable_memberships: int) -> Seeded:
+    rng = Random(42)
+    orgs, users, contacts, apiaries = ids(n), ids(n), ids(n), ids(n)
+    spare = {name: ids(disposable) for name in ("orgs", "users", "contacts", "apiary")}
+    memberships = {(user, orgs[i % n]) for i, user in enumerate(users)}
+    # the membership deletes take seeded links one at a time, the membership puts take the pairs left after them
+    free_memberships = (pair for pair in product(users, orgs) if pair not in memberships)
+    spare_memberships = list(islice(free_memberships, disposable_memberships))
+    async with engine.begin() as conn:
+        await conn.execute(
+            insert(Organisations), [{"org_id": org, "org_name": f"Org {i}"} for i, org in enumerate(orgs + spare["orgs"])]
+        )
+        await conn.execute(
+            insert(Users), [{"user_id": user, "username": f"User {i}"} for i, user in enumerate(users + spare["users"])]
+        )
+        await conn.execute(
+            insert(Contacts),
+            [
+                {"contact_id": contact, "name": f"Contact {i}", "email": f"contact{i}@example.com"}
+                for i, contact in enumerate(contacts + spare["contacts"])
+            ],
+        )
+        await conn.execute(
+            insert(Apiary),
+            [
+                {
+                    "apiary_id": apiary,
+                    "name": f"Apiary {i}",
+                    "org_id": rng.choice(orgs),
+                    "contact_id": rng.choice(contacts),
+                    "site_lat": rng.uniform(50.0, 55.0),
+                    "site_lon": rng.uniform(-5.0, 1.0),
+                    "apiary_notes": "Seeded by the route benchmark",
+                }
+                for i, apiary in enumerate(apiaries + spare["apiary"])
+            ],
+        )
+        await conn.execute(
+            insert(UserToOrgLink),
+            [{"user_id": user, "org_id": org} for user, org in [*memberships, *spare_memberships]],
+        )
+    return Seeded(
+        orgs=orgs,
+        users=users,
+        contacts=contacts,
+        apiaries=apiaries,
+        disposable={name: iter(values) for name, values in spare.items()},
+        spare_memberships=iter(spare_memberships),
+        free_memberships=free_memberships,
+    )
+
+
+def scenarios(seeded: Seeded, bulk_rows: int, sync_token: str) -> list[Scenario]:
+    def pick(values: list[UUID]) -> Callable[[int], UUID]:
+        return lambda i: values[i % len(values)]
+
+    org, user, contact, apiary = pick(seeded.orgs), pick(seeded.users), pick(seeded.contacts), pick(seeded.apiaries)
+    unique = count()
+    result = [
+        # first, so the delta holds only the changes made by the scenarios before it, i.e. none
+        Scenario("GET /resource/sync", "GET", lambda i: "/resource/sync"),
+        Scenario("GET /resource/sync?since", "GET", lambda i: f"/resource/sync?since={sync_token}"),
+        Scenario("GET /resource/search", "GET", lambda i: "/resource/search?q=apiary"),
+        Scenario("GET /resource/search?kind", "GET", lambda i: "/resource/search?q=contact&kind=contact"),
+        Scenario("GET /resource/apiary/near", "GET", lambda i: "/resource/apiary/near?lat=52.5&lon=-2.0&radius_km=50"),
+        Scenario(
+            "GET /resource/apiary/within",
+            "GET",
+            lambda i: "/resource/apiary/within?min_lat=52&min_lon=-3&max_lat=53&max_lon=-1",
+        ),
+        Scenario(
+            "GET /resource/apiary/?filter", "GET", lambda i: f"/resource/apiary/?filter=org_id:{org(i)}&filter=name:Apiary 1*"
+        ),
+        Scenario("GET /resource/apiary/?order_by", "GET", lambda i: "/resource/apiary/?order_by=-name"),
+        Scenario("GET /resource/apiary/?fields", "GET", lambda i: "/resource/apiary/?fields=apiary_id,name,org_id"),
+        Scenario("GET /resource/contacts/?fields", "GET", lambda i: "/resource/contacts/?fields=contact_id,name"),
+        Scenario(
+            "PUT /resource/orgs/{org_id}/{user_id}",
+            "PUT",
+            lambda i: "/resource/orgs/{1}/{0}".format(*next(seeded.free_memberships)),
+        ),
+        Scenario(
+            "PUT /resource/users/{user_id}/{org_id}",
+            "PUT",
+            lambda i: "/resource/users/{0}/{1}".format(*next(seeded.free_memberships)),
+        ),
+        Scenario(
+            "PUT /resource/orgs/{org_id}/users/{user_id}",
+            "PUT",
+            lambda i: "/resource/orgs/{1}/users/{0}".format(*next(seeded.free_memberships)),
+        ),
+        Scenario(
+            "PUT /resource/users/{user_id}/orgs/{org_id}",
+            "PUT",
+            lambda i: "/resource/users/{0}/orgs/{1}".format(*next(seeded.free_memberships)),
+        ),
+        Scenario(
+            "DELETE /resource/orgs/{org_id}/users/{user_id}",
+            "DELETE",
+            lambda i: "/resource/orgs/{1}/users/{0}".format(*next(seeded.spare_memberships)),
+        ),
+        Scenario(
+            "DELETE /resource/users/{user_id}/orgs/{org_id}",
+            "DELETE",
+            lambda i: "/resource/users/{0}/orgs/{1}".format(*next(seeded.spare_memberships)),
+        ),
+        Scenario("GET /resource/orgs/{org_id}/users", "GET", lambda i: f"/resource/orgs/{org(i)}/users"),
+        Scenario("GET /resource/users/{user_id}/orgs", "GET", lambda i: f"/resource/users/{user(i)}/orgs"),
+        Scenario(
+            "POST /resource/orgs/{org_id}/users/add",
+            "POST",
+            lambda i: f"/resource/orgs/{org(i)}/users/add",
+            lambda i: {"user_ids": [str(user(i * bulk_rows + j)) for j in range(bulk_rows)]},
+        ),
+        Scenario(
+            "POST /resource/orgs/{org_id}/users/remove",
+            "POST",
+            lambda i: f"/resource/orgs/{org(i)}/users/remove",
+            lambda i: {"user_ids": [str(user(i * bulk_rows + j)) for j in range(bulk_rows)]},
+        ),
+    ]
+    for resource, key, detail, create in [
+        ("apiary", "apiary_id", apiary, lambda i: {"name": f"Bench {next(unique)}", "site_lat": 51.5, "site_lon": -0.1}),
+        ("contacts", "contact_id", contact, lambda i: {"name": f"Bench {next(unique)}"}),
+        ("orgs", "org_id", org, lambda i: {"org_name": f"Bench {next(unique)}"}),
+        ("users", "user_id", user, lambda i: {"username": f"Bench {next(unique)}"}),
+    ]:
+        spare = seeded.disposable[resource]
+        result += [
+            Scenario(f"GET /resource/{resource}/", "GET", lambda i, r=resource: f"/resource/{r}/"),
+            Scenario(f"GET /resource/{resource}/{{{key}}}", "GET", lambda i, r=resource, d=detail: f"/resource/{r}/{d(i)}"),
+            Scenario(f"POST /resource/{resource}/", "POST", lambda i, r=resource: f"/resource/{r}/", create),
+            Scenario(
+                f"POST /resource/{resource}/bulk",
+                "POST",
+                lambda i, r=resource: f"/resource/{r}/bulk",
+                lambda i, c=create: [c(i) for _ in range(bulk_rows)],
+            ),
+            Scenario(
+                f"DELETE /resource/{resource}/{{{key}}}", "DELETE", lambda i, r=resource, s=spare: f"/resource/{r}/{next(s)}"
+            ),
+            Scenario(
+                f"POST /resource/{resource}/bulk/delete",
+                "POST",
+                lambda i, r=resource: f"/resource/{r}/bulk/delete",
+                lambda i, s=spare: {"ids": [str(next(s)) for _ in range(bulk_rows)]},
+            ),
+        ]
+    return result
+
+
+async def run(client: AsyncClient, scenario: Scenario, concurrency: int, requests: int) -> dict:
+    latencies: list[float] = []
+    queue = iter(range(requests))
+
+    async def worker() -> None:
+        for i in queue:
+            body = scenario.body(i) if scenario.body is not None else None
+            start = perf_counter()
+            response = await client.request(scenario.method, scenario.path(i), json=body)
+            latencies.append(perf_counter() - start)
+            response.raise_for_status()
+
+    start = perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarise(latencies, perf_counter() - start)
+
+
+def uncovered(app: FastAPI, covered: list[Scenario]) -> list[str]:
+    # scenario names are the route's method and path, with anything after a ? naming a variant of it
+    names = {scenario.name.split("?")[0] for scenario in covered}
+    routes = [route for route in app.routes if getattr(route, "path", "").startswith("/resource")]
+    return [f"{method} {route.path}" for route in routes for method in route.methods if f"{method} {route.path}" not in names]
+
+
+async def run_once(
+    seed_rows: int, concurrency: list[int], requests: int, bulk_rows: int, response_cache: bool
+) -> dict[str, dict[str, dict]]:
+    routes: dict[str, dict[str, dict]] = {}
+    with TemporaryDirectory() as tmp:
+        app, engine = await stub_app(Path(tmp) / "bench.sqlite")
+        if not response_cache:
+            app.dependency_overrides[get_response_cache] = lambda: MemoryCacheBackend(max_entries=0)
+        # every level of every delete scenario needs its own rows to delete, bulk deletes take bulk_rows each
+        levels = requests * len(concurrency)
+        seeded = await seed(engine, seed_rows, levels * (1 + bulk_rows), levels * 2)
+        async with stub_client(app) as client:
+            # the seed is one write, so a single batch brings a device up to date with it
+            sync_token = (await client.get("/resource/sync", params={"limit": 1})).json()["token"]
+            planned = scenarios(seeded, bulk_rows, sync_token)
+            if missing := uncovered(app, planned):
+                raise SystemExit(f"No scenario for {', '.join(missing)}")
+            for scenario in planned:
+                routes[scenario.name] = {str(level): await run(client, scenario, level, requests) for level in concurrency}
+        await engine.dispose()
+    return routes
+
+
+def combine(runs: list[dict]) -> dict:
+    # the median of each figure over the runs, and how far apart the runs were relative to it
+    combined = {"requests": runs[0]["requests"]}
+    for figure in FIGURES:
+        values = [run[figure] for run in runs]
+        middle = median(values)
+        combined[figure] = round(middle, 3)
+        combined[f"{figure}_spread"] = round((max(values) - min(values)) / middle, 3) if middle else 0.0
+    return combined
+
+
+async def main(seed_rows: int, concurrency: list[int], requests: int, bulk_rows: int, response_cache: bool, runs: int) -> dict:
+    results: dict[str, Any] = {
+        "seed_rows": seed_rows,
+        "requests": requests,
+        "bulk_rows": bulk_rows,
+        "response_cache": response_cache,
+        "runs": runs,
+        "routes": {},
+    }
+    # each run starts from a fresh db, so the writes of one run do not slow the next
+    outcomes = [await run_once(seed_rows, concurrency, requests, bulk_rows, response_cache) for _ in range(runs)]
+    for route, levels in outcomes[0].items():
+        results["routes"][route] = {level: combine([outcome[route][level] for outcome in outcomes]) for level in levels}
+    return results
+
+
+def regressions(baseline: dict, results: dict, max_regression: float) -> list[str]:
+    found = []
+    for route, levels in results["routes"].items():
+        for level, summary in levels.items():
+            base = baseline.get("routes", {}).get(route, {}).get(level)
+            if base is None:
+                continue
+            # a route is only flagged once it moves further than its runs moved among themselves
+            allowed = {
+                figure: max_regression + max(base.get(f"{figure}_spread", 0), summary.get(f"{figure}_spread", 0))
+                for figure in ("throughput_rps", "latency_p95_ms")
+            }
+            if summary["throughput_rps"] < base["throughput_rps"] * (1 - allowed["throughput_rps"]):
+                found.append(f"{route} at {level}: throughput {base['throughput_rps']} -> {summary['throughput_rps']} rps")
+            if summary["latency_p95_ms"] > base["latency_p95_ms"] * (1 + allowed["latency_p95_ms"]):
+                found.append(f"{route} at {level}: p95 {base['latency_p95_ms']} -> {summary['latency_p95_ms']} ms")
+    return found
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Latency and throughput benchmark for every /resource route")
+    parser.add_argument("--seed", type=int, default=200, help="number of orgs, users, contacts and apiaries to seed")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32], help="concurrent request levels")
+    parser.add_argument("--requests", type=int, default=200, help="requests per route and concurrency level")
+    parser.add_argument("--bulk-rows", type=int, default=50, help="rows sent by each bulk request")
+    parser.add_argument("--response-cache", action="store_true", help="serve repeated GETs from the response cache")
+    parser.add_argument("--runs", type=int, default=1, help="repeat the benchmark and report the median of the runs")
+    parser.add_argument("--output", type=Path, help="also write the results to this file")
+    parser.add_argument("--baseline", type=Path, help="results file from an earlier run to compare against")
+    parser.add_argument(
+        "--max-regression", type=float, default=0.3, help="fraction a route may slow down by before the run fails"
+    )
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+    results = asyncio.run(main(args.seed, args.concurrency, args.requests, args.bulk_rows, args.response_cache, args.runs))
+    json.dump(results, sys.stdout, indent=2)
+    print()
+    if args.output is not None:
+        args.output.write_text(json.dumps(results, indent=2))
+    if args.baseline is not None:
+        found = regressions(json.loads(args.baseline.read_text()), results, args.max_regression)
+        for regression in found:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        sys.exit(1 if found else 0)
@@ -0,0 +1,115 @@
+import asyncio
+import json
+import logging
+import sys
+from argparse import ArgumentParser
+from pathlib import Path
+from random import Random
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from uuid import uuid4
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from src.backend.benchmarks.harness import summarise
+from src.backend.cache import MemoryCacheBackend, get_response_cache
+from src.backend.models import Apiary, Contacts
+from src.backend.search import SEARCH_BACKENDS, get_search_backend
+from src.backend.test.app import stub_app, stub_client
+
+# /resource/search latency against contacts and apiaries seeded with generated text, for each search backend, plus the
+# time each backend takes to index the seeded rows
+
+WORDS = (
+    "hive queen brood swarm honey comb frame super varroa nectar pollen drone worker wax smoker veil feeder mite "
+    "orchard meadow heather clover lime oak hedge river lane farm barn gate field wood hill church school"
+).split()
+QUERIES = {
+    "common term": "hive",
+    "rare term": "zanzibar",
+    "two terms": "heather swarm",
+    "prefix": "varr",
+    "name": "apiary 4242",
+}
+BATCH = 5000
+
+
+def sentence(rng: Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+async def seed(engine: AsyncEngine, rows: int) -> None:
+    rng = Random(42)
+    async with engine.begin() as conn:
+        for start in range(0, rows, BATCH):
+            contacts = [
+                {
+                    "contact_id": uuid4(),
+                    "name": f"Contact {i}",
+                    "address": f"{rng.randint(1, 200)} {sentence(rng, 2).title()} Lane",
+                    "contact_notes": sentence(rng, 30) + (" zanzibar" if i % 10000 == 0 else ""),
+                }
+                for i in range(start, min(start + BATCH, rows))
+            ]
+            await conn.execute(insert(Contacts), contacts)
+            await conn.execute(
+                insert(Apiary),
+                [
+                    {
+                        "apiary_id": uuid4(),
+                        "name": f"Apiary {i}",
+                        "contact_id": contact["contact_id"],
+                        "site_lat": rng.uniform(50.0, 55.0),
+                        "site_lon": rng.uniform(-5.0, 1.0),
+                        "apiary_notes": sentence(rng, 20),
+                    }
+                    for i, contact in enumerate(contacts, start)
+                ],
+            )
+
+
+async def run(client, q: str, requests: int) -> dict:
+    latencies = []
+    hits = 0
+    start = perf_counter()
+    for _ in range(requests):
+        begin = perf_counter()
+        response = await client.get("/resource/search", params={"q": q, "limit": 20})
+        latencies.append(perf_counter() - begin)
+        response.raise_for_status()
+        hits = response.json()["count"]
+    return {"hits": hits, **summarise(latencies, perf_counter() - start)}
+
+
+async def main(rows: int, requests: int, backends: list[str]) -> dict:
+    results = {"rows": rows, "requests": requests, "backends": {}}
+    with TemporaryDirectory() as tmp:
+        app, engine = await stub_app(Path(tmp) / "bench.sqlite")
+        # every request repeats the same few queries, so without this they would be answered from the cache
+        app.dependency_overrides[get_response_cache] = lambda: MemoryCacheBackend(max_entries=0)
+        await seed(engine, rows)
+        for name in backends:
+            backend = SEARCH_BACKENDS[name]()
+            # setting up a new index fills it from the seeded tables
+            start = perf_counter()
+            await backend.setup(engine)
+            result = {"index_seconds": round(perf_counter() - start, 3), "queries": {}}
+            app.dependency_overrides[get_search_backend] = lambda: backend
+            async with stub_client(app) as client:
+                for label, q in QUERIES.items():
+                    result["queries"][label] = await run(client, q, requests)
+            results["backends"][name] = result
+        await engine.dispose()
+    return results
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Full text search latency benchmark for each search backend")
+    parser.add_argument("--rows", type=int, default=100000, help="number of contacts and of apiaries to seed")
+    parser.add_argument("--requests", type=int, default=50, help="searches per query and backend")
+    parser.add_argument("--backend", nargs="+", default=list(SEARCH_BACKENDS), help="search backends to compare")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+    json.dump(asyncio.run(main(args.rows, args.requests, args.backend)), sys.stdout, indent=2)
+    print()
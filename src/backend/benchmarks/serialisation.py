@@ -0,0 +1,137 @@
+import asyncio
+import json
+import logging
+import sys
+from argparse import ArgumentParser
+from pathlib import Path
+from random import Random
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from typing import Callable
+from uuid import uuid4
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.backend.benchmarks.harness import summarise
+from src.backend.cache import MemoryCacheBackend, get_response_cache
+from src.backend.helpers import get_config
+from src.backend.helpers.serialise import FastJSONResponse, public_page, to_public
+from src.backend.models import Apiary, ApiaryList, ApiaryPublic, Contacts
+from src.backend.test.app import stub_app, stub_client
+
+# time spent turning db rows into response bodies, first for one page of apiaries in process, comparing validating the
+# rows into the public models against copying them in trusted and the stdlib json encoder against orjson, then end to
+# end through the list and create routes with trusted rows on and off
+
+
+async def seed(engine: AsyncEngine, rows: int) -> None:
+    rng = Random(42)
+    contact_id = uuid4()
+    async with engine.begin() as conn:
+        await conn.execute(insert(Contacts), [{"contact_id": contact_id, "name": "Bench Contact"}])
+        await conn.execute(
+            insert(Apiary),
+            [
+                {
+                    "apiary_id": uuid4(),
+                    "name": f"Apiary {i}",
+                    "contact_id": contact_id,
+                    "site_lat": rng.uniform(50.0, 55.0),
+                    "site_lon": rng.uniform(-5.0, 1.0),
+                    "apiary_notes": f"notes for apiary {i}",
+                }
+                for i in range(rows)
+            ],
+        )
+
+
+def time_calls(fn: Callable[[], object], repeats: int) -> dict:
+    latencies = []
+    start = perf_counter()
+    for _ in range(repeats):
+        begin = perf_counter()
+        fn()
+        latencies.append(perf_counter() - begin)
+    return summarise(latencies, perf_counter() - start)
+
+
+def in_process(apiaries: list[Apiary], repeats: int) -> dict:
+    config = get_config()
+
+    def validated() -> bytes:
+        return ApiaryList(apiaries=apiaries).model_dump_json().encode()
+
+    def trusted() -> bytes:
+        return public_page(ApiaryList, apiaries=[to_public(ApiaryPublic, a) for a in apiaries]).model_dump_json().encode()
+
+    page = ApiaryList(apiaries=apiaries)
+    results = {"validated_model_dump_json": time_calls(validated, repeats)}
+    config.trust_db_rows, trust = True, config.trust_db_rows
+    try:
+        results["trusted_model_dump_json"] = time_calls(trusted, repeats)
+    finally:
+        config.trust_db_rows = trust
+    # what a route returning a model goes through after the handler: jsonable_encoder and then the response class
+    results["jsonable_encoder_json_response"] = time_calls(lambda: JSONResponse(jsonable_encoder(page)), repeats)
+    results["jsonable_encoder_orjson_response"] = time_calls(lambda: FastJSONResponse(jsonable_encoder(page)), repeats)
+    return results
+
+
+async def run(client, method: str, url: str, requests: int, body: Callable[[], dict] | None = None) -> dict:
+    latencies = []
+    start = perf_counter()
+    for _ in range(requests):
+        begin = perf_counter()
+        response = await client.request(method, url, json=body() if body else None)
+        latencies.append(perf_counter() - begin)
+        response.raise_for_status()
+    return summarise(latencies, perf_counter() - start)
+
+
+async def main(rows: int, page: int, repeats: int, requests: int) -> dict:
+    results = {"rows": rows, "page": page, "repeats": repeats, "requests": requests}
+    config = get_config()
+    trust = config.trust_db_rows
+    with TemporaryDirectory() as tmp:
+        app, engine = await stub_app(Path(tmp) / "bench.sqlite")
+        # the same page is asked for every time, so without this it would be served from the cache
+        app.dependency_overrides[get_response_cache] = lambda: MemoryCacheBackend(max_entries=0)
+        await seed(engine, rows)
+        async with AsyncSession(engine) as db:
+            apiaries = list(await db.scalars(select(Apiary).limit(page)))
+        results["in_process"] = in_process(apiaries, repeats)
+        contact_id = str(apiaries[0].contact_id)
+
+        def new_apiary() -> dict:
+            return {"name": "New Apiary", "contact_id": contact_id, "site_lat": 51.5, "site_lon": -0.1}
+
+        results["routes"] = {}
+        try:
+            async with stub_client(app) as client:
+                for trusted in (False, True):
+                    config.trust_db_rows = trusted
+                    results["routes"]["trusted" if trusted else "validated"] = {
+                        "list": await run(client, "GET", f"/resource/apiary/?limit={page}", requests),
+                        "create": await run(client, "POST", "/resource/apiary/", requests, new_apiary),
+                    }
+        finally:
+            config.trust_db_rows = trust
+        await engine.dispose()
+    return results
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Response serialisation benchmark for trusted db rows and the orjson response")
+    parser.add_argument("--rows", type=int, default=5000, help="number of apiaries to seed")
+    parser.add_argument("--page", type=int, default=1000, help="apiaries in each page serialised")
+    parser.add_argument("--repeats", type=int, default=50, help="in process serialisations per variant")
+    parser.add_argument("--requests", type=int, default=100, help="requests per route and variant")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+    json.dump(asyncio.run(main(args.rows, args.page, args.repeats, args.requests)), sys.stdout, indent=2)
+    print()
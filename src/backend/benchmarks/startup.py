@@ -0,0 +1,90 @@
+import asyncio
+import json
+import logging
+import os
+import signal
+import sys
+from argparse import ArgumentParser
+from pathlib import Path
+from statistics import median
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+import httpx
+
+from src.backend.benchmarks.harness import free_port, signing_key, start_server
+from src.backend.benchmarks.workers import seed
+
+# how long a freshly launched server takes to answer /healthz and then /readyz, the startup phases it reports, and the
+# latency of the first request once it is ready against the requests after it
+
+
+async def wait_for(client: httpx.AsyncClient, path: str, started: float, timeout: float = 60) -> float:
+    while perf_counter() - started < timeout:
+        try:
+            if (await client.get(path)).status_code == 200:
+                return perf_counter() - started
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.02)
+    raise RuntimeError(f"{path} did not answer")
+
+
+async def launch(env: dict[str, str], token: str, path: str, warm_requests: int) -> dict:
+    port = free_port()
+    started = perf_counter()
+    server = start_server(1, port, env)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=None) as client:
+            live = await wait_for(client, "/healthz", started)
+            ready = await wait_for(client, "/readyz", started)
+            phases = (await client.get("/readyz")).json()["phases"]
+            latencies = []
+            for _ in range(warm_requests + 1):
+                begin = perf_counter()
+                (await client.get(path, headers={"Authorization": f"Bearer {token}"})).raise_for_status()
+                latencies.append(perf_counter() - begin)
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=60)
+    return {
+        "live_s": live,
+        "ready_s": ready,
+        "phases": phases,
+        "first_request_ms": latencies[0] * 1000,
+        "warm_request_ms": median(latencies[1:]) * 1000,
+    }
+
+
+async def main(runs: int, path: str, rows: int, warm_requests: int) -> dict:
+    with TemporaryDirectory() as tmp:
+        seed(Path(tmp) / "bench.sqlite", rows)
+        token = signing_key(Path(tmp) / "jwks.json")
+        env = os.environ | {
+            "DB_URL": f"sqlite+pysqlite:///{Path(tmp) / 'bench.sqlite'}",
+            "JWKS_FILE": str(Path(tmp) / "jwks.json"),
+            # otherwise every request after the first is answered from the response cache
+            "RESPONSE_CACHE_SIZE": "0",
+            "SERVER_ACCESS_LOG": "false",
+            "LOG_LEVEL": "warning",
+        }
+        launches = [await launch(env, token, path, warm_requests) for _ in range(runs)]
+    results = {"runs": runs, "path": path, "rows": rows}
+    for name in ("live_s", "ready_s", "first_request_ms", "warm_request_ms"):
+        results[name] = round(median(launch[name] for launch in launches), 3)
+    results["phases_s"] = {
+        name: round(median(launch["phases"][name] for launch in launches), 4) for name in launches[0]["phases"]
+    }
+    return results
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Startup time of the launched server, by phase, and its first request latency")
+    parser.add_argument("--runs", type=int, default=5, help="number of launches, medians are reported")
+    parser.add_argument("--path", default="/resource/apiary/?limit=100", help="route to request once ready")
+    parser.add_argument("--rows", type=int, default=2000, help="number of apiaries to seed")
+    parser.add_argument("--warm-requests", type=int, default=20, help="requests after the first to compare it with")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+    json.dump(asyncio.run(main(args.runs, args.path, args.rows, args.warm_requests)), sys.stdout, indent=2)
+    print()
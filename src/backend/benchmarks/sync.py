@@ -0,0 +1,118 @@
+import asyncio
+import json
+import logging
+import sys
+from argparse import ArgumentParser
+from pathlib import Path
+from random import Random
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from uuid import uuid4
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from src.backend.models import Apiary
+from src.backend.test.app import stub_app, stub_client
+
+# what an offline device downloads to catch up: every apiary again through the paged list route, against one delta from
+# /resource/sync after a number of apiaries were edited and deleted while it was away
+
+BATCH = 5000
+PAGE = 1000
+
+
+async def seed(engine: AsyncEngine, rows: int) -> list[str]:
+    rng = Random(42)
+    ids = [uuid4() for _ in range(rows)]
+    async with engine.begin() as conn:
+        for start in range(0, rows, BATCH):
+            await conn.execute(
+                insert(Apiary),
+                [
+                    {
+                        "apiary_id": ids[i],
+                        "name": f"Apiary {i}",
+                        "site_lat": rng.uniform(50.0, 55.0),
+                        "site_lon": rng.uniform(-5.0, 1.0),
+                    }
+                    for i in range(start, min(start + BATCH, rows))
+                ],
+            )
+    return [str(apiary_id) for apiary_id in ids]
+
+
+async def full_download(client) -> dict:
+    rows = bytes_ = requests = 0
+    cursor = None
+    start = perf_counter()
+    while True:
+        params = {"limit": PAGE} | ({"cursor": cursor} if cursor else {})
+        response = await client.get("/resource/apiary/", params=params)
+        response.raise_for_status()
+        page = response.json()
+        rows += len(page["apiaries"])
+        bytes_ += len(response.content)
+        requests += 1
+        cursor = page.get("next_cursor")
+        if not cursor:
+            break
+    return {"rows": rows, "requests": requests, "bytes": bytes_, "seconds": round(perf_counter() - start, 4)}
+
+
+async def sync(client, token: str | None) -> tuple[dict, str]:
+    rows = deleted = bytes_ = requests = 0
+    start = perf_counter()
+    while True:
+        response = await client.get("/resource/sync", params={"limit": PAGE} | ({"since": token} if token else {}))
+        response.raise_for_status()
+        batch = response.json()
+        rows += len(batch["apiaries"])
+        deleted += len(batch["deleted"]["apiaries"])
+        bytes_ += len(response.content)
+        requests += 1
+        token = batch["token"]
+        if not batch["more"]:
+            break
+    seconds = round(perf_counter() - start, 4)
+    return {"rows": rows, "deleted": deleted, "requests": requests, "bytes": bytes_, "seconds": seconds}, token
+
+
+async def change(client, ids: list[str], changes: int, rng: Random) -> None:
+    # half of the changes edit apiaries through an upsert and half delete them
+    picked = rng.sample(ids, changes)
+    half = changes // 2
+    edited, removed = picked[:half], picked[half:]
+    rows = [{"apiary_id": apiary_id, "name": "Moved", "site_lat": 52.0, "site_lon": -1.0} for apiary_id in edited]
+    if rows:
+        (await client.post("/resource/apiary/bulk", params={"upsert": True}, json=rows)).raise_for_status()
+    if removed:
+        (await client.post("/resource/apiary/bulk/delete", json={"ids": removed})).raise_for_status()
+    for apiary_id in removed:
+        ids.remove(apiary_id)
+
+
+async def main(rows: int, changes: list[int]) -> dict:
+    results = {"rows": rows, "first_sync": {}, "changes": {}}
+    rng = Random(7)
+    with TemporaryDirectory() as tmp:
+        app, engine = await stub_app(Path(tmp) / "bench.sqlite")
+        ids = await seed(engine, rows)
+        async with stub_client(app) as client:
+            results["first_sync"], token = await sync(client, None)
+            for count in changes:
+                await change(client, ids, count, rng)
+                delta, token = await sync(client, token)
+                results["changes"][count] = {"full_download": await full_download(client), "sync": delta}
+        await engine.dispose()
+    return results
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Catching up by downloading every apiary against one delta sync")
+    parser.add_argument("--rows", type=int, default=100000, help="number of apiaries to seed")
+    parser.add_argument("--changes", nargs="+", type=int, default=[10, 100, 1000], help="apiaries changed before each sync")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+    json.dump(asyncio.run(main(args.rows, args.changes)), sys.stdout, indent=2)
+    print()
@@ -0,0 +1,123 @@
+import asyncio
+import json
+import logging
+import socket
+import sys
+from argparse import ArgumentParser
+from threading import Thread
+from time import perf_counter, sleep
+from urllib.parse import parse_qs
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from keycloak import KeycloakOpenID
+
+from src.backend.auth import TokenIssuer
+from src.backend.benchmarks.db_concurrency import heartbeat
+from src.backend.benchmarks.harness import summarise
+
+# a burst of logins against a local fake OIDC token endpoint, issued the old way (the blocking keycloak client called
+# inside an async def) and through the shared async TokenIssuer, with a heartbeat task measuring event loop lag. Then a
+# burst of refreshes of one refresh token, counting how many reach the token endpoint
+
+REALM = "bench"
+FAKE_TOKEN = {
+    "token_type": "Bearer",
+    "access_token": "eyXXXX.eyYYYY.eyZZZZ",
+    "expires_in": 300,
+    "refresh_token": "eyXXXX.eyYYYY.eyZZZZ",
+    "refresh_expires_in": 1800,
+}
+
+
+def fake_oidc_app(latency: float) -> FastAPI:
+    app = FastAPI()
+    app.state.grants = {"password": 0, "refresh_token": 0}
+
+    @app.post(f"/realms/{REALM}/protocol/openid-connect/token")
+    async def token(request: Request) -> JSONResponse:
+        form = parse_qs((await request.body()).decode())
+        app.state.grants[form["grant_type"][0]] += 1
+        await asyncio.sleep(latency)
+        if form.get("password") == ["wrong"]:
+            return JSONResponse({"error": "invalid_grant", "error_description": "Invalid user credentials"}, 401)
+        return JSONResponse(FAKE_TOKEN)
+
+    return app
+
+
+def serve_fake_oidc(latency: float) -> tuple[str, FastAPI]:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    app = fake_oidc_app(latency)
+    server = uvicorn.Server(uvicorn.Config(app, port=port, log_level="warning", backlog=4096))
+    Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        sleep(0.01)
+    return f"http://127.0.0.1:{port}/", app
+
+
+async def run(handler, concurrency: int, requests: int) -> dict:
+    latencies: list[float] = []
+    lags: list[float] = []
+    queue = iter(range(requests))
+
+    async def worker() -> None:
+        for _ in queue:
+            start = perf_counter()
+            await handler()
+            latencies.append(perf_counter() - start)
+
+    stop = asyncio.Event()
+    beat = asyncio.create_task(heartbeat(stop, lags))
+    start = perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = perf_counter() - start
+    stop.set()
+    await beat
+    return {"concurrency": concurrency, **summarise(latencies, elapsed), "loop_lag_max_ms": round(max(lags) * 1000, 2)}
+
+
+async def main(latency: float, concurrency: list[int], requests: int) -> dict:
+    base_url, fake_app = serve_fake_oidc(latency)
+    kc_client = KeycloakOpenID(server_url=base_url, realm_name=REALM, client_id="bench", client_secret_key="secret")
+    issuer = TokenIssuer(
+        f"{base_url}realms/{REALM}/protocol/openid-connect/token", "bench", "secret", max_concurrency=max(concurrency)
+    )
+
+    async def blocking_keycloak() -> None:
+        kc_client.token(username="bench", password="bench")
+
+    async def async_issuer() -> None:
+        await issuer.password_grant("bench", "bench")
+
+    async def refresh_burst(level: int) -> dict:
+        before = fake_app.state.grants["refresh_token"]
+        start = perf_counter()
+        await asyncio.gather(*(issuer.refresh_grant(FAKE_TOKEN["refresh_token"]) for _ in range(level)))
+        return {
+            "concurrency": level,
+            "seconds": round(perf_counter() - start, 3),
+            "upstream_calls": fake_app.state.grants["refresh_token"] - before,
+        }
+
+    results = {"upstream_latency_ms": latency * 1000, "blocking_keycloak": [], "async_issuer": [], "refresh_burst": []}
+    for level in concurrency:
+        results["blocking_keycloak"].append(await run(blocking_keycloak, level, requests))
+        results["async_issuer"].append(await run(async_issuer, level, requests))
+        results["refresh_burst"].append(await refresh_burst(level))
+    await issuer.aclose()
+    return results
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Login burst benchmark for blocking vs async token issuance")
+    parser.add_argument("--latency-ms", type=float, default=20, help="time the fake token endpoint takes to answer")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32], help="concurrent login levels")
+    parser.add_argument("--requests", type=int, default=200, help="logins per concurrency level")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+    json.dump(asyncio.run(main(args.latency_ms / 1000, args.concurrency, args.requests)), sys.stdout, indent=2)
+    print()
@@ -0,0 +1,107 @@
+import asyncio
+import json
+import logging
+import os
+import signal
+import sys
+from argparse import ArgumentParser
+from pathlib import Path
+from random import Random
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from uuid import uuid4
+
+import httpx
+from sqlalchemy import create_engine, insert
+from sqlmodel import SQLModel
+
+from src.backend.benchmarks.harness import free_port, signing_key, start_server, summarise, wait_until_ready
+from src.backend.models import Apiary
+
+# throughput and latency of one route served by the real launcher with each number of worker processes, so the scaling
+# across cores can be seen. tokens are signed with a generated key the server checks against a local jwks file
+
+
+def seed(db_path: Path, rows: int) -> None:
+    rng = Random(42)
+    engine = create_engine(f"sqlite+pysqlite:///{db_path}")
+    SQLModel.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(
+            insert(Apiary),
+            [
+                {
+                    "apiary_id": uuid4(),
+                    "name": f"Apiary {i}",
+                    "site_lat": rng.uniform(50.0, 55.0),
+                    "site_lon": rng.uniform(-5.0, 1.0),
+                }
+                for i in range(rows)
+            ],
+        )
+    engine.dispose()
+
+
+async def run(client: httpx.AsyncClient, path: str, concurrency: int, requests: int) -> dict:
+    latencies: list[float] = []
+    queue = iter(range(requests))
+
+    async def worker() -> None:
+        for _ in queue:
+            start = perf_counter()
+            response = await client.get(path)
+            latencies.append(perf_counter() - start)
+            response.raise_for_status()
+
+    start = perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarise(latencies, perf_counter() - start)
+
+
+async def main(worker_counts: list[int], path: str, rows: int, concurrency: int, requests: int, cache: bool) -> dict:
+    results = {"path": path, "rows": rows, "concurrency": concurrency, "cpus": os.cpu_count(), "workers": {}}
+    with TemporaryDirectory() as tmp:
+        seed(Path(tmp) / "bench.sqlite", rows)
+        token = signing_key(Path(tmp) / "jwks.json")
+        env = os.environ | {
+            "DB_URL": f"sqlite+pysqlite:///{Path(tmp) / 'bench.sqlite'}",
+            "JWKS_FILE": str(Path(tmp) / "jwks.json"),
+            "RESPONSE_CACHE_SIZE": os.environ.get("RESPONSE_CACHE_SIZE", "1024" if cache else "0"),
+            "SERVER_ACCESS_LOG": "false",
+            "LOG_LEVEL": "warning",
+        }
+        for workers in worker_counts:
+            port = free_port()
+            server = start_server(workers, port, env)
+            limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+            headers = {"Authorization": f"Bearer {token}"}
+            try:
+                async with httpx.AsyncClient(
+                    base_url=f"http://127.0.0.1:{port}", headers=headers, limits=limits, timeout=None
+                ) as client:
+                    await wait_until_ready(client, server)
+                    # the worker that answered /readyz is warm, the others may still be warming up
+                    await run(client, path, concurrency, concurrency * workers * 4)
+                    results["workers"][workers] = await run(client, path, concurrency, requests)
+            finally:
+                server.send_signal(signal.SIGTERM)
+                server.wait(timeout=60)
+    base = results["workers"].get(worker_counts[0])
+    for result in results["workers"].values():
+        result["speedup"] = round(result["throughput_rps"] / base["throughput_rps"], 2)
+    return results
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Throughput of the launched server for each number of worker processes")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="worker counts to compare")
+    parser.add_argument("--path", default="/resource/apiary/?limit=100", help="route to request")
+    parser.add_argument("--rows", type=int, default=2000, help="number of apiaries to seed")
+    parser.add_argument("--concurrency", type=int, default=32, help="requests in flight at once")
+    parser.add_argument("--requests", type=int, default=2000, help="requests per worker count")
+    parser.add_argument("--cache", action="store_true", help="leave the response cache on")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+    results = asyncio.run(main(args.workers, args.path, args.rows, args.concurrency, args.requests, args.cache))
+    json.dump(results, sys.stdout, indent=2)
+    print()
@@ -0,0 +1,12 @@
+# from local files
+from .backends import CacheBackend, CacheEntry, MemoryCacheBackend  # noqa: F401
+from .shared import SharedInvalidations  # noqa: F401
+from .response_cache import (  # noqa: F401
+    CACHE_BACKENDS,
+    CachedResponse,
+    cached_response,
+    get_response_cache,
+    make_etag,
+    etag_matches,
+)
+from .spec import SpecDocument, render_spec, spec_encodings, spec_response  # noqa: F401
@@ -0,0 +1,97 @@
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from time import monotonic
+
+
+@dataclass(frozen=True)
+class CacheEntry:
+    body: bytes
+    etag: str
+    media_type: str
+
+
+class CacheBackend(ABC):
+    hits: int = 0
+    misses: int = 0
+
+    @abstractmethod
+    async def get(self, key: str) -> CacheEntry | None: ...
+
+    @abstractmethod
+    async def set(self, key: str, entry: CacheEntry, tags: tuple[str, ...], generation: int) -> None: ...
+
+    @abstractmethod
+    async def invalidate(self, *tags: str) -> None: ...
+
+    @abstractmethod
+    async def generation(self) -> int: ...
+
+    @abstractmethod
+    async def clear(self) -> None: ...
+
+    @abstractmethod
+    async def size(self) -> int: ...
+
+
+class MemoryCacheBackend(CacheBackend):
+    def __init__(self, max_entries: int = 1024, ttl: int = 60) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._generation = 0
+        self._entries: OrderedDict[str, tuple[float, CacheEntry, tuple[str, ...]]] = OrderedDict()
+        self._tagged: dict[str, set[str]] = {}
+
+    async def get(self, key: str) -> CacheEntry | None:
+        item = self._entries.get(key)
+        if item is None or item[0] <= monotonic():
+            if item is not None:
+                self._drop(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return item[1]
+
+    async def set(self, key: str, entry: CacheEntry, tags: tuple[str, ...], generation: int) -> None:
+        # a write that landed while this response was being built may have made it stale, so it is not kept
+        if generation != self._generation or self.max_entries <= 0:
+            return
+        self._drop(key)
+        self._entries[key] = (monotonic() + self.ttl, entry, tags)
+        for tag in tags:
+            self._tagged.setdefault(tag, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            self._drop(next(iter(self._entries)))
+
+    async def invalidate(self, *tags: str) -> None:
+        self._generation += 1
+        for tag in tags:
+            for key in self._tagged.pop(tag, set()):
+                self._drop(key)
+
+    async def generation(self) -> int:
+        return self._generation
+
+    async def clear(self) -> None:
+        self._generation += 1
+        self._entries.clear()
+        self._tagged.clear()
+        self.hits = 0
+        self.misses = 0
+
+    async def size(self) -> int:
+        return len(self._entries)
+
+    def _drop(self, key: str) -> None:
+        item = self._entries.pop(key, None)
+        if item is None:
+            return
+        for tag in item[2]:
+            keys = self._tagged.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tagged[tag]
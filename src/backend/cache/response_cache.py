@@ -0,0 +1,114 @@
+from hashlib import blake2b
+from pathlib import Path
+from typing import Annotated, Any, Callable
+from uuid import UUID
+
+from fastapi import Depends, Request, Response, status
+from sqlmodel import SQLModel
+
+from src.backend.auth import AuthHelper, OrgScope
+from src.backend.helpers import Config, get_config, get_logger
+from src.backend.helpers.serialise import MSGPACK_MEDIA_TYPE, VARY_ACCEPT, dumps, packb, wants_msgpack
+from .backends import CacheBackend, CacheEntry, MemoryCacheBackend
+from .shared import SharedInvalidations
+
+CACHE_BACKENDS: dict[str, Callable[[Config], CacheBackend]] = {
+    "memory": lambda config: MemoryCacheBackend(max_entries=config.response_cache_size, ttl=config.response_cache_ttl),
+}
+# backends kept inside one worker process, which with several workers pass their invalidations to each other
+PROCESS_LOCAL_BACKENDS = {"memory"}
+JSON_MEDIA_TYPE = "application/json"
+
+response_cache = None
+
+
+def get_response_cache(config: Annotated[Config, Depends(get_config)]) -> CacheBackend:
+    global response_cache
+    if response_cache is None:
+        if config.response_cache_backend not in CACHE_BACKENDS:
+            raise ValueError(f"Unknown response cache backend: {config.response_cache_backend}")
+        response_cache = CACHE_BACKENDS[config.response_cache_backend](config)
+        if config.server_workers > 1 and config.response_cache_backend in PROCESS_LOCAL_BACKENDS:
+            if config.response_cache_shared_dir is not None:
+                response_cache = SharedInvalidations(response_cache, Path(config.response_cache_shared_dir))
+            else:
+                # workers started by something other than the launcher, with nowhere to share invalidations
+                get_logger().warning(
+                    f"The {config.response_cache_backend} response cache is off with {config.server_workers} workers "
+                    "and no RESPONSE_CACHE_SHARED_DIR, as each worker would keep serving its own copy after another "
+                    "worker's write"
+                )
+                response_cache = MemoryCacheBackend(max_entries=0)
+    return response_cache
+
+
+def make_etag(body: bytes) -> str:
+    return f'"{blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is None:
+        return False
+    return if_none_match.strip() == "*" or etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+
+
+def entry_response(request: Request, entry: CacheEntry) -> Response:
+    headers = {"ETag": entry.etag, **VARY_ACCEPT}
+    if etag_matches(request, entry.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(entry.body, media_type=entry.media_type, headers=headers)
+
+
+class CachedResponse:
+    def __init__(self, backend: CacheBackend, request: Request, key: str, tags: tuple[str, ...]) -> None:
+        self.backend = backend
+        self.request = request
+        self.key = key
+        self.tags = tags
+        self.generation = 0
+        # the cache key includes the accept header, so json and msgpack bodies are stored apart
+        self.media_type = MSGPACK_MEDIA_TYPE if wants_msgpack(request) else JSON_MEDIA_TYPE
+
+    async def lookup(self) -> Response | None:
+        self.generation = await self.backend.generation()
+        entry = await self.backend.get(self.key)
+        return entry_response(self.request, entry) if entry is not None else None
+
+    async def store(self, model: SQLModel, exclude_unset: bool = False) -> Response:
+        if self.media_type == MSGPACK_MEDIA_TYPE:
+            return await self.store_body(packb(model.model_dump(mode="json", exclude_unset=exclude_unset)))
+        return await self.store_body(model.model_dump_json(exclude_unset=exclude_unset).encode())
+
+    async def store_value(self, value: Any) -> Response:
+        return await self.store_body(packb(value) if self.media_type == MSGPACK_MEDIA_TYPE else dumps(value))
+
+    async def store_body(self, body: bytes) -> Response:
+        entry = CacheEntry(body=body, etag=make_etag(body), media_type=self.media_type)
+        await self.backend.set(self.key, entry, self.tags, self.generation)
+        return entry_response(self.request, entry)
+
+
+def _canonical(value: str) -> str:
+    # ids are written in many forms in urls but always invalidated in the canonical UUID form
+    try:
+        return str(UUID(value))
+    except ValueError:
+        return value
+
+
+def cached_response(*tags: str) -> Callable[..., CachedResponse]:
+    # tags may name path params, e.g. "apiary:{apiary_id}", so an entry can be dropped for one object
+    async def cached(
+        request: Request,
+        scope: Annotated[OrgScope, Depends(AuthHelper.org_scope)],
+        backend: Annotated[CacheBackend, Depends(get_response_cache)],
+    ) -> CachedResponse:
+        # callers that can see the same orgs see the same rows, so they share entries
+        query = "&".join(sorted(f"{k}={v}" for k, v in request.query_params.multi_items()))
+        accept = request.headers.get("accept", "")
+        key = f"{scope.key}|{request.url.path}?{query}|{accept}"
+        path_params = {name: _canonical(value) for name, value in request.path_params.items()}
+        return CachedResponse(backend, request, key, tuple(tag.format(**path_params) for tag in tags))
+
+    return cached
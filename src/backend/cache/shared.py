@@ -0,0 +1,103 @@
+import fcntl
+import json
+import os
+from pathlib import Path
+from uuid import uuid4
+
+from .backends import CacheBackend, CacheEntry
+
+LOG_NAME = "response-cache.log"
+LOCK_NAME = "response-cache.lock"
+
+
+class SharedInvalidations(CacheBackend):
+    # wraps a backend kept in one worker process so several workers can each keep a copy. a worker's invalidations are
+    # appended to a log in a directory they all share, and every worker reads what the others appended before it uses
+    # its copy. that is a stat of the log in the common case where nothing was written
+    def __init__(self, local: CacheBackend, directory: Path, max_log_bytes: int = 1 << 20) -> None:
+        self.local = local
+        self.max_log_bytes = max_log_bytes
+        self._path = directory / LOG_NAME
+        self._lock_path = directory / LOCK_NAME
+        self._id = uuid4().hex
+        directory.mkdir(parents=True, exist_ok=True)
+        self._path.touch()
+        # invalidations from before this worker started cannot apply to anything it holds
+        self._log = open(self._path, "rb")
+        self._inode = os.fstat(self._log.fileno()).st_ino
+        self._offset = self._log.seek(0, os.SEEK_END)
+        self._partial = b""
+
+    @property
+    def hits(self) -> int:
+        return self.local.hits
+
+    @property
+    def misses(self) -> int:
+        return self.local.misses
+
+    async def get(self, key: str) -> CacheEntry | None:
+        await self._catch_up()
+        return await self.local.get(key)
+
+    async def set(self, key: str, entry: CacheEntry, tags: tuple[str, ...], generation: int) -> None:
+        # another worker's write since the lookup bumps the local generation here, so the stale entry is not kept
+        await self._catch_up()
+        await self.local.set(key, entry, tags, generation)
+
+    async def invalidate(self, *tags: str) -> None:
+        self._append({"from": self._id, "tags": tags})
+        await self.local.invalidate(*tags)
+
+    async def generation(self) -> int:
+        await self._catch_up()
+        return await self.local.generation()
+
+    async def clear(self) -> None:
+        self._append({"from": self._id, "clear": True})
+        await self.local.clear()
+
+    async def size(self) -> int:
+        await self._catch_up()
+        return await self.local.size()
+
+    def _append(self, record: dict) -> None:
+        line = json.dumps(record).encode() + b"\n"
+        with open(self._lock_path, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            # the log is replaced rather than truncated, so a worker still reading the old one sees it was rotated
+            if self._path.stat().st_size > self.max_log_bytes:
+                rotated = self._path.with_suffix(".new")
+                rotated.write_bytes(b"")
+                os.replace(rotated, self._path)
+            with open(self._path, "ab") as log:
+                log.write(line)
+
+    async def _catch_up(self) -> None:
+        stat = os.stat(self._path)
+        if stat.st_ino != self._inode:
+            # what was appended to the old log before it was rotated is unknown, so everything held is dropped
+            await self._drop_all()
+            self._log.close()
+            self._log = open(self._path, "rb")
+            self._inode, self._offset, self._partial = os.fstat(self._log.fileno()).st_ino, 0, b""
+        elif stat.st_size <= self._offset:
+            return
+        self._log.seek(self._offset)
+        data = self._log.read()
+        self._offset += len(data)
+        # a line is only applied once it is whole
+        *lines, self._partial = (self._partial + data).split(b"\n")
+        for line in lines:
+            record = json.loads(line)
+            if record["from"] == self._id:
+                continue
+            if record.get("clear"):
+                await self.local.clear()
+            else:
+                await self.local.invalidate(*record["tags"])
+
+    async def _drop_all(self) -> None:
+        hits, misses = self.local.hits, self.local.misses
+        await self.local.clear()
+        self.local.hits, self.local.misses = hits, misses
@@ -0,0 +1,50 @@
+import json
+from dataclasses import dataclass, field
+from io import StringIO
+
+from fastapi import FastAPI, Request, Response, status
+from yaml import dump as yaml_dump
+
+from src.backend.compression import compress, negotiate
+from src.backend.helpers import Config
+from .response_cache import etag_matches, make_etag
+
+
+@dataclass(frozen=True)
+class SpecDocument:
+    body: bytes
+    etag: str
+    media_type: str
+    encoded: dict[str, bytes] = field(default_factory=dict)
+
+
+def spec_document(body: bytes, media_type: str, encodings: list[str]) -> SpecDocument:
+    # rendered once and served many times, so each copy is compressed at the best level
+    encoded = {encoding: compress(encoding, body, best=True) for encoding in encodings}
+    return SpecDocument(body=body, etag=make_etag(body), media_type=media_type, encoded=encoded)
+
+
+def spec_encodings(config: Config) -> list[str]:
+    return config.compression_encodings if config.openapi_precompress else []
+
+
+def render_spec(app: FastAPI, encodings: list[str] | None = None) -> dict[str, SpecDocument]:
+    spec = app.openapi()
+    yaml_spec = StringIO()
+    yaml_dump(spec, yaml_spec, sort_keys=False)
+    return {
+        "json": spec_document(json.dumps(spec, separators=(",", ":")).encode(), "application/json", encodings or []),
+        "yaml": spec_document(yaml_spec.getvalue().encode(), "text/yaml", encodings or []),
+    }
+
+
+def spec_response(request: Request, document: SpecDocument) -> Response:
+    headers = {"ETag": document.etag, "Vary": "Accept-Encoding", "Cache-Control": "no-cache"}
+    if etag_matches(request, document.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    encoding = negotiate(request.headers.get("accept-encoding", ""), list(document.encoded))
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+        headers["ETag"] = f"W/{document.etag}"
+        return Response(document.encoded[encoding], media_type=document.media_type, headers=headers)
+    return Response(document.body, media_type=document.media_type, headers=headers)
@@ -0,0 +1,3 @@
+# from local files
+from .codecs import CODECS, Codec, Encoder, check_encodings, compress, negotiate, new_encoder  # noqa: F401
+from .middleware import COMPRESSIBLE_TYPES, CompressionMiddleware  # noqa: F401
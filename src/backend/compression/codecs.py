@@ -0,0 +1,114 @@
+import zlib
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Callable, Sequence
+
+import brotli
+import zstandard
+
+
+class Encoder(ABC):
+    @abstractmethod
+    def compress(self, data: bytes) -> bytes: ...
+
+    # everything compressed so far, ending where the client can decode up to while the stream goes on
+    @abstractmethod
+    def flush(self) -> bytes: ...
+
+    @abstractmethod
+    def finish(self) -> bytes: ...
+
+
+class GzipEncoder(Encoder):
+    def __init__(self, level: int) -> None:
+        # wbits 31 writes the gzip header, with a zero mtime so the same body always compresses to the same bytes
+        self.compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self.compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self.compressor.flush()
+
+
+class BrotliEncoder(Encoder):
+    def __init__(self, level: int) -> None:
+        self.compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data: bytes) -> bytes:
+        return self.compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self.compressor.flush()
+
+    def finish(self) -> bytes:
+        return self.compressor.finish()
+
+
+class ZstdEncoder(Encoder):
+    def __init__(self, level: int) -> None:
+        self.compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self.compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self.compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self.compressor.flush()
+
+
+@dataclass(frozen=True)
+class Codec:
+    encoder: Callable[[int], Encoder]
+    # per request compression has to be quick, a body compressed once and served many times can take the best level
+    level: int
+    best_level: int
+
+
+CODECS: dict[str, Codec] = {
+    "zstd": Codec(ZstdEncoder, level=3, best_level=19),
+    "br": Codec(BrotliEncoder, level=4, best_level=11),
+    "gzip": Codec(GzipEncoder, level=6, best_level=9),
+}
+
+
+def new_encoder(encoding: str, best: bool = False) -> Encoder:
+    codec = CODECS[encoding]
+    return codec.encoder(codec.best_level if best else codec.level)
+
+
+def compress(encoding: str, body: bytes, best: bool = False) -> bytes:
+    encoder = new_encoder(encoding, best)
+    return encoder.compress(body) + encoder.finish()
+
+
+def check_encodings(encodings: Sequence[str]) -> list[str]:
+    unknown = [encoding for encoding in encodings if encoding not in CODECS]
+    if unknown:
+        raise ValueError(f"Unknown content encodings: {', '.join(unknown)}")
+    return list(encodings)
+
+
+def negotiate(accept_encoding: str, offered: Sequence[str]) -> str | None:
+    # the client's highest q wins, ties go to the first offered, and q=0 or no match means the body is sent as it is
+    weights = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.partition(";")
+        weight = 1.0
+        if params.strip().startswith("q="):
+            try:
+                weight = float(params.strip()[2:])
+            except ValueError:
+                weight = 0.0
+        weights[name.strip().lower()] = weight
+    best, best_weight = None, 0.0
+    for encoding in offered:
+        weight = weights.get(encoding, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
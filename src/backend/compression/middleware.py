@@ -0,0 +1,113 @@
+from typing import Any
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from .codecs import Encoder, check_encodings, negotiate, new_encoder
+
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/x-ndjson",
+    "application/msgpack",
+    "application/yaml",
+    "text/",
+)
+# each chunk of these is a record the client can use as soon as it arrives
+FLUSHED_TYPES = ("application/x-ndjson",)
+# other streamed bodies are flushed after this much has gone into the encoder since the last flush
+FLUSH_THRESHOLD = 16 * 1024
+
+
+class CompressedSend:
+    def __init__(self, send: Any, encoding: str, minimum_size: int) -> None:
+        self.send = send
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.start: dict | None = None
+        self.encoder: Encoder | None = None
+        self.flush_every_chunk = False
+        self.buffered = 0
+
+    async def __call__(self, message: dict) -> None:
+        if message["type"] == "http.response.start":
+            # held back until the first body shows whether the response is worth compressing
+            self.start = message
+        elif message["type"] != "http.response.body":
+            await self.send(message)
+        elif self.start is not None:
+            await self.begin(self.start, message)
+        elif self.encoder is not None:
+            await self.send_compressed(message)
+        else:
+            await self.send(message)
+
+    async def begin(self, start: dict, message: dict) -> None:
+        self.start = None
+        headers = MutableHeaders(raw=start["headers"])
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if not compressible(start["status"], headers):
+            await self.send(start)
+            await self.send(message)
+            return
+        headers.add_vary_header("Accept-Encoding")
+        if not more_body and len(body) < self.minimum_size:
+            await self.send(start)
+            await self.send(message)
+            return
+        self.encoder = new_encoder(self.encoding)
+        headers["Content-Encoding"] = self.encoding
+        # the entity tag names the uncompressed body, so the compressed one only matches it weakly
+        etag = headers.get("etag")
+        if etag is not None and not etag.startswith("W/"):
+            headers["ETag"] = f"W/{etag}"
+        if more_body:
+            # a streamed body is compressed as it goes, so its length is not known up front
+            del headers["Content-Length"]
+            self.flush_every_chunk = headers.get("content-type", "").startswith(FLUSHED_TYPES)
+            await self.send(start)
+            await self.send_compressed(message)
+            return
+        compressed = self.encoder.compress(body) + self.encoder.finish()
+        headers["Content-Length"] = str(len(compressed))
+        await self.send(start)
+        await self.send({"type": "http.response.body", "body": compressed})
+
+    async def send_compressed(self, message: dict) -> None:
+        more_body = message.get("more_body", False)
+        body = message.get("body", b"")
+        data = self.encoder.compress(body)
+        # the encoder holds small chunks back to compress them better, so without a flush a slow stream would reach the
+        # client only in bursts of many chunks
+        self.buffered += len(body)
+        if not more_body:
+            data += self.encoder.finish()
+        elif body and (self.flush_every_chunk or self.buffered >= FLUSH_THRESHOLD):
+            data += self.encoder.flush()
+            self.buffered = 0
+        if data or not more_body:
+            await self.send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+
+def compressible(status_code: int, headers: MutableHeaders) -> bool:
+    return (
+        status_code not in (204, 304)
+        and "content-encoding" not in headers
+        and headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES)
+    )
+
+
+class CompressionMiddleware:
+    def __init__(self, app: Any, encodings: list[str], minimum_size: int) -> None:
+        self.app = app
+        self.encodings = check_encodings(encodings)
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: dict, receive: Any, send: Any) -> None:
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""), self.encodings)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await self.app(scope, receive, CompressedSend(send, encoding, self.minimum_size))
@@ -3,13 +3,91 @@ from pydantic_settings import BaseSettings
 
 
 class Config(BaseSettings):
+    # Server
+    server_host: str = Field("0.0.0.0", description="the address the server listens on")
+    server_port: int = Field(5000, gt=0, description="the port the server listens on")
+    server_workers: int = Field(1, gt=0, description="worker processes sharing the listening socket")
+    server_loop: str = Field("uvloop", description="the event loop: uvloop, asyncio or auto")
+    server_http: str = Field("httptools", description="the http protocol implementation: httptools, h11 or auto")
+    server_keep_alive: int = Field(5, ge=0, description="seconds an idle keep-alive connection is held open")
+    server_backlog: int = Field(2048, gt=0, description="max connections queued for accept on the listening socket")
+    server_limit_concurrency: int | None = Field(
+        None, gt=0, description="connections and tasks a worker handles at once before answering 503, unlimited if unset"
+    )
+    server_graceful_shutdown: int | None = Field(
+        30, ge=0, description="seconds in flight requests get to finish on shutdown, no limit if unset"
+    )
+    server_access_log: bool = Field(True, description="log every request")
+    warmup_retry_interval: float = Field(5, gt=0, description="seconds before a failed startup warm up step is retried")
+    log_level: str = Field("info", description="the server log level")
     # API
     db_url: str = Field("sqlite+pysqlite:///controller.sqlite", description="the db to cache to")
+    async_db_url: str | None = Field(None, description="the async db url, defaults to db_url with an async driver")
+    bulk_chunk_size: int = Field(500, gt=0, description="rows written per transaction by the bulk endpoints")
+    response_cache_backend: str = Field("memory", description="the backend for cached resource responses")
+    response_cache_size: int = Field(1024, ge=0, description="max number of cached responses, 0 disables the cache")
+    response_cache_ttl: int = Field(60, gt=0, description="seconds a cached response may be served for")
+    response_cache_shared_dir: str | None = Field(
+        None, description="directory several workers pass cache invalidations through, made by the launcher if unset"
+    )
+    trust_db_rows: bool = Field(True, description="build response models from db rows without validating them again")
+    sync_tombstone_retention: int = Field(
+        30 * 24 * 3600, gt=0, description="seconds deletes are kept for /resource/sync, older tokens start again"
+    )
+    sync_prune_interval: int = Field(3600, gt=0, description="seconds between prunes of expired sync tombstones")
+    search_backend: str = Field("auto", description="the full text search backend: fts5, like, or auto for fts5 on sqlite")
+    # Database
+    db_echo: bool = Field(False, description="log every SQL statement")
+    db_pool_size: int = Field(5, gt=0, description="connections kept open by the db pool")
+    db_max_overflow: int = Field(10, ge=0, description="connections the pool may open beyond its size under load")
+    db_pool_timeout: float = Field(30, gt=0, description="seconds to wait for a free pooled connection")
+    db_pool_recycle: int = Field(1800, description="seconds before a pooled connection is replaced, -1 never")
+    db_pool_pre_ping: bool = Field(True, description="check a pooled connection is alive before using it")
+    db_pool_prefill: int | None = Field(None, ge=0, description="connections opened at startup, the pool size if unset")
+    sqlite_journal_mode: str = Field("WAL", description="sqlite journal_mode pragma")
+    sqlite_synchronous: str = Field("NORMAL", description="sqlite synchronous pragma")
+    sqlite_mmap_size: int = Field(268435456, ge=0, description="sqlite mmap_size pragma in bytes")
+    sqlite_busy_timeout: int = Field(5000, ge=0, description="sqlite busy_timeout pragma in milliseconds")
+    sqlite_cache_size: int = Field(-65536, description="sqlite cache_size pragma, negative values are KiB")
+    sqlite_foreign_keys: bool = Field(
+        True, description="sqlite foreign_keys pragma, enforces foreign keys and their on delete"
+    )
+    metrics_enabled: bool = Field(
+        True, description="record request metrics and serve them on /metrics, labelled by worker when there are several"
+    )
+    profile_dir: str = Field("profiles", description="directory the admin request profiler saves profiles to")
+    profile_max_files: int = Field(200, gt=0, description="saved profiles kept before the oldest are deleted")
+    openapi_precompress: bool = Field(True, description="keep compressed copies of the rendered OpenAPI documents")
+    compression_encodings: list[str] = Field(
+        ["zstd", "br", "gzip"], description="content encodings offered for responses, most preferred first, empty for none"
+    )
+    compression_minimum_size: int = Field(1024, ge=0, description="smallest response body in bytes that is compressed")
 
     # Auth
     realm: str = Field("beekind", description="the B2C Tenant id")
     base_auth_url: str = Field("https://rednodepi.local.net:5001/", description="the Auth Url for the B2C tenant")
     token_endpoint: str = Field("protocol/openid-connect/token", description="the endpoint for the OIDC token")
+    certs_endpoint: str = Field("protocol/openid-connect/certs", description="the endpoint for the realm JWKS")
+    auth_verify_tls: bool = Field(False, description="verify the TLS certificate of the auth server")
+    # Token issuance
+    token_url: str | None = Field(None, description="override for the token url, defaults to the realm token endpoint")
+    token_timeout: float = Field(10, gt=0, description="seconds to wait for the auth server to issue a token")
+    token_max_connections: int = Field(20, gt=0, description="max connections kept open to the auth server")
+    token_max_concurrency: int = Field(20, gt=0, description="max token requests in flight to the auth server at once")
+    # Token verification
+    jwks_url: str | None = Field(None, description="override for the JWKS url, defaults to the realm certs endpoint")
+    jwks_file: str | None = Field(None, description="local JWKS file to verify tokens against instead of the auth server")
+    jwks_ttl: int = Field(300, gt=0, description="seconds before the signing keys are refreshed in the background")
+    jwks_min_refresh_interval: int = Field(
+        10, ge=0, description="minimum seconds between JWKS fetches for unknown kids or after a failed load"
+    )
+    jwt_algorithms: list[str] = Field(["RS256"], description="the signing algorithms accepted for tokens")
+    jwt_issuer: str | None = Field(None, description="the expected token issuer, not checked if unset")
+    jwt_audience: str | None = Field(None, description="the expected token audience, not checked if unset")
+    jwt_leeway: int = Field(0, ge=0, description="seconds of clock skew allowed when checking token expiry")
+    token_cache_size: int = Field(4096, ge=0, description="max number of verified tokens to cache, 0 disables the cache")
+    admin_role: str = Field("admin", description="the realm role required for the admin endpoints")
+    org_claim: str = Field("orgs", description="the token claim that lists the caller's org ids")
     # Frontend Auth
     frontend_client_id: str = Field("26bb9d3d-ef6c-4aa3-a761-9c7ed4d1439c", description="the client ID for web")
     auth_policy: str = Field("B2C_1_signin", description="the auth policy for b2c")
@@ -0,0 +1,93 @@
+from math import asin, cos, degrees, floor, radians, sin, sqrt
+
+EARTH_RADIUS_KM = 6371.0088
+GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+GEOHASH_PRECISION = 9
+MAX_COVERING_CELLS = 9
+
+
+def encode_geohash(lat: float, lon: float, precision: int = GEOHASH_PRECISION) -> str:
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(chars) < precision:
+        value, value_range = (lon, lon_range) if even else (lat, lat_range)
+        mid = (value_range[0] + value_range[1]) / 2
+        bits <<= 1
+        if value >= mid:
+            bits |= 1
+            value_range[0] = mid
+        else:
+            value_range[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(GEOHASH_ALPHABET[bits])
+            bits = 0
+            bit_count = 0
+    return "".join(chars)
+
+
+def cell_size(precision: int) -> tuple[float, float]:
+    lon_bits = (5 * precision + 1) // 2
+    lat_bits = 5 * precision // 2
+    return 180.0 / 2**lat_bits, 360.0 / 2**lon_bits
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    d_lat = radians(lat2 - lat1)
+    d_lon = radians(lon2 - lon1)
+    a = sin(d_lat / 2) ** 2 + cos(radians(lat1)) * cos(radians(lat2)) * sin(d_lon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * asin(min(1.0, sqrt(a)))
+
+
+def bounding_box(lat: float, lon: float, radius_km: float) -> tuple[float, float, float, float]:
+    d_lat = degrees(radius_km / EARTH_RADIUS_KM)
+    min_lat, max_lat = max(-90.0, lat - d_lat), min(90.0, lat + d_lat)
+    if min_lat == -90.0 or max_lat == 90.0 or cos(radians(lat)) < 1e-9:
+        return min_lat, -180.0, max_lat, 180.0
+    d_lon = degrees(radius_km / (EARTH_RADIUS_KM * cos(radians(lat))))
+    if d_lon >= 180.0:
+        return min_lat, -180.0, max_lat, 180.0
+    return min_lat, lon - d_lon, max_lat, lon + d_lon
+
+
+def split_antimeridian(
+    min_lat: float, min_lon: float, max_lat: float, max_lon: float
+) -> list[tuple[float, float, float, float]]:
+    if min_lon < -180.0:
+        return [(min_lat, min_lon + 360.0, max_lat, 180.0), (min_lat, -180.0, max_lat, max_lon)]
+    if max_lon > 180.0:
+        return [(min_lat, min_lon, max_lat, 180.0), (min_lat, -180.0, max_lat, max_lon - 360.0)]
+    return [(min_lat, min_lon, max_lat, max_lon)]
+
+
+def covering_cells(min_lat: float, min_lon: float, max_lat: float, max_lon: float) -> list[str]:
+    # the longest geohash prefixes that cover the box in at most MAX_COVERING_CELLS cells. Every point in the box has
+    # one of them as a prefix, so each becomes an index range scan. An empty list means the box needs a full scan
+    boxes = split_antimeridian(min_lat, min_lon, max_lat, max_lon)
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        lat_step, lon_step = cell_size(precision)
+        rows_cols = [_cell_span(box, lat_step, lon_step) for box in boxes]
+        if sum(len(rows) * len(cols) for rows, cols in rows_cols) > MAX_COVERING_CELLS:
+            continue
+        cells = {
+            encode_geohash(-90.0 + (row + 0.5) * lat_step, -180.0 + (col + 0.5) * lon_step, precision)
+            for rows, cols in rows_cols
+            for row in rows
+            for col in cols
+        }
+        return sorted(cells)
+    return []
+
+
+def _cell_span(box: tuple[float, float, float, float], lat_step: float, lon_step: float) -> tuple[range, range]:
+    min_lat, min_lon, max_lat, max_lon = box
+    max_row = round(180.0 / lat_step) - 1
+    max_col = round(360.0 / lon_step) - 1
+    rows = range(min(max_row, floor((min_lat + 90.0) / lat_step)), min(max_row, floor((max_lat + 90.0) / lat_step)) + 1)
+    cols = range(min(max_col, floor((min_lon + 180.0) / lon_step)), min(max_col, floor((max_lon + 180.0) / lon_step)) + 1)
+    return rows, cols
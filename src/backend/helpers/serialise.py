@@ -0,0 +1,103 @@
+from datetime import date
+from decimal import Decimal
+from functools import cache
+from typing import Any, Iterable, TypeVar, get_args
+from uuid import UUID
+
+import msgpack
+import orjson
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from sqlalchemy import inspect
+from sqlalchemy.orm import InstanceState
+
+from . import get_config
+
+M = TypeVar("M", bound=BaseModel)
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+# bodies chosen by the accept header say so, so shared caches keep the json, msgpack and ndjson bodies apart
+VARY_ACCEPT = {"Vary": "Accept"}
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(value: Any) -> bytes:
+    # orjson writes UUIDs and datetimes itself, decimals are written as strings the way pydantic writes them
+    return orjson.dumps(value, default=_default)
+
+
+def _msgpack_default(value: Any) -> Any:
+    # msgpack has no uuid, decimal or date types, so they are written as the same strings the json bodies carry
+    if isinstance(value, (UUID, Decimal)):
+        return str(value)
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f"Type is not MessagePack serializable: {type(value).__name__}")
+
+
+def packb(value: Any) -> bytes:
+    return msgpack.packb(value, default=_msgpack_default)
+
+
+def wants_msgpack(request: Request) -> bool:
+    return MSGPACK_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+@cache
+def _nested_models(public_model: type[BaseModel]) -> dict[str, type[BaseModel] | None]:
+    # list[ApiaryPublic] and ApiaryPublic | None both nest ApiaryPublic
+    nested = {}
+    for name, field in public_model.model_fields.items():
+        candidates = (field.annotation, *get_args(field.annotation))
+        nested[name] = next((c for c in candidates if isinstance(c, type) and issubclass(c, BaseModel)), None)
+    return nested
+
+
+def _construct(public_model: type[M], values: dict[str, Any]) -> M:
+    nested = _nested_models(public_model)
+    for name, value in values.items():
+        model = nested.get(name)
+        if model is None or value is None or isinstance(value, model):
+            continue
+        if isinstance(value, list):
+            values[name] = [to_public(model, item) for item in value]
+        else:
+            values[name] = to_public(model, value)
+    return public_model.model_construct(**values)
+
+
+def _read(db_object: Any, names: Iterable[str]) -> dict[str, Any]:
+    names = list(names)
+    # a lazy load here would be sync io inside the event loop, so relations must be loaded up front, e.g. by ?expand=
+    state = inspect(db_object, raiseerr=False)
+    if isinstance(state, InstanceState) and (unloaded := state.unloaded.intersection(names)):
+        raise ValueError(f"{type(db_object).__name__} is serialised without loading {', '.join(sorted(unloaded))}")
+    loaded = getattr(db_object, "__dict__", None) or {}
+    return {name: loaded[name] if name in loaded else getattr(db_object, name) for name in names}
+
+
+def to_public(public_model: type[M], db_object: Any, names: Iterable[str] | None = None, **extra: Any) -> M:
+    # db rows were validated on the way in, so by default they are copied into the public model without validating again
+    if names is None:
+        names = (name for name in public_model.model_fields if name not in extra)
+    values = _read(db_object, names)
+    values.update(extra)
+    if get_config().trust_db_rows:
+        return _construct(public_model, values)
+    return public_model.model_validate(values)
+
+
+def public_page(list_model: type[M], **values: Any) -> M:
+    if get_config().trust_db_rows:
+        return list_model.model_construct(**values)
+    return list_model.model_validate(values)
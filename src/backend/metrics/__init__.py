@@ -0,0 +1,22 @@
+from os import getpid
+
+from src.backend.helpers import get_config
+
+# from local files
+from .app_metrics import AppMetrics
+from .middleware import MetricsMiddleware, RequestStats, instrument_engine, request_stats  # noqa: F401
+from .registry import Counter, Gauge, Histogram, MetricsRegistry  # noqa: F401
+
+METRICS_MEDIA_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+app_metrics = None
+
+
+def get_metrics() -> AppMetrics:
+    global app_metrics
+    if app_metrics is None:
+        # each worker counts only the requests it takes and a scrape reaches one of them, so with several workers every
+        # series names its worker and the series of all workers are summed by the query
+        worker = {"worker": str(getpid())} if get_config().server_workers > 1 else {}
+        app_metrics = AppMetrics(worker)
+    return app_metrics
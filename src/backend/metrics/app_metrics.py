@@ -0,0 +1,28 @@
+from .registry import Counter, Gauge, Histogram, MetricsRegistry
+
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class AppMetrics:
+    def __init__(self, const_labels: dict[str, str] | None = None) -> None:
+        self.registry = MetricsRegistry(const_labels)
+        route = ("method", "route")
+        self.requests = self.registry.register(
+            Counter("beekind_http_requests_total", "HTTP requests handled", (*route, "status"))
+        )
+        self.request_seconds = self.registry.register(
+            Histogram("beekind_http_request_duration_seconds", "Time to handle a request, including streaming", route)
+        )
+        self.in_flight = self.registry.register(Gauge("beekind_http_requests_in_flight", "Requests being handled"))
+        self.db_queries = self.registry.register(
+            Histogram("beekind_db_queries_per_request", "DB queries run by a request", route, QUERY_COUNT_BUCKETS)
+        )
+        self.db_seconds = self.registry.register(
+            Histogram("beekind_db_query_duration_seconds_per_request", "Time a request spent in DB queries", route)
+        )
+        self.auth_seconds = self.registry.register(
+            Histogram("beekind_auth_verify_duration_seconds", "Time to verify a bearer token", ("result",))
+        )
+        self.startup_seconds = self.registry.register(
+            Gauge("beekind_startup_phase_duration_seconds", "Time taken by each startup phase", ("phase",))
+        )
@@ -0,0 +1,72 @@
+from contextvars import ContextVar
+from time import perf_counter
+from typing import Any
+
+from sqlalchemy import Engine, event
+
+from .app_metrics import AppMetrics
+
+
+class RequestStats:
+    __slots__ = ("db_queries", "db_seconds")
+
+    def __init__(self) -> None:
+        self.db_queries = 0
+        self.db_seconds = 0.0
+
+
+request_stats: ContextVar[RequestStats | None] = ContextVar("request_stats", default=None)
+
+
+def before_cursor_execute(conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool) -> None:
+    if request_stats.get() is not None:
+        context._query_started = perf_counter()
+
+
+def after_cursor_execute(conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool) -> None:
+    stats = request_stats.get()
+    started = getattr(context, "_query_started", None)
+    if stats is not None and started is not None:
+        stats.db_queries += 1
+        stats.db_seconds += perf_counter() - started
+
+
+def instrument_engine(engine: Engine) -> None:
+    # the async engine runs its queries in greenlets that share the request's context, so one listener covers both
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
+
+
+class MetricsMiddleware:
+    def __init__(self, app: Any, metrics: AppMetrics) -> None:
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope: dict, receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status_code = 500
+
+        async def send_with_status(message: dict) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        stats = RequestStats()
+        token = request_stats.set(stats)
+        self.metrics.in_flight.inc()
+        start = perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = perf_counter() - start
+            self.metrics.in_flight.dec()
+            request_stats.reset(token)
+            # the route template, not the raw path, so ids in urls do not make a label per object
+            labels = (scope["method"], getattr(scope.get("route"), "path", "unmatched"))
+            self.metrics.requests.inc((*labels, str(status_code)))
+            self.metrics.request_seconds.observe(elapsed, labels)
+            self.metrics.db_queries.observe(stats.db_queries, labels)
+            self.metrics.db_seconds.observe(stats.db_seconds, labels)
@@ -1,29 +1,78 @@
-from typing import Annotated, Generator
+from asyncio import Lock
+from typing import Annotated, AsyncGenerator, Generator
 
 from fastapi.params import Depends
-from sqlalchemy import Engine
+from sqlalchemy import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
 from sqlmodel import create_engine, SQLModel, Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from src.backend.helpers import Config, get_config
 
 # from local files
-from .contacts import Contacts, ContactsList, ContactsCreate, ContactsPublic, ContactsPublicWithApiaries  # noqa: F401
+from .contacts import (  # noqa: F401
+    Contacts,
+    ContactsList,
+    ContactsCreate,
+    ContactsBulkCreate,
+    ContactsPublic,
+    ContactsPublicWithApiaries,
+)
 from .organisations import (  # noqa: F401
     Organisations,
     OrganisationsList,
     OrganisationsPublic,
     OrganisationsCreate,
+    OrganisationsBulkCreate,
     OrganisationsPublicWithUsers,
     OrganisationsPublicWithApiaries,
     OrganisationsPublicWithUsersAndApiaries,
 )
 from .user_to_org_link import UserToOrgLink  # noqa: F401
 
-from .users import Users, UsersList, UsersCreate, UsersPublic, UsersPublicWithOrgs  # noqa: F401
-from .apiaries import Apiary, ApiaryList, ApiaryCreate, ApiaryPublic, ApiaryPublicWithContact  # noqa: F401
-from .admin import Token, Credentials  # noqa: F401
+from .users import Users, UsersList, UsersCreate, UsersBulkCreate, UsersPublic, UsersPublicWithOrgs  # noqa: F401
+from .apiaries import (  # noqa: F401
+    Apiary,
+    ApiaryList,
+    ApiaryCreate,
+    ApiaryBulkCreate,
+    ApiaryPublic,
+    ApiaryPublicWithContact,
+    ApiaryPublicWithDistance,
+    ApiaryNearList,
+)
+from .admin import (  # noqa: F401
+    Token,
+    Credentials,
+    RefreshRequest,
+    TokenCacheStats,
+    ResponseCacheStats,
+    DbPoolStats,
+    ProfilingSettings,
+    ProfileInfo,
+    ProfileList,
+    ReadinessReport,
+)
+from .bulk import BulkDelete, BulkDeleteResult, BulkResult, BulkRowResult  # noqa: F401
+from .memberships import Membership, MembershipBatch, MembershipPublic, MembershipsAdded, MembershipsRemoved  # noqa: F401
+from .versions import (  # noqa: F401
+    SyncKind,
+    SyncState,
+    SyncTombstone,
+    change_version,
+    committed_version,
+    prune_tombstones,
+    session_version,
+    transaction_version,
+)
+from .sync import SyncBatch, SyncDeleted  # noqa: F401
+from .search import SearchHit, SearchKind, SearchResults  # noqa: F401
+from .pool import PoolMonitor, configure_engine, engine_options, pool_monitors  # noqa: F401
 
 engine = None
+async_engine = None
+async_engine_lock = Lock()
+ASYNC_DRIVERS = {"sqlite": "aiosqlite", "postgresql": "asyncpg"}
 OrganisationsPublicWithUsers.model_rebuild()
 OrganisationsPublicWithApiaries.model_rebuild()
 OrganisationsPublicWithUsersAndApiaries.model_rebuild()
@@ -35,10 +84,7 @@ def get_db_engine(config: Annotated[Config, Depends(get_config)]) -> Engine:
     global engine
     if engine is not None:
         return engine
-    engine = create_engine(
-        config.db_url,
-        echo=True,
-    )
+    engine = configure_engine(create_engine(config.db_url, **engine_options(config, config.db_url)), config)
     create_db_tables(engine)
     return engine
 
@@ -49,5 +95,52 @@ def get_session(db_engine: Annotated[Engine, Depends(get_db_engine)]) -> Generat
     session.close()
 
 
+def get_async_db_url(config: Config) -> str:
+    if config.async_db_url is not None:
+        return config.async_db_url
+    url = make_url(config.db_url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver known for {backend}, set ASYNC_DB_URL")
+    return url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}").render_as_string(hide_password=False)
+
+
+async def get_async_db_engine(config: Annotated[Config, Depends(get_config)]) -> AsyncEngine:
+    global async_engine
+    if async_engine is not None:
+        return async_engine
+    async with async_engine_lock:
+        if async_engine is None:
+            async_db_url = get_async_db_url(config)
+            new_engine = create_async_engine(async_db_url, **engine_options(config, async_db_url))
+            configure_engine(new_engine.sync_engine, config)
+            async with new_engine.begin() as conn:
+                await conn.run_sync(create_db_tables)
+            async_engine = new_engine
+    return async_engine
+
+
+async def get_async_session(
+    db_engine: Annotated[AsyncEngine, Depends(get_async_db_engine)],
+) -> AsyncGenerator[AsyncSession, None]:
+    # objects are handed to the response serialiser after commit, so they must not expire and lazy load outside the loop
+    session = AsyncSession(db_engine, expire_on_commit=False)
+    try:
+        yield session
+    finally:
+        # also when the route raises, or the connection is only given back to the pool once it is garbage collected
+        await session.close()
+
+
+async def dispose_db_engines() -> None:
+    global engine, async_engine
+    if async_engine is not None:
+        await async_engine.dispose()
+        async_engine = None
+    if engine is not None:
+        engine.dispose()
+        engine = None
+
+
 def create_db_tables(eng) -> None:
     SQLModel.metadata.create_all(eng)
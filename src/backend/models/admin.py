@@ -1,3 +1,7 @@
+from datetime import datetime
+from typing import Annotated
+
+from pydantic import computed_field
 from sqlmodel import SQLModel, Field
 
 
@@ -22,3 +26,101 @@ class Token(SQLModel):
 class Credentials(SQLModel):
     username: str = Field(..., description="The username of the user", schema_extra={"examples": ["crobin"]})
     password: str = Field(..., description="The password of the user", schema_extra={"examples": ["<<PASSWORD>>"]})
+
+
+class RefreshRequest(SQLModel):
+    refresh_token: str = Field(
+        ...,
+        description="The refresh token returned with the current access token",
+        schema_extra={"examples": ["eyXXXX.eyYYYY.eyZZZZ"]},
+    )
+
+
+class TokenCacheStats(SQLModel):
+    size: int = Field(..., ge=0, description="Number of verified tokens held", schema_extra={"examples": [12]})
+    max_size: int = Field(..., ge=0, description="Max number of verified tokens held", schema_extra={"examples": [4096]})
+    hits: int = Field(..., ge=0, description="Lookups answered from the cache", schema_extra={"examples": [340]})
+    misses: int = Field(..., ge=0, description="Lookups that needed a signature check", schema_extra={"examples": [12]})
+
+
+class ResponseCacheStats(SQLModel):
+    size: int = Field(..., ge=0, description="Number of cached responses held", schema_extra={"examples": [87]})
+    hits: int = Field(..., ge=0, description="Lookups answered from the cache", schema_extra={"examples": [1520]})
+    misses: int = Field(..., ge=0, description="Lookups that had to query the db", schema_extra={"examples": [87]})
+
+
+class DbPoolStats(SQLModel):
+    dialect: str = Field(..., description="The database dialect", schema_extra={"examples": ["postgresql"]})
+    pool_class: str = Field(
+        ..., description="The connection pool in use", schema_extra={"examples": ["AsyncAdaptedQueuePool"]}
+    )
+    size: int | None = Field(None, description="Connections the pool keeps open", schema_extra={"examples": [5]})
+    checked_in: int | None = Field(None, description="Idle connections in the pool", schema_extra={"examples": [3]})
+    checked_out: int = Field(..., ge=0, description="Connections in use", schema_extra={"examples": [2]})
+    overflow: int | None = Field(None, description="Connections open beyond the pool size", schema_extra={"examples": [0]})
+    connections_opened: int = Field(..., ge=0, description="Connections opened since start", schema_extra={"examples": [5]})
+    checkouts: int = Field(..., ge=0, description="Connections handed out since start", schema_extra={"examples": [1200]})
+    peak_checked_out: int = Field(..., ge=0, description="Most connections in use at once", schema_extra={"examples": [4]})
+
+
+class ProfilingSettings(SQLModel):
+    enabled: bool = Field(False, description="Whether requests are being profiled", schema_extra={"examples": [True]})
+    route: str | None = Field(
+        None,
+        description="Only profile this route template, all routes if unset",
+        schema_extra={"examples": ["/resource/apiary/{apiary_id}"]},
+    )
+    method: str | None = Field(None, description="Only profile this HTTP method", schema_extra={"examples": ["GET"]})
+    sample_rate: float = Field(
+        1.0, gt=0, le=1, description="Fraction of matching requests to profile", schema_extra={"examples": [0.1]}
+    )
+    interval_ms: float = Field(
+        5.0, ge=0.5, le=1000, description="Milliseconds between stack samples", schema_extra={"examples": [5.0]}
+    )
+
+
+class ProfileInfo(SQLModel):
+    profile_id: str = Field(
+        ..., description="ID of the saved profile", schema_extra={"examples": ["20261017T122440-GET-3f2a9c1b"]}
+    )
+    name: str = Field(..., description="Method and route profiled", schema_extra={"examples": ["GET /resource/apiary/"]})
+    created: datetime = Field(..., description="When the profile was saved")
+    duration_ms: float = Field(..., ge=0, description="Length of the profiled request", schema_extra={"examples": [48.2]})
+    samples: int = Field(..., ge=0, description="Stack samples taken", schema_extra={"examples": [10]})
+
+
+class ProfileList(SQLModel):
+    profiles: list[ProfileInfo] = Field(description="Saved profiles, newest first")
+
+    @computed_field
+    @property
+    def count(self) -> Annotated[int, Field(description="Number of profiles", schema_extra={"examples": [1]})]:
+        return len(self.profiles)
+
+
+class ReadinessReport(SQLModel):
+    ready: bool = Field(..., description="Whether every warm up step has finished", schema_extra={"examples": [True]})
+    phases: dict[str, float] = Field(
+        ...,
+        description="Seconds taken by each startup phase finished so far, in the order they ran",
+        schema_extra={
+            "examples": [
+                {
+                    "import_fastapi": 0.349,
+                    "import_models": 0.397,
+                    "import_auth": 0.071,
+                    "import_routers": 0.334,
+                    "import_api": 0.001,
+                    "import": 1.152,
+                    "create_api": 0.061,
+                    "db_engine": 0.034,
+                    "openapi": 0.587,
+                }
+            ]
+        },
+    )
+    failing: str | None = Field(
+        None,
+        description="The warm up step being retried and why it last failed",
+        schema_extra={"examples": ["signing_keys: JWKSError: Could not load the JWKS"]},
+    )
@@ -3,9 +3,12 @@ from typing import Annotated
 from uuid import UUID, uuid4
 
 from pydantic import computed_field
+from sqlalchemy.engine.default import DefaultExecutionContext
 from sqlmodel import SQLModel, Field, Relationship
 
+from src.backend.helpers.geo import encode_geohash
 from . import Organisations, Contacts
+from .versions import version_field
 
 
 class ApiaryBase(SQLModel):
@@ -14,22 +17,26 @@ class ApiaryBase(SQLModel):
         description="Organization ID",
         schema_extra={"examples": ["12345678-1234-1234-1234-123456789012"]},
         foreign_key="organisations.org_id",
+        ondelete="SET NULL",
+        index=True,
     )
     contact_id: UUID | None = Field(
         default=None,
         description="Contact ID",
         schema_extra={"examples": ["12345678-1234-1234-1234-123456789012"]},
         foreign_key="contacts.contact_id",
+        ondelete="SET NULL",
+        index=True,
     )
     site_lat: Decimal = Field(
-        default=0,
+        default=Decimal(0),
         max_digits=9,
         decimal_places=7,
         description="Site latitude",
         schema_extra={"examples": [51.8741900]},
     )
     site_lon: Decimal = Field(
-        default=0,
+        default=Decimal(0),
         max_digits=10,
         decimal_places=7,
         description="Site longitude",
@@ -39,6 +46,7 @@ class ApiaryBase(SQLModel):
         ...,
         description="Name of the Apiary",
         schema_extra={"examples": ["Pooh Corner"]},
+        index=True,
     )
     apiary_notes: str | None = Field(
         None,
@@ -47,6 +55,12 @@ class ApiaryBase(SQLModel):
     )
 
 
+def site_geohash_default(context: DefaultExecutionContext) -> str:
+    # a column default rather than an ORM event so Core bulk inserts and upserts get the geohash too
+    params = context.get_current_parameters()
+    return encode_geohash(float(params["site_lat"]), float(params["site_lon"]))
+
+
 class Apiary(ApiaryBase, table=True):
     __tablename__ = "apiary"
     apiary_id: UUID = Field(
@@ -55,6 +69,15 @@ class Apiary(ApiaryBase, table=True):
         schema_extra={"examples": ["12345678-1234-1234-1234-123456789012"]},
         primary_key=True,
     )
+    site_geohash: str | None = Field(
+        default=None,
+        max_length=12,
+        index=True,
+        description="Geohash of the site, indexed for radius and bounding box searches",
+        schema_extra={"examples": ["gcpn7z2fm"]},
+        sa_column_kwargs={"default": site_geohash_default},
+    )
+    version: int | None = version_field()
     contact: Contacts | None = Relationship(back_populates="apiaries")
     organisation: Organisations | None = Relationship(back_populates="apiaries")
 
@@ -63,6 +86,14 @@ class ApiaryCreate(ApiaryBase):
     pass
 
 
+class ApiaryBulkCreate(ApiaryCreate):
+    apiary_id: UUID | None = Field(
+        None,
+        description="Internal ID of Apiary, generated if unset and used as the conflict key for upserts",
+        schema_extra={"examples": ["12345678-1234-1234-1234-123456789012"]},
+    )
+
+
 class ApiaryPublic(ApiaryBase):
     apiary_id: UUID = Field(
         ...,
@@ -75,8 +106,31 @@ class ApiaryPublicWithContact(ApiaryPublic):
     contact: type["ContactsPublic"] | None = None  # noqa: F821
 
 
+class ApiaryPublicWithDistance(ApiaryPublic):
+    distance_km: float = Field(
+        ...,
+        ge=0,
+        description="Great circle distance from the search point in km",
+        schema_extra={"examples": [1.25]},
+    )
+
+
+class ApiaryNearList(SQLModel):
+    apiaries: list[ApiaryPublicWithDistance] = Field(description="Apiaries ordered by distance from the search point")
+
+    @computed_field
+    @property
+    def count(self) -> Annotated[int, Field(description="Number of apiaries", schema_extra={"examples": [1]})]:
+        return len(self.apiaries)
+
+
 class ApiaryList(SQLModel):
     apiaries: list[ApiaryPublic] = Field(description="List of Apiary objects")
+    next_cursor: str | None = Field(
+        None,
+        description="Cursor for the next page, null on the last page",
+        schema_extra={"examples": ["EjRWeBI0EjQSNBI0VniQEg"]},
+    )
 
     @computed_field
     @property
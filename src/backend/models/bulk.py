@@ -0,0 +1,53 @@
+from typing import Annotated, Literal
+from uuid import UUID
+
+from pydantic import computed_field
+from sqlmodel import SQLModel, Field
+
+# keeps the id lists of bulk and batch requests, and the search index's (kind, id) pairs, within the bind parameter
+# limits of sqlite and postgres
+BULK_MAX_IDS = 5000
+
+
+class BulkRowResult(SQLModel):
+    index: int = Field(..., ge=0, description="Position of the row in the request", schema_extra={"examples": [0]})
+    status: Literal["created", "upserted", "invalid", "failed"] = Field(
+        ..., description="What happened to the row", schema_extra={"examples": ["created"]}
+    )
+    id: UUID | None = Field(
+        None,
+        description="Internal ID of the written row",
+        schema_extra={"examples": ["12345678-1234-1234-1234-123456789012"]},
+    )
+    detail: str | None = Field(
+        None, description="Why the row was not written", schema_extra={"examples": ["name: Field required"]}
+    )
+
+
+class BulkResult(SQLModel):
+    results: list[BulkRowResult] = Field(description="Result for each row, in request order")
+
+    @computed_field
+    @property
+    def written(self) -> Annotated[int, Field(description="Number of rows written", schema_extra={"examples": [1]})]:
+        return sum(1 for result in self.results if result.status in ("created", "upserted"))
+
+    @computed_field
+    @property
+    def rejected(self) -> Annotated[int, Field(description="Number of rows not written", schema_extra={"examples": [0]})]:
+        return len(self.results) - self.written
+
+
+class BulkDelete(SQLModel):
+    ids: list[UUID] = Field(
+        ...,
+        min_length=1,
+        max_length=BULK_MAX_IDS,
+        description="Internal IDs of the rows to delete",
+        schema_extra={"examples": [["12345678-1234-1234-1234-123456789012"]]},
+    )
+
+
+class BulkDeleteResult(SQLModel):
+    deleted: list[UUID] = Field(description="IDs that were deleted, in request order")
+    missing: list[UUID] = Field(description="IDs with no row to delete, in request order")
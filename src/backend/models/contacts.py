@@ -4,12 +4,24 @@ from uuid import UUID, uuid4
 from pydantic import computed_field
 from sqlmodel import Field, SQLModel, Relationship
 
+# from local files
+from .versions import version_field
+
 
 class ContactsBase(SQLModel):
+    org_id: UUID | None = Field(
+        default=None,
+        description="Organization ID of the org that owns the Contact",
+        schema_extra={"examples": ["12345678-1234-1234-1234-123456789012"]},
+        foreign_key="organisations.org_id",
+        ondelete="SET NULL",
+        index=True,
+    )
     name: str = Field(
         ...,
         description="Name of the Contact",
         schema_extra={"examples": ["Winnie the Pooh"]},
+        index=True,
     )
     phone: str | None = Field(
         None,
@@ -46,14 +58,23 @@ class Contacts(ContactsBase, table=True):
         schema_extra={"examples": ["12345678-1234-1234-1234-123456789012"]},
         primary_key=True,
     )
+    version: int | None = version_field()
 
-    apiaries: list["Apiary"] = Relationship(back_populates="contact")  # noqa: F821
+    apiaries: list["Apiary"] = Relationship(back_populates="contact", passive_deletes=True)  # noqa: F821
 
 
 class ContactsCreate(ContactsBase):
     pass
 
 
+class ContactsBulkCreate(ContactsCreate):
+    contact_id: UUID | None = Field(
+        None,
+        description="Internal ID of Contact, generated if unset and used as the conflict key for upserts",
+        schema_extra={"examples": ["12345678-1234-1234-1234-123456789012"]},
+    )
+
+
 class ContactsPublic(ContactsBase):
     contact_id: UUID = Field(
         ...,
@@ -68,6 +89,11 @@ class ContactsPublicWithApiaries(ContactsPublic):
 
 class ContactsList(SQLModel):
     contacts: list[ContactsPublic] = Field(description="List of Contacts objects")
+    next_cursor: str | None = Field(
+        None,
+        description="Cursor for the next page, null on the last page",
+        schema_extra={"examples": ["EjRWeBI0EjQSNBI0VniQEg"]},
+    )
 
     @computed_field
     @property
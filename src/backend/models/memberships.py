@@ -0,0 +1,40 @@
+from uuid import UUID
+
+from sqlmodel import SQLModel, Field
+
+# from local files
+from .bulk import BULK_MAX_IDS
+
+
+class MembershipPublic(SQLModel):
+    user_id: UUID = Field(
+        ..., description="Internal ID of the user", schema_extra={"examples": ["12345678-1234-1234-1234-123456789012"]}
+    )
+    org_id: UUID = Field(
+        ..., description="Internal ID of the org", schema_extra={"examples": ["12345678-1234-1234-1234-123456789012"]}
+    )
+
+
+class Membership(MembershipPublic):
+    added: bool = Field(..., description="False if the user was already a member", schema_extra={"examples": [True]})
+
+
+class MembershipBatch(SQLModel):
+    user_ids: list[UUID] = Field(
+        ...,
+        min_length=1,
+        max_length=BULK_MAX_IDS,
+        description="Internal IDs of the users",
+        schema_extra={"examples": [["12345678-1234-1234-1234-123456789012"]]},
+    )
+
+
+class MembershipsAdded(SQLModel):
+    added: list[UUID] = Field(description="Users added to the org, in request order")
+    already_members: list[UUID] = Field(description="Users that were already members, in request order")
+    missing: list[UUID] = Field(description="IDs with no user, in request order")
+
+
+class MembershipsRemoved(SQLModel):
+    removed: list[UUID] = Field(description="Users removed from the org, in request order")
+    not_members: list[UUID] = Field(description="Users that were not members, in request order")
@@ -6,6 +6,7 @@ from sqlmodel import SQLModel, Field, Relationship
 
 # from local files
 from .user_to_org_link import UserToOrgLink
+from .versions import version_field
 
 
 class OrganisationsBase(SQLModel):
@@ -24,14 +25,24 @@ class Organisations(OrganisationsBase, table=True):
         schema_extra={"examples": ["12345678-1234-1234-1234-123456789012"]},
         primary_key=True,
     )
-    users: list["Users"] = Relationship(back_populates="orgs", link_model=UserToOrgLink)  # noqa: F821
-    apiaries: list["Apiary"] = Relationship(back_populates="organisation")  # noqa: F821
+    version: int | None = version_field()
+    # the database clears the links and apiaries that refer to a deleted org, so the ORM leaves them alone
+    users: list["Users"] = Relationship(back_populates="orgs", link_model=UserToOrgLink, passive_deletes=True)  # noqa: F821
+    apiaries: list["Apiary"] = Relationship(back_populates="organisation", passive_deletes=True)  # noqa: F821
 
 
 class OrganisationsCreate(OrganisationsBase):
     pass
 
 
+class OrganisationsBulkCreate(OrganisationsCreate):
+    org_id: UUID | None = Field(
+        None,
+        description="Internal ID of org, generated if unset and used as the conflict key for upserts",
+        schema_extra={"examples": ["12345678-1234-1234-1234-123456789012"]},
+    )
+
+
 class OrganisationsPublic(OrganisationsBase):
     org_id: UUID = Field(
         ...,
@@ -54,6 +65,11 @@ class OrganisationsPublicWithUsersAndApiaries(OrganisationsPublicWithUsers, Orga
 
 class OrganisationsList(SQLModel):
     orgs: list[OrganisationsPublic] = Field(description="List of organisations objects")
+    next_cursor: str | None = Field(
+        None,
+        description="Cursor for the next page, null on the last page",
+        schema_extra={"examples": ["EjRWeBI0EjQSNBI0VniQEg"]},
+    )
 
     @computed_field
     @property
@@ -0,0 +1,102 @@
+from threading import Lock
+from typing import Any, Callable
+from weakref import WeakKeyDictionary
+
+from sqlalchemy import Engine, event, make_url
+
+from src.backend.helpers import Config
+from src.backend.metrics import instrument_engine
+
+from .admin import DbPoolStats
+
+pool_monitors: WeakKeyDictionary[Engine, "PoolMonitor"] = WeakKeyDictionary()
+
+
+def is_memory_sqlite(db_url: str) -> bool:
+    url = make_url(db_url)
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+
+def engine_options(config: Config, db_url: str) -> dict[str, Any]:
+    options: dict[str, Any] = {"echo": config.db_echo}
+    # an in-memory sqlite db lives in a single connection, so its pool cannot be sized
+    if not is_memory_sqlite(db_url):
+        options.update(
+            pool_size=config.db_pool_size,
+            max_overflow=config.db_max_overflow,
+            pool_timeout=config.db_pool_timeout,
+            pool_recycle=config.db_pool_recycle,
+            pool_pre_ping=config.db_pool_pre_ping,
+        )
+    return options
+
+
+def sqlite_pragmas(config: Config) -> Callable[[Any, Any], None]:
+    pragmas = {
+        "journal_mode": config.sqlite_journal_mode,
+        "synchronous": config.sqlite_synchronous,
+        "mmap_size": config.sqlite_mmap_size,
+        "busy_timeout": config.sqlite_busy_timeout,
+        "cache_size": config.sqlite_cache_size,
+        "foreign_keys": "ON" if config.sqlite_foreign_keys else "OFF",
+    }
+
+    def set_pragmas(dbapi_connection: Any, connection_record: Any) -> None:
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+    return set_pragmas
+
+
+class PoolMonitor:
+    def __init__(self, engine: Engine) -> None:
+        self.engine = engine
+        self.connections_opened = 0
+        self.checkouts = 0
+        self.checked_out = 0
+        self.peak_checked_out = 0
+        self._lock = Lock()
+        event.listen(engine, "connect", self.on_connect)
+        event.listen(engine, "checkout", self.on_checkout)
+        event.listen(engine, "checkin", self.on_checkin)
+
+    def on_connect(self, dbapi_connection: Any, connection_record: Any) -> None:
+        with self._lock:
+            self.connections_opened += 1
+
+    def on_checkout(self, dbapi_connection: Any, connection_record: Any, connection_proxy: Any) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.checked_out += 1
+            self.peak_checked_out = max(self.peak_checked_out, self.checked_out)
+
+    def on_checkin(self, dbapi_connection: Any, connection_record: Any) -> None:
+        with self._lock:
+            self.checked_out = max(0, self.checked_out - 1)
+
+    def stats(self) -> DbPoolStats:
+        pool = self.engine.pool
+        # only queue pools are sized, the single connection pools used for sqlite memory dbs report no size
+        sized = hasattr(pool, "checkedin")
+        return DbPoolStats(
+            dialect=self.engine.dialect.name,
+            pool_class=type(pool).__name__,
+            size=pool.size() if sized else None,
+            checked_in=pool.checkedin() if sized else None,
+            checked_out=self.checked_out,
+            overflow=pool.overflow() if sized else None,
+            connections_opened=self.connections_opened,
+            checkouts=self.checkouts,
+            peak_checked_out=self.peak_checked_out,
+        )
+
+
+def configure_engine(engine: Engine, config: Config) -> Engine:
+    if engine.dialect.name == "sqlite":
+        event.listen(engine, "connect", sqlite_pragmas(config))
+    if config.metrics_enabled:
+        instrument_engine(engine)
+    pool_monitors[engine] = PoolMonitor(engine)
+    return engine
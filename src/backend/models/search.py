@@ -0,0 +1,37 @@
+from typing import Annotated, Literal
+from uuid import UUID
+
+from pydantic import computed_field
+from sqlmodel import SQLModel, Field
+
+SearchKind = Literal["apiary", "contact"]
+
+
+class SearchHit(SQLModel):
+    kind: SearchKind = Field(..., description="The kind of object matched", schema_extra={"examples": ["contact"]})
+    id: UUID = Field(
+        ...,
+        description="Internal ID of the matched object",
+        schema_extra={"examples": ["12345678-1234-1234-1234-123456789012"]},
+    )
+    name: str = Field(..., description="Name of the matched object", schema_extra={"examples": ["Winnie the Pooh"]})
+    score: float = Field(..., description="Relevance of the match, higher is better", schema_extra={"examples": [4.2]})
+    snippet: str | None = Field(
+        None,
+        description="Matched text with the terms in [brackets], null if the backend cannot highlight",
+        schema_extra={"examples": ["Only call late in the morning after [Winne] has had time to wake up…"]},
+    )
+
+
+class SearchResults(SQLModel):
+    results: list[SearchHit] = Field(description="Matches, most relevant first")
+    next_cursor: str | None = Field(
+        None,
+        description="Cursor for the next page, null on the last page",
+        schema_extra={"examples": ["MTAw"]},
+    )
+
+    @computed_field
+    @property
+    def count(self) -> Annotated[int, Field(description="Number of matches", schema_extra={"examples": [1]})]:
+        return len(self.results)
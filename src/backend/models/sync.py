@@ -0,0 +1,42 @@
+from uuid import UUID
+
+from sqlmodel import SQLModel, Field
+
+# from local files
+from .apiaries import ApiaryPublic
+from .contacts import ContactsPublic
+from .memberships import MembershipPublic
+from .organisations import OrganisationsPublic
+from .users import UsersPublic
+
+
+class SyncDeleted(SQLModel):
+    orgs: list[UUID] = Field([], description="Internal IDs of deleted orgs")
+    users: list[UUID] = Field([], description="Internal IDs of deleted users")
+    memberships: list[MembershipPublic] = Field([], description="Users that left orgs")
+    contacts: list[UUID] = Field([], description="Internal IDs of deleted contacts")
+    apiaries: list[UUID] = Field([], description="Internal IDs of deleted apiaries")
+
+
+class SyncBatch(SQLModel):
+    reset: bool = Field(
+        ...,
+        description="True if the batch starts again from nothing, so anything held from earlier syncs should be dropped",
+        schema_extra={"examples": [False]},
+    )
+    orgs: list[OrganisationsPublic] = Field([], description="Orgs created or changed")
+    users: list[UsersPublic] = Field([], description="Users created or changed")
+    memberships: list[MembershipPublic] = Field([], description="Users that joined orgs")
+    contacts: list[ContactsPublic] = Field([], description="Contacts created or changed")
+    apiaries: list[ApiaryPublic] = Field([], description="Apiaries created or changed")
+    deleted: SyncDeleted = Field(
+        default_factory=SyncDeleted, description="Rows deleted, to apply before the rows created or changed"
+    )
+    token: str = Field(
+        ..., description="Pass as `since` to get the changes after this batch", schema_extra={"examples": ["WzQyLCJhbGwiXQ"]}
+    )
+    more: bool = Field(
+        ...,
+        description="True if there are more changes to fetch with the token straight away",
+        schema_extra={"examples": [False]},
+    )
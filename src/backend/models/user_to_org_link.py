@@ -1,10 +1,18 @@
 from uuid import UUID
 
+from sqlalchemy import Index
 from sqlmodel import SQLModel, Field
 
+# from local files
+from .versions import version_field
+
 
 class UserToOrgLink(SQLModel, table=True):
     __tablename__ = "user_to_org_link"
+    # the primary key index leads with user_id, so lookups by org and pages of an org's members, which are keyed on
+    # user_id, need one leading with org_id
+    __table_args__ = (Index("ix_user_to_org_link_org_id_user_id", "org_id", "user_id"),)
 
-    user_id: UUID = Field(default=None, foreign_key="users.user_id", primary_key=True)
-    org_id: UUID = Field(default=None, foreign_key="organisations.org_id", primary_key=True)
+    user_id: UUID = Field(default=None, foreign_key="users.user_id", ondelete="CASCADE", primary_key=True)
+    org_id: UUID = Field(default=None, foreign_key="organisations.org_id", ondelete="CASCADE", primary_key=True)
+    version: int | None = version_field()
@@ -6,6 +6,7 @@ from sqlmodel import SQLModel, Field, Relationship
 
 # from local files
 from .user_to_org_link import UserToOrgLink
+from .versions import version_field
 
 
 class UsersBase(SQLModel):
@@ -24,14 +25,25 @@ class Users(UsersBase, table=True):
         schema_extra={"examples": ["12345678-1234-1234-1234-123456789012"]},
         primary_key=True,
     )
+    version: int | None = version_field()
 
-    orgs: list["Organisations"] = Relationship(back_populates="users", link_model=UserToOrgLink)  # noqa: F821
+    orgs: list["Organisations"] = Relationship(  # noqa: F821
+        back_populates="users", link_model=UserToOrgLink, passive_deletes=True
+    )
 
 
 class UsersCreate(UsersBase):
     pass
 
 
+class UsersBulkCreate(UsersCreate):
+    user_id: UUID | None = Field(
+        None,
+        description="Internal ID of User, generated if unset and used as the conflict key for upserts",
+        schema_extra={"examples": ["12345678-1234-1234-1234-123456789012"]},
+    )
+
+
 class UsersPublic(UsersBase):
     user_id: UUID = Field(
         ...,
@@ -46,6 +58,11 @@ class UsersPublicWithOrgs(UsersPublic):
 
 class UsersList(SQLModel):
     users: list[UsersPublic] = Field(description="List of Users objects")
+    next_cursor: str | None = Field(
+        None,
+        description="Cursor for the next page, null on the last page",
+        schema_extra={"examples": ["EjRWeBI0EjQSNBI0VniQEg"]},
+    )
 
     @computed_field
     @property
@@ -0,0 +1,93 @@
+from datetime import datetime, timedelta, timezone
+from typing import Any, Literal
+from uuid import UUID
+
+from sqlalchemy import DDL, BigInteger, Connection, ColumnElement, DateTime, delete, event, func, select, update
+from sqlalchemy.engine.default import DefaultExecutionContext
+from sqlmodel import SQLModel, Field
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+SyncKind = Literal["orgs", "users", "memberships", "contacts", "apiaries"]
+
+
+class SyncState(SQLModel, table=True):
+    __tablename__ = "sync_state"
+    id: int = Field(default=1, primary_key=True)
+    version: int = Field(0, sa_type=BigInteger, description="Change version of the last write, on sqlite only")
+    oldest_version: int = Field(
+        0, sa_type=BigInteger, description="Sync tokens older than this start again, as the deletes before it are gone"
+    )
+
+
+event.listen(SyncState.__table__, "after_create", DDL("INSERT INTO sync_state (id, version, oldest_version) VALUES (1, 0, 0)"))
+
+
+def transaction_version(connection: Connection) -> int:
+    # every row a transaction writes gets the same version, looked up once per transaction
+    transaction = connection.get_transaction()
+    current = connection.info.get("change_version")
+    if current is not None and current[0] is transaction:
+        return current[1]
+    if connection.dialect.name == "postgresql":
+        # the transaction's own id, handed out without taking a lock that concurrent writers would queue on. They can
+        # commit out of id order, so sync only reads up to the oldest one still running, see committed_version
+        version = connection.execute(select(func.txid_current())).scalar_one()
+    else:
+        # sqlite takes one writer at a time anyway, so a counter bumped once per write transaction is in commit order
+        statement = update(SyncState).values(version=SyncState.version + 1).returning(SyncState.version)
+        version = connection.execute(statement).scalar_one()
+    connection.info["change_version"] = (transaction, version)
+    return version
+
+
+def change_version(context: DefaultExecutionContext) -> int:
+    # a column default rather than an ORM event so Core bulk writes and set based updates are versioned too
+    return transaction_version(context.connection)
+
+
+async def session_version(db: AsyncSession) -> int:
+    return await db.run_sync(lambda session: transaction_version(session.connection()))
+
+
+def committed_version(dialect: str) -> ColumnElement:
+    # the highest version below which no write can still commit
+    if dialect == "postgresql":
+        return func.txid_snapshot_xmin(func.txid_current_snapshot()) - 1
+    return SyncState.version
+
+
+def version_field() -> Any:
+    return Field(
+        default=None,
+        sa_type=BigInteger,
+        index=True,
+        description="Change version of the last write to the row, for /resource/sync",
+        sa_column_kwargs={"default": change_version, "onupdate": change_version},
+    )
+
+
+class SyncTombstone(SQLModel, table=True):
+    __tablename__ = "sync_tombstones"
+    tombstone_id: int | None = Field(default=None, primary_key=True)
+    kind: str = Field(..., description="Kind of the deleted row")
+    object_id: UUID = Field(..., description="Internal ID of the deleted row, the user_id of a membership")
+    # scopes the tombstone like the row was, users and contacts belong to no org
+    org_id: UUID | None = Field(None, description="Org of the deleted row")
+    version: int | None = version_field()
+    deleted_at: datetime = Field(
+        default_factory=lambda: datetime.now(timezone.utc),
+        sa_type=DateTime(timezone=True),
+        description="When the row was deleted, tombstones are pruned after the sync retention",
+    )
+
+
+async def prune_tombstones(db: AsyncSession, retention: timedelta) -> int:
+    # whole versions are pruned and tokens from before them start again, so no client is left missing a delete
+    async with db.begin():
+        expired = SyncTombstone.deleted_at < datetime.now(timezone.utc) - retention
+        cutoff = await db.scalar(select(func.max(SyncTombstone.version)).where(expired))
+        if cutoff is None:
+            return 0
+        pruned = await db.execute(delete(SyncTombstone).where(SyncTombstone.version <= cutoff))
+        await db.execute(update(SyncState).where(SyncState.oldest_version < cutoff).values(oldest_version=cutoff))
+    return pruned.rowcount
@@ -0,0 +1,19 @@
+from pathlib import Path
+from typing import Annotated
+
+from fastapi import Depends
+
+from src.backend.helpers import Config, get_config
+
+# from local files
+from .middleware import ProfilingMiddleware  # noqa: F401
+from .profiler import PROFILE_FORMATS, ProfileFormat, SamplingProfiler  # noqa: F401
+
+profiler = None
+
+
+def get_profiler(config: Annotated[Config, Depends(get_config)]) -> SamplingProfiler:
+    global profiler
+    if profiler is None:
+        profiler = SamplingProfiler(Path(config.profile_dir), config.profile_max_files)
+    return profiler
@@ -0,0 +1,42 @@
+import json
+from collections import Counter
+
+Frame = tuple[str, str, int]
+Stack = tuple[Frame, ...]
+
+
+def frame_label(frame: Frame) -> str:
+    name, filename, line = frame
+    return f"{name} ({filename}:{line})"
+
+
+def collapsed(stacks: list[Stack]) -> str:
+    # one line per distinct stack, root first, as read by flamegraph.pl, inferno and speedscope
+    counts = Counter(stacks)
+    return "".join(f"{';'.join(frame_label(frame) for frame in stack)} {count}\n" for stack, count in counts.items())
+
+
+def speedscope(name: str, stacks: list[Stack], weights: list[float], duration: float) -> str:
+    frames: dict[Frame, int] = {}
+    samples = [[frames.setdefault(frame, len(frames)) for frame in stack] for stack in stacks]
+    return json.dumps(
+        {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "beekind",
+            "shared": {
+                "frames": [{"name": frame[0], "file": frame[1], "line": frame[2]} for frame in frames],
+            },
+            "profiles": [
+                {
+                    "type": "sampled",
+                    "name": name,
+                    "unit": "seconds",
+                    "startValue": 0,
+                    "endValue": duration,
+                    "samples": samples,
+                    "weights": weights,
+                }
+            ],
+        }
+    )
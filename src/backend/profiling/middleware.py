@@ -0,0 +1,25 @@
+import asyncio
+from typing import Any
+
+from .profiler import SamplingProfiler
+
+
+class ProfilingMiddleware:
+    def __init__(self, app: Any, profiler: SamplingProfiler) -> None:
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope: dict, receive: Any, send: Any) -> None:
+        # a single flag check is all an unprofiled request pays
+        if scope["type"] != "http" or not self.profiler.settings.enabled or not self.profiler.wants(scope):
+            await self.app(scope, receive, send)
+            return
+        profile = self.profiler.start(f"{scope['method']} {scope['path']}")
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            duration = self.profiler.stop(profile)
+            route = getattr(scope.get("route"), "path", None)
+            if route is not None:
+                profile.name = f"{scope['method']} {route}"
+            await asyncio.to_thread(self.profiler.save, profile, duration)
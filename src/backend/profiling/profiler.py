@@ -0,0 +1,156 @@
+import asyncio
+import json
+import re
+import sys
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from random import random
+from time import perf_counter, sleep
+from types import FrameType
+from typing import Literal
+from uuid import uuid4
+
+from starlette.routing import compile_path
+
+from src.backend.models import ProfileInfo, ProfilingSettings
+from .formats import Stack, collapsed, speedscope
+
+# samples taken while the request's task is suspended, e.g. waiting on the db or while other requests run
+NOT_RUNNING: Stack = (("(request not running)", "", 0),)
+PROFILE_ID = re.compile(r"^[\w-]+$")
+ProfileFormat = Literal["speedscope", "collapsed"]
+PROFILE_FORMATS: dict[ProfileFormat, str] = {"speedscope": ".speedscope.json", "collapsed": ".collapsed"}
+
+
+@dataclass(eq=False)
+class ActiveProfile:
+    name: str
+    task: asyncio.Task
+    loop: asyncio.AbstractEventLoop
+    thread_id: int
+    interval: float
+    started: float = field(default_factory=perf_counter)
+    stacks: list[Stack] = field(default_factory=list)
+    weights: list[float] = field(default_factory=list)
+    last_sample: float = 0.0
+
+
+def stack_of(frame: FrameType | None) -> Stack:
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+        frame = frame.f_back
+    return tuple(reversed(stack))
+
+
+class SamplingProfiler:
+    def __init__(self, profile_dir: Path, max_profiles: int) -> None:
+        self.profile_dir = profile_dir
+        self.max_profiles = max_profiles
+        self.settings = ProfilingSettings()
+        self._route_regex: re.Pattern | None = None
+        self._active: set[ActiveProfile] = set()
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    def configure(self, settings: ProfilingSettings) -> None:
+        self._route_regex = compile_path(settings.route)[0] if settings.route is not None else None
+        self.settings = settings
+
+    def wants(self, scope: dict) -> bool:
+        settings = self.settings
+        if settings.method is not None and scope["method"] != settings.method.upper():
+            return False
+        if self._route_regex is not None and self._route_regex.match(scope["path"]) is None:
+            return False
+        return random() < settings.sample_rate
+
+    def start(self, name: str) -> ActiveProfile:
+        profile = ActiveProfile(
+            name=name,
+            task=asyncio.current_task(),
+            loop=asyncio.get_running_loop(),
+            thread_id=threading.get_ident(),
+            interval=self.settings.interval_ms / 1000,
+        )
+        with self._lock:
+            self._active.add(profile)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._sample, name="request-profiler", daemon=True)
+                self._thread.start()
+        return profile
+
+    def stop(self, profile: ActiveProfile) -> float:
+        with self._lock:
+            self._active.discard(profile)
+        return perf_counter() - profile.started
+
+    def _sample(self) -> None:
+        # one thread samples every profiled request and exits when none are left, so nothing runs while profiling is off.
+        # The GIL switch interval is shortened meanwhile, or this thread only wakes every 5ms of busy event loop
+        switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(min(switch_interval, self.settings.interval_ms / 1000))
+        while True:
+            with self._lock:
+                if not self._active:
+                    self._thread = None
+                    sys.setswitchinterval(switch_interval)
+                    return
+                profiles = list(self._active)
+            frames = sys._current_frames()
+            now = perf_counter()
+            for profile in profiles:
+                if asyncio.current_task(profile.loop) is profile.task:
+                    profile.stacks.append(stack_of(frames.get(profile.thread_id)))
+                else:
+                    profile.stacks.append(NOT_RUNNING)
+                # samples are weighted by the time since the last one, as the thread rarely wakes exactly on the interval
+                profile.weights.append(now - (profile.last_sample or profile.started))
+                profile.last_sample = now
+            sleep(min(profile.interval for profile in profiles))
+
+    def save(self, profile: ActiveProfile, duration: float) -> str:
+        created = datetime.now(timezone.utc)
+        profile_id = f"{created:%Y%m%dT%H%M%S}-{profile.name.split()[0]}-{uuid4().hex[:8]}"
+        self.profile_dir.mkdir(parents=True, exist_ok=True)
+        self.path(profile_id, "speedscope").write_text(speedscope(profile.name, profile.stacks, profile.weights, duration))
+        self.path(profile_id, "collapsed").write_text(collapsed(profile.stacks))
+        keep = self.max_profiles
+        for stale in self.saved()[keep:]:
+            for suffix in PROFILE_FORMATS.values():
+                (self.profile_dir / f"{stale.name.removesuffix('.speedscope.json')}{suffix}").unlink(missing_ok=True)
+        return profile_id
+
+    def saved(self) -> list[Path]:
+        if not self.profile_dir.is_dir():
+            return []
+        files = self.profile_dir.glob(f"*{PROFILE_FORMATS['speedscope']}")
+        return sorted(files, key=lambda path: path.stat().st_mtime, reverse=True)
+
+    def list_profiles(self) -> list[ProfileInfo]:
+        profiles = []
+        for path in self.saved():
+            document = json.loads(path.read_text())
+            profile = document["profiles"][0]
+            profiles.append(
+                ProfileInfo(
+                    profile_id=path.name.removesuffix(PROFILE_FORMATS["speedscope"]),
+                    name=document["name"],
+                    created=datetime.fromtimestamp(path.stat().st_mtime, timezone.utc),
+                    duration_ms=round(profile["endValue"] * 1000, 3),
+                    samples=len(profile["samples"]),
+                )
+            )
+        return profiles
+
+    def path(self, profile_id: str, profile_format: ProfileFormat) -> Path:
+        return self.profile_dir / f"{profile_id}{PROFILE_FORMATS[profile_format]}"
+
+    def find(self, profile_id: str, profile_format: ProfileFormat) -> Path | None:
+        if PROFILE_ID.match(profile_id) is None:
+            return None
+        path = self.path(profile_id, profile_format)
+        return path if path.is_file() else None
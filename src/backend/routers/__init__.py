@@ -1,2 +1,5 @@
 # from local files
+from .admin import AdminRouter  # noqa: F401
+from .health import HealthRouter  # noqa: F401
 from .resource import ResourceRouter  # noqa: F401
+from .token import TokenRouter  # noqa: F401
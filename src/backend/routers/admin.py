@@ -0,0 +1,160 @@
+from os import getpid
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import FileResponse
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from src.backend.auth import AuthHelper, TokenCache
+from src.backend.cache import CacheBackend, get_response_cache
+from src.backend.models import (
+    DbPoolStats,
+    ProfileList,
+    ProfilingSettings,
+    ResponseCacheStats,
+    TokenCacheStats,
+    get_async_db_engine,
+    pool_monitors,
+)
+from src.backend.profiling import ProfileFormat, SamplingProfiler, get_profiler
+
+
+def worker_header(response: Response) -> None:
+    # caches, pools and the profiler live in each worker process and a request reaches only one of them, so the stats
+    # and settings are that worker's and the response names it
+    response.headers["X-Worker"] = str(getpid())
+
+
+AdminRouter = APIRouter(
+    dependencies=[Depends(AuthHelper.admin_token), Depends(worker_header)],
+    tags=["Admin"],
+    prefix="/admin",
+)
+
+
+@AdminRouter.get(
+    "/token-cache",
+    status_code=status.HTTP_200_OK,
+    response_model=TokenCacheStats,
+    summary="Get verified token cache stats",
+    description="Get the size and hit/miss counters of the verified token cache",
+)
+async def get_token_cache_stats(
+    cache: Annotated[TokenCache, Depends(AuthHelper.get_token_cache)],
+) -> TokenCacheStats:
+    return TokenCacheStats(size=len(cache), max_size=cache.max_size, hits=cache.hits, misses=cache.misses)
+
+
+@AdminRouter.delete(
+    "/token-cache",
+    status_code=status.HTTP_204_NO_CONTENT,
+    summary="Clear the verified token cache",
+    description="Drop every cached token and reset the hit/miss counters",
+)
+async def clear_token_cache(
+    cache: Annotated[TokenCache, Depends(AuthHelper.get_token_cache)],
+) -> None:
+    cache.clear()
+    return None
+
+
+@AdminRouter.get(
+    "/response-cache",
+    status_code=status.HTTP_200_OK,
+    response_model=ResponseCacheStats,
+    summary="Get response cache stats",
+    description="Get the size and hit/miss counters of the resource response cache",
+)
+async def get_response_cache_stats(
+    cache: Annotated[CacheBackend, Depends(get_response_cache)],
+) -> ResponseCacheStats:
+    return ResponseCacheStats(size=await cache.size(), hits=cache.hits, misses=cache.misses)
+
+
+@AdminRouter.delete(
+    "/response-cache",
+    status_code=status.HTTP_204_NO_CONTENT,
+    summary="Clear the response cache",
+    description="Drop every cached response and reset the hit/miss counters",
+)
+async def clear_response_cache(
+    cache: Annotated[CacheBackend, Depends(get_response_cache)],
+) -> None:
+    await cache.clear()
+    return None
+
+
+@AdminRouter.get(
+    "/db-pool",
+    status_code=status.HTTP_200_OK,
+    response_model=DbPoolStats,
+    summary="Get db connection pool stats",
+    description="Get the current and peak use of the db connection pool, for sizing it",
+)
+async def get_db_pool_stats(
+    db_engine: Annotated[AsyncEngine, Depends(get_async_db_engine)],
+) -> DbPoolStats:
+    return pool_monitors[db_engine.sync_engine].stats()
+
+
+@AdminRouter.get(
+    "/profiling",
+    status_code=status.HTTP_200_OK,
+    response_model=ProfilingSettings,
+    summary="Get the request profiler settings",
+    description="Get which requests, if any, are being profiled",
+)
+async def get_profiling_settings(
+    profiler: Annotated[SamplingProfiler, Depends(get_profiler)],
+) -> ProfilingSettings:
+    return profiler.settings
+
+
+@AdminRouter.put(
+    "/profiling",
+    status_code=status.HTTP_200_OK,
+    response_model=ProfilingSettings,
+    summary="Set the request profiler settings",
+    description="Turn sampling profiling on for one route or a fraction of requests, or turn it off",
+)
+async def set_profiling_settings(
+    settings: ProfilingSettings,
+    request: Request,
+    profiler: Annotated[SamplingProfiler, Depends(get_profiler)],
+) -> ProfilingSettings:
+    if settings.route is not None and settings.route not in {getattr(route, "path", None) for route in request.app.routes}:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unknown route: {settings.route}")
+    profiler.configure(settings)
+    return profiler.settings
+
+
+@AdminRouter.get(
+    "/profiles",
+    status_code=status.HTTP_200_OK,
+    response_model=ProfileList,
+    summary="List saved request profiles",
+    description="List the saved request profiles, newest first",
+)
+async def get_profiles_list(
+    profiler: Annotated[SamplingProfiler, Depends(get_profiler)],
+) -> ProfileList:
+    return ProfileList(profiles=profiler.list_profiles())
+
+
+@AdminRouter.get(
+    "/profiles/{profile_id}",
+    status_code=status.HTTP_200_OK,
+    response_class=FileResponse,
+    summary="Download a request profile",
+    description="Download a saved profile as speedscope JSON or as collapsed stacks for flamegraph tools",
+)
+async def get_profile(
+    profile_id: str,
+    profiler: Annotated[SamplingProfiler, Depends(get_profiler)],
+    profile_format: Annotated[ProfileFormat, Query(alias="format")] = "speedscope",
+) -> FileResponse:
+    path = profiler.find(profile_id, profile_format)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    media_type = "application/json" if profile_format == "speedscope" else "text/plain"
+    return FileResponse(path, media_type=media_type, filename=path.name)
@@ -0,0 +1,168 @@
+import json
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Awaitable, Callable
+from uuid import uuid4
+
+from fastapi import HTTPException, Request, status
+from pydantic import ValidationError
+from sqlalchemy import ColumnElement, Insert, insert
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import DBAPIError
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.backend.models import BulkResult, BulkRowResult
+from src.backend.routers.pagination import NDJSON_MEDIA_TYPE
+
+ChunkHook = Callable[[AsyncSession, list[dict]], Awaitable[None]]
+# a reason for each row it refuses, None for the rows that may be written
+ChunkCheck = Callable[[AsyncSession, list[dict]], Awaitable[list[str | None]]]
+
+UPSERT_INSERTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+
+def bulk_request_body(bulk_model: type[SQLModel]) -> dict:
+    row_schema = bulk_model.model_json_schema()
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {"schema": {"type": "array", "items": row_schema}},
+                NDJSON_MEDIA_TYPE: {"schema": row_schema},
+            },
+        }
+    }
+
+
+async def read_bulk_rows(request: Request) -> AsyncIterator[tuple[int, Any]]:
+    # NDJSON is parsed as it arrives so a large import is written chunk by chunk rather than buffered whole
+    if NDJSON_MEDIA_TYPE in request.headers.get("content-type", ""):
+        index = 0
+        buffer = b""
+        async for data in request.stream():
+            buffer += data
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                if line.strip():
+                    yield index, _parse_line(line)
+                    index += 1
+        if buffer.strip():
+            yield index, _parse_line(buffer)
+        return
+    try:
+        rows = json.loads(await request.body())
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid JSON: {e}")
+    if not isinstance(rows, list):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Body must be a JSON array of rows")
+    for index, row in enumerate(rows):
+        yield index, row
+
+
+def _parse_line(line: bytes) -> Any:
+    try:
+        return json.loads(line)
+    except ValueError as e:
+        return e
+
+
+@dataclass(frozen=True)
+class ChunkHooks:
+    # all run in the chunk's transaction, so anything kept alongside the rows is rolled back with them
+    check: ChunkCheck | None = None
+    before: ChunkHook | None = None
+    after: ChunkHook | None = None
+
+
+def insert_statement(
+    db: AsyncSession, table_model: type[SQLModel], primary_key: str, upsert: bool, upsert_where: ColumnElement | None = None
+) -> Insert:
+    if not upsert:
+        return insert(table_model)
+    dialect = db.bind.dialect.name
+    if dialect not in UPSERT_INSERTS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Upsert is not supported on {dialect}")
+    statement = UPSERT_INSERTS[dialect](table_model)
+    updates = {column.name: column for column in statement.excluded if column.name != primary_key}
+    # an existing row the where does not match is left as it is
+    return statement.on_conflict_do_update(index_elements=[primary_key], set_=updates, where=upsert_where)
+
+
+async def bulk_write(
+    db: AsyncSession,
+    rows: AsyncIterator[tuple[int, Any]],
+    table_model: type[SQLModel],
+    bulk_model: type[SQLModel],
+    primary_key: str,
+    upsert: bool,
+    chunk_size: int,
+    on_chunk: ChunkHook | None = None,
+    before_chunk: ChunkHook | None = None,
+    check: ChunkCheck | None = None,
+    upsert_where: ColumnElement | None = None,
+) -> BulkResult:
+    statement = insert_statement(db, table_model, primary_key, upsert, upsert_where)
+    hooks = ChunkHooks(check, before_chunk, on_chunk)
+    written_status = "upserted" if upsert else "created"
+    results: list[BulkRowResult] = []
+    chunk: list[tuple[int, dict]] = []
+    async for index, row in rows:
+        if isinstance(row, ValueError):
+            results.append(BulkRowResult(index=index, status="invalid", detail=f"Invalid JSON: {row}"))
+            continue
+        try:
+            values = bulk_model.model_validate(row).model_dump()
+        except ValidationError as e:
+            results.append(BulkRowResult(index=index, status="invalid", detail=_validation_detail(e)))
+            continue
+        if values[primary_key] is None:
+            values[primary_key] = uuid4()
+        chunk.append((index, values))
+        if len(chunk) >= chunk_size:
+            results.extend(await _write_chunk(db, statement, chunk, primary_key, written_status, hooks))
+            chunk = []
+    if chunk:
+        results.extend(await _write_chunk(db, statement, chunk, primary_key, written_status, hooks))
+    results.sort(key=lambda result: result.index)
+    return BulkResult(results=results)
+
+
+async def _write_chunk(
+    db: AsyncSession,
+    statement: Insert,
+    chunk: list[tuple[int, dict]],
+    primary_key: str,
+    written_status: str,
+    hooks: ChunkHooks,
+) -> list[BulkRowResult]:
+    refused: list[BulkRowResult] = []
+    try:
+        async with db.begin():
+            if hooks.check is not None:
+                details = await hooks.check(db, [values for _, values in chunk])
+                refused = [
+                    BulkRowResult(index=index, status="failed", id=values[primary_key], detail=detail)
+                    for (index, values), detail in zip(chunk, details)
+                    if detail is not None
+                ]
+                chunk = [row for row, detail in zip(chunk, details) if detail is None]
+            if chunk:
+                if hooks.before is not None:
+                    await hooks.before(db, [values for _, values in chunk])
+                await db.execute(statement, [values for _, values in chunk])
+                if hooks.after is not None:
+                    await hooks.after(db, [values for _, values in chunk])
+        return refused + [BulkRowResult(index=index, status=written_status, id=values[primary_key]) for index, values in chunk]
+    except DBAPIError as e:
+        if len(chunk) == 1:
+            index, values = chunk[0]
+            return refused + [BulkRowResult(index=index, status="failed", id=values[primary_key], detail=str(e.orig))]
+    # the chunk was rolled back, so retry its rows one at a time to find the ones the database rejects
+    results = refused
+    for index, values in chunk:
+        results.extend(await _write_chunk(db, statement, [(index, values)], primary_key, written_status, hooks))
+    return results
+
+
+def _validation_detail(error: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(loc) for loc in e['loc'])}: {e['msg']}" for e in error.errors())
@@ -0,0 +1,60 @@
+from typing import Any
+from uuid import UUID
+
+from sqlalchemy import insert, select, update
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.backend.models import Apiary, Contacts, SyncKind, SyncTombstone, session_version
+
+# a row can move into or out of an org's scope without being written itself, e.g. a contact when an apiary it looks
+# after changes org. one that leaves an org gets a tombstone scoped to that org, and one that joins gets a new change
+# version, so /resource/sync drops or sends it on the caller's next batch
+
+
+async def add_tombstones(db: AsyncSession, kind: SyncKind, keys: list[tuple[UUID, UUID | None]]) -> None:
+    # keyed by the row's id and the org it was scoped to, the user_id and org_id for a membership
+    if keys:
+        await db.execute(insert(SyncTombstone), [{"kind": kind, "object_id": key, "org_id": org_id} for key, org_id in keys])
+
+
+async def touch(db: AsyncSession, column: Any, ids: list[UUID]) -> None:
+    if ids:
+        statement = update(column.class_).where(column.in_(ids)).values(version=await session_version(db))
+        await db.execute(statement.execution_options(synchronize_session=False))
+
+
+async def move_contacts(db: AsyncSession, rows: list[dict]) -> None:
+    # a contact given to another org leaves the one that owned it, though it may still be seen through an apiary there
+    ids = [row["contact_id"] for row in rows]
+    statement = select(Contacts.contact_id, Contacts.org_id).where(Contacts.contact_id.in_(ids), Contacts.org_id.is_not(None))
+    before = {contact.contact_id: contact.org_id for contact in await db.execute(statement)}
+    left = [
+        (row["contact_id"], before[row["contact_id"]])
+        for row in rows
+        if before.get(row["contact_id"], row.get("org_id")) != row.get("org_id")
+    ]
+    await add_tombstones(db, "contacts", left)
+
+
+async def move_apiaries(db: AsyncSession, rows: list[dict]) -> None:
+    # runs before the apiaries are written, while the org and contact they had can still be read
+    ids = [row["apiary_id"] for row in rows]
+    statement = select(Apiary.apiary_id, Apiary.org_id, Apiary.contact_id).where(Apiary.apiary_id.in_(ids))
+    before = {apiary.apiary_id: apiary for apiary in await db.execute(statement)}
+    left_apiaries, left_contacts, joined_contacts = [], [], []
+    for row in rows:
+        org_id, contact_id = row.get("org_id"), row.get("contact_id")
+        old = before.get(row["apiary_id"])
+        if old is not None and (old.org_id, old.contact_id) == (org_id, contact_id):
+            continue
+        if old is not None and old.org_id is not None:
+            if old.org_id != org_id:
+                left_apiaries.append((old.apiary_id, old.org_id))
+            if old.contact_id is not None:
+                left_contacts.append((old.contact_id, old.org_id))
+        if org_id is not None and contact_id is not None:
+            joined_contacts.append(contact_id)
+    await add_tombstones(db, "apiaries", left_apiaries)
+    # the contact may still look after another apiary in the org, sync only sends the tombstones of rows gone from view
+    await add_tombstones(db, "contacts", left_contacts)
+    await touch(db, Contacts.contact_id, joined_contacts)
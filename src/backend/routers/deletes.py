@@ -0,0 +1,91 @@
+from typing import Any
+from uuid import UUID
+
+from sqlalchemy import Delete, Row, Update, delete, select, update
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.backend.models import (
+    Apiary,
+    BulkDeleteResult,
+    Contacts,
+    Organisations,
+    UserToOrgLink,
+    Users,
+)
+from src.backend.auth import OrgScope
+from src.backend.routers.changes import add_tombstones
+from src.backend.routers.scoped_writes import writable_ids
+
+# every delete is a fixed handful of set based statements however many ids it is given. the schema declares the same
+# on delete actions, but sqlite cannot add them to tables created before they were, so the dependents are cleared here
+# too and the database's own actions find nothing left to do. each delete leaves tombstones for /resource/sync, and
+# ids the caller may not write are left alone and reported like missing ones
+
+
+def delete_where(column: Any, ids: list[UUID]) -> Delete:
+    # the sessions are short lived, so there are no loaded objects worth keeping in step with the deleted rows
+    return delete(column.class_).where(column.in_(ids)).execution_options(synchronize_session=False)
+
+
+def set_null(column: Any, ids: list[UUID]) -> Update:
+    # the updated rows get a new change version from the column's onupdate, so sync sends them again
+    return update(column.class_).where(column.in_(ids)).values({column.key: None}).execution_options(synchronize_session=False)
+
+
+async def delete_links(db: AsyncSession, column: Any, ids: list[UUID]) -> list[tuple[UUID, UUID]]:
+    statement = delete_where(column, ids).returning(UserToOrgLink.user_id, UserToOrgLink.org_id)
+    links = [tuple(link) for link in await db.execute(statement)]
+    await add_tombstones(db, "memberships", links)
+    return links
+
+
+async def delete_organisations(db: AsyncSession, ids: list[UUID], scope: OrgScope) -> list[UUID]:
+    ids = await writable_ids(db, scope, Organisations.org_id, ids)
+    # the org's apiaries, its contacts, the contacts of its apiaries and its members all leave its scope with it
+    statement = select(Apiary.apiary_id, Apiary.org_id, Apiary.contact_id).where(Apiary.org_id.in_(ids))
+    moved = list(await db.execute(statement))
+    owned = list(await db.execute(select(Contacts.contact_id, Contacts.org_id).where(Contacts.org_id.in_(ids))))
+    await db.execute(set_null(Apiary.org_id, ids))
+    await db.execute(set_null(Contacts.org_id, ids))
+    await add_tombstones(db, "apiaries", [(row.apiary_id, row.org_id) for row in moved])
+    await add_tombstones(db, "contacts", [(row.contact_id, row.org_id) for row in moved if row.contact_id is not None])
+    await add_tombstones(db, "contacts", [tuple(row) for row in owned])
+    await add_tombstones(db, "users", await delete_links(db, UserToOrgLink.org_id, ids))
+    deleted = list(await db.scalars(delete_where(Organisations.org_id, ids).returning(Organisations.org_id)))
+    await add_tombstones(db, "orgs", [(org_id, org_id) for org_id in deleted])
+    return deleted
+
+
+async def delete_contacts(db: AsyncSession, ids: list[UUID], scope: OrgScope) -> list[UUID]:
+    ids = await writable_ids(db, scope, Contacts.contact_id, ids)
+    await db.execute(set_null(Apiary.contact_id, ids))
+    deleted = list(await db.scalars(delete_where(Contacts.contact_id, ids).returning(Contacts.contact_id)))
+    await add_tombstones(db, "contacts", [(contact_id, None) for contact_id in deleted])
+    return deleted
+
+
+async def delete_users(db: AsyncSession, ids: list[UUID], scope: OrgScope) -> list[UUID]:
+    ids = await writable_ids(db, scope, Users.user_id, ids)
+    await delete_links(db, UserToOrgLink.user_id, ids)
+    deleted = list(await db.scalars(delete_where(Users.user_id, ids).returning(Users.user_id)))
+    await add_tombstones(db, "users", [(user_id, None) for user_id in deleted])
+    return deleted
+
+
+async def delete_apiaries(db: AsyncSession, ids: list[UUID], scope: OrgScope) -> list[Row]:
+    ids = await writable_ids(db, scope, Apiary.apiary_id, ids)
+    # the org and contact of each deleted apiary name the cached responses it appeared in
+    statement = delete_where(Apiary.apiary_id, ids).returning(Apiary.apiary_id, Apiary.org_id, Apiary.contact_id)
+    deleted = list(await db.execute(statement))
+    await add_tombstones(db, "apiaries", [(row.apiary_id, row.org_id) for row in deleted])
+    contacts = [(row.contact_id, row.org_id) for row in deleted if row.contact_id is not None and row.org_id is not None]
+    await add_tombstones(db, "contacts", contacts)
+    return deleted
+
+
+def bulk_delete_result(ids: list[UUID], deleted: list[UUID]) -> BulkDeleteResult:
+    found = set(deleted)
+    requested = list(dict.fromkeys(ids))
+    return BulkDeleteResult(
+        deleted=[id_ for id_ in requested if id_ in found], missing=[id_ for id_ in requested if id_ not in found]
+    )
@@ -0,0 +1,52 @@
+from typing import Annotated, Callable
+
+from fastapi import HTTPException, Query, status
+from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.interfaces import LoaderOption
+from sqlmodel import SQLModel
+
+from src.backend.auth import OrgScope
+from src.backend.helpers.serialise import to_public
+
+
+def expand_query(*relations: str) -> Callable[..., set[str]]:
+    def expand(
+        expand: Annotated[
+            str | None,
+            Query(
+                description=f"Comma separated relations to include from: {', '.join(relations)}. All are included if unset",
+                examples=[",".join(relations)],
+            ),
+        ] = None,
+    ) -> set[str]:
+        if expand is None:
+            return set(relations)
+        requested = {relation.strip() for relation in expand.split(",") if relation.strip()}
+        unknown = requested.difference(relations)
+        if unknown:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Cannot expand {', '.join(sorted(unknown))}, choose from: {', '.join(relations)}",
+            )
+        return requested
+
+    return expand
+
+
+def load_options(model: type[SQLModel], expand: set[str], scope: OrgScope) -> list[LoaderOption]:
+    # one SELECT ... IN per relation, so a detail read is always 1 + len(expand) queries however big the collections are.
+    # related rows are scoped like any other read, e.g. a contact's apiaries in orgs the caller cannot see are left out
+    options = []
+    for relation in sorted(expand):
+        attribute = getattr(model, relation)
+        condition = scope.condition(attribute.property.mapper.class_)
+        options.append(selectinload(attribute if condition is None else attribute.and_(condition)))
+    return options
+
+
+def expanded_model(
+    public_model: type[SQLModel], db_object: SQLModel, relations: tuple[str, ...], expand: set[str]
+) -> SQLModel:
+    # relations that were not asked for are left unset, so they are neither lazy loaded nor sent with exclude_unset
+    names = [name for name in public_model.model_fields if name not in relations or name in expand]
+    return to_public(public_model, db_object, names)
@@ -0,0 +1,20 @@
+from fastapi import APIRouter, Request, Response, status
+
+from src.backend.models import ReadinessReport
+from src.backend.startup import Readiness
+
+# probes for the orchestrator, so they take no token and stay out of the spec
+HealthRouter = APIRouter(include_in_schema=False)
+
+
+@HealthRouter.get("/healthz", status_code=status.HTTP_200_OK)
+async def healthz() -> dict:
+    return {"status": "ok"}
+
+
+@HealthRouter.get("/readyz", status_code=status.HTTP_200_OK, response_model=ReadinessReport)
+async def readyz(request: Request, response: Response) -> ReadinessReport:
+    readiness: Readiness = request.app.state.readiness
+    if not readiness.ready:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return readiness.report()
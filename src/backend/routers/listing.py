@@ -0,0 +1,112 @@
+from typing import Annotated, Any, Callable
+
+from fastapi import HTTPException, Query, status
+from sqlalchemy.orm import InstrumentedAttribute
+from sqlmodel import SQLModel, select
+from sqlmodel.sql.expression import Select
+
+from .pagination import Sort, column_value, is_text, project
+
+
+def _bad_request(detail: str) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
+
+
+def _split(value: str) -> list[str]:
+    return [part.strip() for part in value.split(",") if part.strip()]
+
+
+def _filter(model: type[SQLModel], filterable: tuple[str, ...], expression: str) -> Any:
+    name, separator, value = expression.partition(":")
+    if not separator or name not in filterable:
+        raise _bad_request(f"Cannot filter on {expression}, use field:value with a field from: {', '.join(filterable)}")
+    column = getattr(model, name)
+    if value.endswith("*"):
+        if not is_text(column):
+            raise _bad_request(f"Cannot prefix match {name}, only text fields take a trailing *")
+        return column.startswith(value[:-1], autoescape=True)
+    try:
+        return column == column_value(column, value)
+    except (ValueError, ArithmeticError):
+        raise _bad_request(f"Invalid value for {name}: {value}")
+
+
+class ListQuery:
+    def __init__(
+        self,
+        model: type[SQLModel],
+        key: InstrumentedAttribute,
+        filters: list[Any],
+        sort: Sort | None,
+        fields: list[str] | None,
+    ) -> None:
+        self.model = model
+        self.key = key
+        self.filters = filters
+        self.sort = sort
+        self.fields = fields
+
+    def statement(self) -> Select:
+        if self.fields is None:
+            return select(self.model).where(*self.filters)
+        # the id and sort column are always read as the next cursor is built from them
+        names = dict.fromkeys([*self.fields, self.key.key, *([self.sort.column.key] if self.sort else [])])
+        return select(*(getattr(self.model, name) for name in names)).where(*self.filters)
+
+    def projected_page(self, collection: str, rows: list[Any], next_cursor: str | None) -> dict[str, Any]:
+        items = [project(row, self.fields) for row in rows]
+        return {collection: items, "next_cursor": next_cursor, "count": len(items)}
+
+
+def list_query(
+    model: type[SQLModel],
+    key: InstrumentedAttribute,
+    public_model: type[SQLModel],
+    filterable: tuple[str, ...],
+    sortable: tuple[str, ...],
+) -> Callable[..., ListQuery]:
+    projectable = tuple(public_model.model_fields)
+
+    def listing(
+        filters: Annotated[
+            list[str] | None,
+            Query(
+                alias="filter",
+                description=f"Repeatable field:value equality filter, a trailing * on text matches a prefix. "
+                f"Fields: {', '.join(filterable)}",
+                examples=[[f"{filterable[0]}:Po*"]],
+            ),
+        ] = None,
+        order_by: Annotated[
+            str | None,
+            Query(
+                description=f"Field to order by, prefixed with - for descending, from: {', '.join(sortable)}. "
+                "Ordered by id if unset",
+                examples=[f"-{sortable[0]}"],
+            ),
+        ] = None,
+        fields: Annotated[
+            str | None,
+            Query(
+                description=f"Comma separated fields to return from: {', '.join(projectable)}. All are returned if unset",
+                examples=[",".join(projectable[:2])],
+            ),
+        ] = None,
+    ) -> ListQuery:
+        sort = None
+        if order_by is not None:
+            name = order_by.removeprefix("-")
+            if name not in sortable:
+                raise _bad_request(f"Cannot order by {name}, choose from: {', '.join(sortable)}")
+            sort = Sort(getattr(model, name), descending=order_by.startswith("-"))
+        selected = None
+        if fields is not None:
+            selected = list(dict.fromkeys(_split(fields)))
+            unknown = set(selected).difference(projectable)
+            if unknown or not selected:
+                raise _bad_request(
+                    f"Cannot return {', '.join(sorted(unknown)) or 'no fields'}, choose from: {', '.join(projectable)}"
+                )
+        return ListQuery(model, key, [_filter(model, filterable, f) for f in filters or []], sort, selected)
+
+    return listing
@@ -0,0 +1,98 @@
+from uuid import UUID
+
+from fastapi import HTTPException, status
+from sqlalchemy import ColumnElement, Insert, delete, or_, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.backend.auth import OrgScope
+from src.backend.models import Membership, MembershipsAdded, MembershipsRemoved, Organisations, UserToOrgLink, Users
+from src.backend.routers.bulk import UPSERT_INSERTS
+from src.backend.routers.changes import add_tombstones, touch
+
+# memberships are written straight to the link table, so adding or removing one never loads either side's collection
+
+
+def insert_links(db: AsyncSession) -> Insert:
+    dialect = db.bind.dialect.name
+    if dialect not in UPSERT_INSERTS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Memberships are not supported on {dialect}")
+    # a link that already exists is left as it is, and RETURNING only lists the rows actually inserted
+    return UPSERT_INSERTS[dialect](UserToOrgLink).on_conflict_do_nothing().returning(UserToOrgLink.user_id)
+
+
+def joinable(scope: OrgScope) -> ColumnElement[bool] | None:
+    # the users a caller may add to their orgs: ones they can already see, and ones in no org yet. another org's users
+    # stay hidden
+    condition = scope.condition(Users)
+    if condition is None:
+        return None
+    return or_(condition, Users.user_id.not_in(select(UserToOrgLink.user_id)))
+
+
+async def require_org(db: AsyncSession, org_id: UUID, scope: OrgScope) -> None:
+    if await db.scalar(scope.orgs(select(Organisations.org_id).where(Organisations.org_id == org_id))) is None:
+        raise HTTPException(status_code=404, detail="Organisation not found")
+
+
+async def require_user(db: AsyncSession, user_id: UUID, scope: OrgScope) -> None:
+    statement = select(Users.user_id).where(Users.user_id == user_id)
+    if (condition := joinable(scope)) is not None:
+        statement = statement.where(condition)
+    if await db.scalar(statement) is None:
+        raise HTTPException(status_code=404, detail="User not found")
+
+
+async def add_membership(db: AsyncSession, user_id: UUID, org_id: UUID, scope: OrgScope) -> Membership:
+    await require_user(db, user_id, scope)
+    await require_org(db, org_id, scope)
+    added = await db.scalar(insert_links(db).values(user_id=user_id, org_id=org_id))
+    # the user joins the org's scope, so its sync clients are sent the user
+    await touch(db, Users.user_id, [user_id] if added is not None else [])
+    return Membership(user_id=user_id, org_id=org_id, added=added is not None)
+
+
+async def remove_membership(db: AsyncSession, user_id: UUID, org_id: UUID, scope: OrgScope) -> None:
+    await require_org(db, org_id, scope)
+    statement = (
+        delete(UserToOrgLink)
+        .where(UserToOrgLink.user_id == user_id, UserToOrgLink.org_id == org_id)
+        .returning(UserToOrgLink.user_id)
+    )
+    if await db.scalar(statement) is None:
+        raise HTTPException(status_code=404, detail="User is not a member of the org")
+    await add_tombstones(db, "memberships", [(user_id, org_id)])
+    await add_tombstones(db, "users", [(user_id, org_id)])
+
+
+async def add_members(db: AsyncSession, org_id: UUID, user_ids: list[UUID], scope: OrgScope) -> MembershipsAdded:
+    await require_org(db, org_id, scope)
+    requested = list(dict.fromkeys(user_ids))
+    statement = select(Users.user_id).where(Users.user_id.in_(requested))
+    if (condition := joinable(scope)) is not None:
+        statement = statement.where(condition)
+    found = set(await db.scalars(statement))
+    rows = [{"user_id": user_id, "org_id": org_id} for user_id in requested if user_id in found]
+    added = set(await db.scalars(insert_links(db).values(rows))) if rows else set()
+    await touch(db, Users.user_id, list(added))
+    return MembershipsAdded(
+        added=[user_id for user_id in requested if user_id in added],
+        already_members=[user_id for user_id in requested if user_id in found and user_id not in added],
+        missing=[user_id for user_id in requested if user_id not in found],
+    )
+
+
+async def remove_members(db: AsyncSession, org_id: UUID, user_ids: list[UUID], scope: OrgScope) -> MembershipsRemoved:
+    await require_org(db, org_id, scope)
+    requested = list(dict.fromkeys(user_ids))
+    statement = (
+        delete(UserToOrgLink)
+        .where(UserToOrgLink.org_id == org_id, UserToOrgLink.user_id.in_(requested))
+        .returning(UserToOrgLink.user_id)
+    )
+    removed = set(await db.scalars(statement))
+    await add_tombstones(db, "memberships", [(user_id, org_id) for user_id in removed])
+    await add_tombstones(db, "users", [(user_id, org_id) for user_id in removed])
+    return MembershipsRemoved(
+        removed=[user_id for user_id in requested if user_id in removed],
+        not_members=[user_id for user_id in requested if user_id not in removed],
+    )
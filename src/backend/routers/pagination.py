@@ -0,0 +1,192 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as Base64Error
+from dataclasses import dataclass
+from typing import Annotated, Any, AsyncIterator
+from uuid import UUID
+
+from fastapi import HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import String, tuple_
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.orm import InstrumentedAttribute
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlmodel.sql.expression import Select, SelectOfScalar
+
+from src.backend.helpers.serialise import MSGPACK_MEDIA_TYPE, VARY_ACCEPT, dumps, to_public
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+STREAM_BATCH_SIZE = 500
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+NDJSON_RESPONSE = {
+    200: {
+        "content": {NDJSON_MEDIA_TYPE: {}, MSGPACK_MEDIA_TYPE: {}},
+        "description": "One JSON object per line when streamed, or the page as MessagePack with `Accept: application/msgpack`",
+    }
+}
+
+
+@dataclass(frozen=True)
+class Sort:
+    column: InstrumentedAttribute
+    descending: bool = False
+
+    @property
+    def name(self) -> str:
+        return f"-{self.column.key}" if self.descending else self.column.key
+
+
+def urlsafe_encode(data: bytes) -> str:
+    return urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def urlsafe_decode(cursor: str) -> bytes:
+    return urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+
+
+def encode_cursor(last_id: UUID) -> str:
+    return urlsafe_encode(last_id.bytes)
+
+
+def decode_cursor(cursor: str) -> UUID:
+    try:
+        return UUID(bytes=urlsafe_decode(cursor))
+    except (Base64Error, ValueError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+def is_text(column: InstrumentedAttribute) -> bool:
+    column_type = column.type
+    return isinstance(getattr(column_type, "impl", column_type), String)
+
+
+def column_value(column: InstrumentedAttribute, value: Any) -> Any:
+    # sqlmodel's AutoString reports no python type, text columns take the value as it is
+    return str(value) if is_text(column) else column.type.python_type(value)
+
+
+def encode_offset_cursor(offset: int) -> str:
+    return urlsafe_encode(str(offset).encode())
+
+
+def decode_offset_cursor(cursor: str) -> int:
+    try:
+        offset = int(urlsafe_decode(cursor))
+    except (Base64Error, ValueError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    if offset < 0:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    return offset
+
+
+def encode_sort_cursor(sort: Sort, value: Any, last_id: UUID) -> str:
+    # the sort is kept in the cursor so a cursor from one ordering cannot be replayed against another
+    return urlsafe_encode(json.dumps([sort.name, value, str(last_id)], default=str).encode())
+
+
+def decode_sort_cursor(cursor: str, sort: Sort) -> tuple[Any, UUID]:
+    try:
+        name, value, last_id = json.loads(urlsafe_decode(cursor))
+        if name != sort.name:
+            raise ValueError(name)
+        return column_value(sort.column, value), UUID(last_id)
+    except (Base64Error, ValueError, TypeError, ArithmeticError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+def dump_projection(value: Any) -> bytes:
+    # projected rows skip the pydantic models and go straight to the fast encoder
+    return dumps(value)
+
+
+def project(row: Any, fields: list[str]) -> dict[str, Any]:
+    return {name: getattr(row, name) for name in fields}
+
+
+def next_cursor(row: Any, key: InstrumentedAttribute, sort: Sort | None) -> str:
+    if sort is None:
+        return encode_cursor(getattr(row, key.key))
+    return encode_sort_cursor(sort, getattr(row, sort.column.key), getattr(row, key.key))
+
+
+class Pagination:
+    def __init__(
+        self,
+        limit: Annotated[
+            int, Query(ge=1, le=MAX_PAGE_SIZE, description="Max number of items to return", examples=[DEFAULT_PAGE_SIZE])
+        ] = DEFAULT_PAGE_SIZE,
+        cursor: Annotated[str | None, Query(description="The next_cursor returned with the previous page")] = None,
+    ) -> None:
+        self.limit = limit
+        self.cursor = cursor
+
+    def apply(self, statement: Select, key: InstrumentedAttribute, sort: Sort | None = None) -> Select:
+        if sort is None:
+            if self.cursor is not None:
+                statement = statement.where(key > decode_cursor(self.cursor))
+            return statement.order_by(key)
+        # keyset on (value, id) so rows sharing a value are neither skipped nor repeated between pages
+        if self.cursor is not None:
+            value, last_id = decode_sort_cursor(self.cursor, sort)
+            position = tuple_(sort.column, key)
+            statement = statement.where(
+                position < tuple_(value, last_id) if sort.descending else position > tuple_(value, last_id)
+            )
+        if sort.descending:
+            return statement.order_by(sort.column.desc(), key.desc())
+        return statement.order_by(sort.column, key)
+
+
+def page(
+    rows: list[Any], key: InstrumentedAttribute, pagination: Pagination, sort: Sort | None
+) -> tuple[list[Any], str | None]:
+    # one extra row is read to find out whether there is a next page without a count query
+    if len(rows) <= pagination.limit:
+        return rows, None
+    rows = rows[: pagination.limit]
+    return rows, next_cursor(rows[-1], key, sort)
+
+
+async def paginate(
+    db: AsyncSession, statement: SelectOfScalar, key: InstrumentedAttribute, pagination: Pagination, sort: Sort | None = None
+) -> tuple[list[Any], str | None]:
+    rows = (await db.scalars(pagination.apply(statement, key, sort).limit(pagination.limit + 1))).all()
+    return page(list(rows), key, pagination, sort)
+
+
+async def paginate_rows(
+    db: AsyncSession, statement: Select, key: InstrumentedAttribute, pagination: Pagination, sort: Sort | None = None
+) -> tuple[list[Any], str | None]:
+    rows = (await db.execute(pagination.apply(statement, key, sort).limit(pagination.limit + 1))).all()
+    return page(list(rows), key, pagination, sort)
+
+
+def wants_ndjson(request: Request) -> bool:
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def ndjson_response(
+    db_engine: AsyncEngine,
+    statement: SelectOfScalar,
+    key: InstrumentedAttribute,
+    pagination: Pagination,
+    public_model: type[SQLModel],
+    sort: Sort | None = None,
+    fields: list[str] | None = None,
+) -> StreamingResponse:
+    statement = pagination.apply(statement, key, sort).execution_options(yield_per=STREAM_BATCH_SIZE)
+
+    # the stream outlives the request scoped session, so it reads through its own session and a server side cursor. each
+    # batch fetched from the cursor is sent as one chunk, which compression flushes to the client as a whole
+    async def rows() -> AsyncIterator[bytes]:
+        async with AsyncSession(db_engine) as session:
+            if fields is not None:
+                async for batch in (await session.stream(statement)).partitions():
+                    yield b"".join(dump_projection(project(row, fields)) + b"\n" for row in batch)
+                return
+            async for batch in (await session.stream_scalars(statement)).partitions():
+                yield b"".join(to_public(public_model, row).model_dump_json().encode() + b"\n" for row in batch)
+
+    return StreamingResponse(rows(), media_type=NDJSON_MEDIA_TYPE, headers=VARY_ACCEPT)
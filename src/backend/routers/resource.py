@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends
 
 from src.backend.auth import AuthHelper
-from src.backend.routers.resources import ContactRouter, UserRouter, OrgRouter, ApiaryRouter
+from src.backend.routers.resources import ContactRouter, UserRouter, OrgRouter, ApiaryRouter, SearchRouter, SyncRouter
 
 ResourceRouter = APIRouter(
     dependencies=[Depends(AuthHelper.bearer_token)],
@@ -12,3 +12,5 @@ ResourceRouter.include_router(ApiaryRouter)
 ResourceRouter.include_router(ContactRouter)
 ResourceRouter.include_router(OrgRouter)
 ResourceRouter.include_router(UserRouter)
+ResourceRouter.include_router(SearchRouter)
+ResourceRouter.include_router(SyncRouter)
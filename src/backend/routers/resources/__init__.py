@@ -2,4 +2,6 @@
 from .apiary import ApiaryRouter  # noqa: F401
 from .contacts import ContactRouter  # noqa: F401
 from .organisations import OrgRouter  # noqa: F401
+from .search import SearchRouter  # noqa: F401
+from .sync import SyncRouter  # noqa: F401
 from .users import UserRouter  # noqa: F401
@@ -1,11 +1,55 @@
+from heapq import nsmallest
+from operator import itemgetter
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, status, HTTPException, Path
+from fastapi import APIRouter, Depends, status, HTTPException, Path, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from typing import Annotated
-from sqlmodel import Session, select
+from sqlalchemy import and_, or_
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import select
+from sqlmodel.sql.expression import SelectOfScalar
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from src.backend.models import ApiaryList, get_session, Apiary, ApiaryPublic, ApiaryCreate
-from src.backend.auth import AuthHelper
+from src.backend.models import (
+    ApiaryList,
+    get_async_session,
+    Apiary,
+    ApiaryPublic,
+    ApiaryCreate,
+    BulkDelete,
+    BulkDeleteResult,
+    BulkResult,
+    ApiaryBulkCreate,
+    ApiaryNearList,
+    ApiaryPublicWithDistance,
+)
+from src.backend.auth import AuthHelper, OrgScope
+from src.backend.cache import CacheBackend, CachedResponse, cached_response, get_response_cache
+from src.backend.helpers import Config, get_config
+from src.backend.helpers.serialise import public_page, to_public
+from src.backend.helpers.geo import bounding_box, covering_cells, haversine_km, split_antimeridian
+from src.backend.search import SearchBackend, get_search_backend
+from src.backend.routers.bulk import bulk_request_body, bulk_write, read_bulk_rows
+from src.backend.routers.changes import move_apiaries
+from src.backend.routers.deletes import bulk_delete_result, delete_apiaries
+from src.backend.routers.listing import ListQuery, list_query
+from src.backend.routers.scoped_writes import check_apiaries, require_row
+from src.backend.routers.pagination import (
+    Pagination,
+    paginate,
+    paginate_rows,
+    wants_ndjson,
+    ndjson_response,
+    NDJSON_RESPONSE,
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+)
+
+MAX_RADIUS_KM = 1000
+APIARY_LISTING = list_query(
+    Apiary, Apiary.apiary_id, ApiaryPublic, filterable=("name", "org_id", "contact_id"), sortable=("name",)
+)
 
 ApiaryRouter = APIRouter(
     dependencies=[Depends(AuthHelper.bearer_token)],
@@ -18,14 +62,104 @@ ApiaryRouter = APIRouter(
     "/",
     status_code=status.HTTP_200_OK,
     response_model=ApiaryList,
+    responses=NDJSON_RESPONSE,
     summary="Get list of all Apiaries",
-    description="Get list of all Apiaries",
+    description="Get a page of Apiaries, or stream every Apiary after the cursor with `Accept: application/x-ndjson`. "
+    "Filter with `filter`, sort with `order_by` and return only some fields with `fields`",
 )
 async def get_apiary_list(
-    db: Annotated[Session, Depends(get_session)],
-) -> ApiaryList | None:
-    apiaries = db.scalars(select(Apiary)).all()
-    return ApiaryList(apiaries=apiaries)
+    request: Request,
+    pagination: Annotated[Pagination, Depends()],
+    listing: Annotated[ListQuery, Depends(APIARY_LISTING)],
+    db: Annotated[AsyncSession, Depends(get_async_session)],
+    scope: Annotated[OrgScope, Depends(AuthHelper.org_scope)],
+    cached: Annotated[CachedResponse, Depends(cached_response("apiary"))],
+) -> ApiaryList | StreamingResponse | Response:
+    statement = scope.apiaries(listing.statement())
+    if wants_ndjson(request):
+        return ndjson_response(db.bind, statement, Apiary.apiary_id, pagination, ApiaryPublic, listing.sort, listing.fields)
+    if (response := await cached.lookup()) is not None:
+        return response
+    if listing.fields is not None:
+        rows, next_cursor = await paginate_rows(db, statement, Apiary.apiary_id, pagination, listing.sort)
+        return await cached.store_value(listing.projected_page("apiaries", rows, next_cursor))
+    apiaries, next_cursor = await paginate(db, statement, Apiary.apiary_id, pagination, listing.sort)
+    return await cached.store(
+        public_page(ApiaryList, apiaries=[to_public(ApiaryPublic, a) for a in apiaries], next_cursor=next_cursor)
+    )
+
+
+def within_box(statement: SelectOfScalar, min_lat: float, min_lon: float, max_lat: float, max_lon: float) -> SelectOfScalar:
+    # the geohash prefix ranges narrow the search through the index, the lat/lon filter then trims the cell edges
+    cells = covering_cells(min_lat, min_lon, max_lat, max_lon)
+    if cells:
+        statement = statement.where(
+            or_(*(and_(Apiary.site_geohash >= cell, Apiary.site_geohash < cell + "{") for cell in cells))
+        )
+    boxes = split_antimeridian(min_lat, min_lon, max_lat, max_lon)
+    return statement.where(
+        or_(*(and_(Apiary.site_lat.between(b[0], b[2]), Apiary.site_lon.between(b[1], b[3])) for b in boxes))
+    )
+
+
+@ApiaryRouter.get(
+    "/near",
+    status_code=status.HTTP_200_OK,
+    response_model=ApiaryNearList,
+    summary="Get Apiaries near a point",
+    description="Get the Apiaries within radius_km of a point, nearest first",
+)
+async def get_apiaries_near(
+    lat: Annotated[float, Query(ge=-90, le=90, description="Latitude of the search point", examples=[51.87419])],
+    lon: Annotated[float, Query(ge=-180, le=180, description="Longitude of the search point", examples=[-1.18561])],
+    radius_km: Annotated[float, Query(gt=0, le=MAX_RADIUS_KM, description="Search radius in km", examples=[5])],
+    db: Annotated[AsyncSession, Depends(get_async_session)],
+    scope: Annotated[OrgScope, Depends(AuthHelper.org_scope)],
+    cached: Annotated[CachedResponse, Depends(cached_response("apiary"))],
+    limit: Annotated[int, Query(ge=1, le=MAX_PAGE_SIZE, description="Max number of items to return")] = DEFAULT_PAGE_SIZE,
+) -> ApiaryNearList | Response:
+    if (response := await cached.lookup()) is not None:
+        return response
+    statement = within_box(scope.apiaries(select(Apiary)), *bounding_box(lat, lon, radius_km))
+    candidates = (await db.scalars(statement)).all()
+    distances = ((haversine_km(lat, lon, float(a.site_lat), float(a.site_lon)), a) for a in candidates)
+    nearest = nsmallest(limit, (pair for pair in distances if pair[0] <= radius_km), key=itemgetter(0))
+    return await cached.store(
+        public_page(
+            ApiaryNearList,
+            apiaries=[to_public(ApiaryPublicWithDistance, apiary, distance_km=distance) for distance, apiary in nearest],
+        )
+    )
+
+
+@ApiaryRouter.get(
+    "/within",
+    status_code=status.HTTP_200_OK,
+    response_model=ApiaryList,
+    summary="Get Apiaries in a bounding box",
+    description="Get a page of the Apiaries inside a bounding box, a min_lon greater than max_lon crosses the antimeridian",
+)
+async def get_apiaries_within(
+    min_lat: Annotated[float, Query(ge=-90, le=90, description="Southern edge of the box", examples=[51.8])],
+    min_lon: Annotated[float, Query(ge=-180, le=180, description="Western edge of the box", examples=[-1.3])],
+    max_lat: Annotated[float, Query(ge=-90, le=90, description="Northern edge of the box", examples=[51.9])],
+    max_lon: Annotated[float, Query(ge=-180, le=180, description="Eastern edge of the box", examples=[-1.1])],
+    pagination: Annotated[Pagination, Depends()],
+    db: Annotated[AsyncSession, Depends(get_async_session)],
+    scope: Annotated[OrgScope, Depends(AuthHelper.org_scope)],
+    cached: Annotated[CachedResponse, Depends(cached_response("apiary"))],
+) -> ApiaryList | Response:
+    if min_lat > max_lat:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="min_lat must not be greater than max_lat")
+    if min_lon > max_lon:
+        max_lon += 360
+    if (response := await cached.lookup()) is not None:
+        return response
+    statement = within_box(scope.apiaries(select(Apiary)), min_lat, min_lon, max_lat, max_lon)
+    apiaries, next_cursor = await paginate(db, statement, Apiary.apiary_id, pagination)
+    return await cached.store(
+        public_page(ApiaryList, apiaries=[to_public(ApiaryPublic, a) for a in apiaries], next_cursor=next_cursor)
+    )
 
 
 @ApiaryRouter.get(
@@ -37,11 +171,15 @@ async def get_apiary_list(
 )
 async def get_apiary_by_id(
     apiary_id: Annotated[UUID, Path(..., description="Internal of an Apiary", example="12345678-1234-1234-1234-123456789012")],
-    db: Annotated[Session, Depends(get_session)],
-) -> type[Apiary | None]:
-    apiary = db.get(Apiary, apiary_id)
+    db: Annotated[AsyncSession, Depends(get_async_session)],
+    scope: Annotated[OrgScope, Depends(AuthHelper.org_scope)],
+    cached: Annotated[CachedResponse, Depends(cached_response("apiary:{apiary_id}", "apiary:*"))],
+) -> ApiaryPublic | Response:
+    if (response := await cached.lookup()) is not None:
+        return response
+    apiary = (await db.scalars(scope.apiaries(select(Apiary).where(Apiary.apiary_id == apiary_id)))).first()
     if apiary is not None:
-        return apiary
+        return await cached.store(to_public(ApiaryPublic, apiary))
     raise HTTPException(status_code=404, detail="Apiary not found")
 
 
@@ -54,13 +192,60 @@ async def get_apiary_by_id(
 )
 async def create_apiary(
     apiary: ApiaryCreate,
-    db: Annotated[Session, Depends(get_session)],
-) -> Apiary:
-    with db.begin():
-        db_apiary = Apiary.model_validate(apiary)
-        db.add(db_apiary)
-    db.refresh(db_apiary)
-    return db_apiary
+    db: Annotated[AsyncSession, Depends(get_async_session)],
+    cache: Annotated[CacheBackend, Depends(get_response_cache)],
+    search: Annotated[SearchBackend, Depends(get_search_backend)],
+    scope: Annotated[OrgScope, Depends(AuthHelper.org_scope)],
+) -> ApiaryPublic:
+    try:
+        async with db.begin():
+            db_apiary = Apiary.model_validate(apiary)
+            await require_row(db, scope, check_apiaries, db_apiary.model_dump())
+            await move_apiaries(db, [db_apiary.model_dump()])
+            db.add(db_apiary)
+            await search.index(db, "apiary", [db_apiary.model_dump()])
+    except IntegrityError:
+        raise HTTPException(status_code=409, detail="Apiary org or contact does not exist")
+    # a new apiary can also bring its contact into an org's scope
+    await cache.invalidate("apiary", "contacts", f"orgs:{db_apiary.org_id}", f"contacts:{db_apiary.contact_id}", "search")
+    await db.refresh(db_apiary)
+    return to_public(ApiaryPublic, db_apiary)
+
+
+@ApiaryRouter.post(
+    "/bulk",
+    status_code=status.HTTP_200_OK,
+    response_model=BulkResult,
+    openapi_extra=bulk_request_body(ApiaryBulkCreate),
+    summary="Create many Apiaries",
+    description="Create Apiaries from a JSON array or an NDJSON stream, written in chunked transactions with a result per "
+    "row. With `upsert` rows whose apiary_id already exists are updated instead",
+)
+async def bulk_create_apiaries(
+    request: Request,
+    config: Annotated[Config, Depends(get_config)],
+    db: Annotated[AsyncSession, Depends(get_async_session)],
+    cache: Annotated[CacheBackend, Depends(get_response_cache)],
+    search: Annotated[SearchBackend, Depends(get_search_backend)],
+    scope: Annotated[OrgScope, Depends(AuthHelper.org_scope)],
+    upsert: Annotated[bool, Query(description="Update rows whose apiary_id already exists")] = False,
+) -> BulkResult:
+    rows = read_bulk_rows(request)
+    result = await bulk_write(
+        db,
+        rows,
+        Apiary,
+        ApiaryBulkCreate,
+        "apiary_id",
+        upsert,
+        config.bulk_chunk_size,
+        on_chunk=lambda session, written: search.index(session, "apiary", written),
+        before_chunk=move_apiaries,
+        check=lambda session, chunk: check_apiaries(session, scope, chunk),
+        upsert_where=scope.writable(Apiary),
+    )
+    await cache.invalidate("apiary", "apiary:*", "orgs:*", "contacts", "contacts:*", "search")
+    return result
 
 
 @ApiaryRouter.delete(
@@ -71,11 +256,43 @@ async def create_apiary(
 )
 async def delete_apiary_by_id(
     apiary_id: Annotated[UUID, Path(..., description="Internal of an Apiary", example="12345678-1234-1234-1234-123456789012")],
-    db: Annotated[Session, Depends(get_session)],
+    db: Annotated[AsyncSession, Depends(get_async_session)],
+    cache: Annotated[CacheBackend, Depends(get_response_cache)],
+    search: Annotated[SearchBackend, Depends(get_search_backend)],
+    scope: Annotated[OrgScope, Depends(AuthHelper.org_scope)],
 ) -> None:
-    with db.begin():
-        db_apiary = db.get(Apiary, apiary_id)
-        if db_apiary is None:
+    async with db.begin():
+        deleted = await delete_apiaries(db, [apiary_id], scope)
+        if not deleted:
             raise HTTPException(status_code=404, detail="Apiary not found")
-        db.delete(db_apiary)
+        await search.remove(db, "apiary", [apiary_id])
+    await cache.invalidate(
+        "apiary",
+        "contacts",
+        f"apiary:{apiary_id}",
+        f"orgs:{deleted[0].org_id}",
+        f"contacts:{deleted[0].contact_id}",
+        "search",
+    )
     return None
+
+
+@ApiaryRouter.post(
+    "/bulk/delete",
+    status_code=status.HTTP_200_OK,
+    response_model=BulkDeleteResult,
+    summary="Delete many Apiaries",
+    description="Delete Apiaries by ID in one transaction",
+)
+async def bulk_delete_apiaries(
+    request: BulkDelete,
+    db: Annotated[AsyncSession, Depends(get_async_session)],
+    cache: Annotated[CacheBackend, Depends(get_response_cache)],
+    search: Annotated[SearchBackend, Depends(get_search_backend)],
+    scope: Annotated[OrgScope, Depends(AuthHelper.org_scope)],
+) -> BulkDeleteResult:
+    async with db.begin():
+        deleted = await delete_apiaries(db, request.ids, scope)
+        await search.remove(db, "apiary", [row.apiary_id for row in deleted])
+    await cache.invalidate("apiary", "apiary:*", "orgs:*", "contacts", "contacts:*", "search")
+    return bulk_delete_result(request.ids, [row.apiary_id for row in deleted])
@@ -1,11 +1,40 @@
 from typing import Annotated
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, status, Path, HTTPException
-from sqlmodel import Session, select
+from fastapi import APIRouter, Depends, status, Path, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from src.backend.auth import AuthHelper
-from src.backend.models import Contacts, ContactsList, get_session, ContactsPublic, ContactsCreate, ContactsPublicWithApiaries
+from src.backend.auth import AuthHelper, OrgScope
+from src.backend.cache import CacheBackend, CachedResponse, cached_response, get_response_cache
+from src.backend.helpers import Config, get_config
+from src.backend.helpers.serialise import public_page, to_public
+from src.backend.search import SearchBackend, get_search_backend
+from src.backend.routers.expand import expand_query, load_options, expanded_model
+from src.backend.routers.bulk import bulk_request_body, bulk_write, read_bulk_rows
+from src.backend.routers.deletes import bulk_delete_result, delete_contacts
+from src.backend.routers.listing import ListQuery, list_query
+from src.backend.routers.changes import move_contacts
+from src.backend.routers.scoped_writes import check_contacts, require_row
+from src.backend.routers.pagination import Pagination, paginate, paginate_rows, wants_ndjson, ndjson_response, NDJSON_RESPONSE
+from src.backend.models import (
+    BulkDelete,
+    BulkDeleteResult,
+    BulkResult,
+    ContactsBulkCreate,
+    Contacts,
+    ContactsList,
+    get_async_session,
+    ContactsPublic,
+    ContactsCreate,
+    ContactsPublicWithApiaries,
+)
+
+CONTACT_RELATIONS = ("apiaries",)
+CONTACT_LISTING = list_query(
+    Contacts, Contacts.contact_id, ContactsPublic, filterable=("name", "email", "phone"), sortable=("name",)
+)
 
 ContactRouter = APIRouter(
     dependencies=[Depends(AuthHelper.bearer_token)],
@@ -18,32 +47,62 @@ ContactRouter = APIRouter(
     "/",
     status_code=status.HTTP_200_OK,
     response_model=ContactsList,
+    responses=NDJSON_RESPONSE,
     summary="Get list of all all contacts",
-    description="Get list of all all contacts",
+    description="Get a page of contacts, or stream every contact after the cursor with `Accept: application/x-ndjson`. "
+    "Filter with `filter`, sort with `order_by` and return only some fields with `fields`",
 )
 async def get_contacts_list(
-    db: Annotated[Session, Depends(get_session)],
-) -> ContactsList | None:
-    contacts = db.scalars(select(Contacts)).all()
-    return ContactsList(contacts=contacts)
+    request: Request,
+    pagination: Annotated[Pagination, Depends()],
+    listing: Annotated[ListQuery, Depends(CONTACT_LISTING)],
+    db: Annotated[AsyncSession, Depends(get_async_session)],
+    scope: Annotated[OrgScope, Depends(AuthHelper.org_scope)],
+    cached: Annotated[CachedResponse, Depends(cached_response("contacts"))],
+) -> ContactsList | StreamingResponse | Response:
+    statement = scope.contacts(listing.statement())
+    if wants_ndjson(request):
+        return ndjson_response(
+            db.bind, statement, Contacts.contact_id, pagination, ContactsPublic, listing.sort, listing.fields
+        )
+    if (response := await cached.lookup()) is not None:
+        return response
+    if listing.fields is not None:
+        rows, next_cursor = await paginate_rows(db, statement, Contacts.contact_id, pagination, listing.sort)
+        return await cached.store_value(listing.projected_page("contacts", rows, next_cursor))
+    contacts, next_cursor = await paginate(db, statement, Contacts.contact_id, pagination, listing.sort)
+    return await cached.store(
+        public_page(ContactsList, contacts=[to_public(ContactsPublic, c) for c in contacts], next_cursor=next_cursor)
+    )
 
 
 @ContactRouter.get(
     "/{contact_id}",
     status_code=status.HTTP_200_OK,
     response_model=ContactsPublicWithApiaries | None,
+    response_model_exclude_unset=True,
     summary="Get a specific contact",
-    description="Get a specific contact",
+    description="Get a specific contact, with the relations chosen by `expand`",
 )
 async def get_contact_by_id(
     contact_id: Annotated[
         UUID, Path(..., description="Internal ID of a contact", example="12345678-1234-1234-1234-123456789012")
     ],
-    db: Annotated[Session, Depends(get_session)],
-) -> type[Contacts | None]:
-    contact = db.get(Contacts, contact_id)
+    expand: Annotated[set[str], Depends(expand_query(*CONTACT_RELATIONS))],
+    db: Annotated[AsyncSession, Depends(get_async_session)],
+    scope: Annotated[OrgScope, Depends(AuthHelper.org_scope)],
+    cached: Annotated[CachedResponse, Depends(cached_response("contacts:{contact_id}", "contacts:*"))],
+) -> ContactsPublicWithApiaries | Response:
+    if (response := await cached.lookup()) is not None:
+        return response
+    statement = scope.contacts(select(Contacts).where(Contacts.contact_id == contact_id)).options(
+        *load_options(Contacts, expand, scope)
+    )
+    contact = (await db.scalars(statement)).first()
     if contact is not None:
-        return contact
+        return await cached.store(
+            expanded_model(ContactsPublicWithApiaries, contact, CONTACT_RELATIONS, expand), exclude_unset=True
+        )
     raise HTTPException(status_code=404, detail="Contact not found")
 
 
@@ -56,13 +115,55 @@ async def get_contact_by_id(
 )
 async def create_new_contact(
     contact: ContactsCreate,
-    db: Annotated[Session, Depends(get_session)],
-) -> Contacts:
-    with db.begin():
+    db: Annotated[AsyncSession, Depends(get_async_session)],
+    cache: Annotated[CacheBackend, Depends(get_response_cache)],
+    search: Annotated[SearchBackend, Depends(get_search_backend)],
+    scope: Annotated[OrgScope, Depends(AuthHelper.org_scope)],
+) -> ContactsPublic:
+    async with db.begin():
         db_contact = Contacts.model_validate(contact)
+        await require_row(db, scope, check_contacts, db_contact.model_dump())
         db.add(db_contact)
-    db.refresh(db_contact)
-    return db_contact
+        await search.index(db, "contact", [db_contact.model_dump()])
+    await cache.invalidate("contacts", "search")
+    await db.refresh(db_contact)
+    return to_public(ContactsPublic, db_contact)
+
+
+@ContactRouter.post(
+    "/bulk",
+    status_code=status.HTTP_200_OK,
+    response_model=BulkResult,
+    openapi_extra=bulk_request_body(ContactsBulkCreate),
+    summary="Create many contacts",
+    description="Create contacts from a JSON array or an NDJSON stream, written in chunked transactions with a result per "
+    "row. With `upsert` rows whose contact_id already exists are updated instead",
+)
+async def bulk_create_contacts(
+    request: Request,
+    config: Annotated[Config, Depends(get_config)],
+    db: Annotated[AsyncSession, Depends(get_async_session)],
+    cache: Annotated[CacheBackend, Depends(get_response_cache)],
+    search: Annotated[SearchBackend, Depends(get_search_backend)],
+    scope: Annotated[OrgScope, Depends(AuthHelper.org_scope)],
+    upsert: Annotated[bool, Query(description="Update rows whose contact_id already exists")] = False,
+) -> BulkResult:
+    rows = read_bulk_rows(request)
+    result = await bulk_write(
+        db,
+        rows,
+        Contacts,
+        ContactsBulkCreate,
+        "contact_id",
+        upsert,
+        config.bulk_chunk_size,
+        on_chunk=lambda session, written: search.index(session, "contact", written),
+        before_chunk=move_contacts,
+        check=lambda session, chunk: check_contacts(session, scope, chunk),
+        upsert_where=scope.writable(Contacts),
+    )
+    await cache.invalidate("contacts", "contacts:*", "search")
+    return result
 
 
 @ContactRouter.delete(
@@ -72,11 +173,36 @@ async def delete_contact_by_id(
     contact_id: Annotated[
         UUID, Path(..., description="Internal ID of a contact", example="12345678-1234-1234-1234-123456789012")
     ],
-    db: Annotated[Session, Depends(get_session)],
+    db: Annotated[AsyncSession, Depends(get_async_session)],
+    cache: Annotated[CacheBackend, Depends(get_response_cache)],
+    search: Annotated[SearchBackend, Depends(get_search_backend)],
+    scope: Annotated[OrgScope, Depends(AuthHelper.org_scope)],
 ) -> None:
-    with db.begin():
-        contact = db.get(Contacts, contact_id)
-        if contact is None:
+    async with db.begin():
+        if not await delete_contacts(db, [contact_id], scope):
             raise HTTPException(status_code=404, detail="Contact not found")
-        db.delete(contact)
+        await search.remove(db, "contact", [contact_id])
+    # the contact's apiaries lose their contact_id, which shows in apiary lists and details and in org details
+    await cache.invalidate("contacts", f"contacts:{contact_id}", "apiary", "apiary:*", "orgs:*", "search")
     return None
+
+
+@ContactRouter.post(
+    "/bulk/delete",
+    status_code=status.HTTP_200_OK,
+    response_model=BulkDeleteResult,
+    summary="Delete many contacts",
+    description="Delete contacts by ID in one transaction. Their apiaries are kept without a contact",
+)
+async def bulk_delete_contacts(
+    request: BulkDelete,
+    db: Annotated[AsyncSession, Depends(get_async_session)],
+    cache: Annotated[CacheBackend, Depends(get_response_cache)],
+    search: Annotated[SearchBackend, Depends(get_search_backend)],
+    scope: Annotated[OrgScope, Depends(AuthHelper.org_scope)],
+) -> BulkDeleteResult:
+    async with db.begin():
+        deleted = await delete_contacts(db, request.ids, scope)
+        await search.remove(db, "contact", deleted)
+    await cache.invalidate("contacts", "contacts:*", "apiary", "apiary:*", "orgs:*", "search")
+    return bulk_delete_result(request.ids, deleted)
@@ -1,20 +1,48 @@
 from typing import Annotated
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, status, Path, HTTPException
-from sqlmodel import Session, select
+from fastapi import APIRouter, Depends, status, Path, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from src.backend.auth import AuthHelper
+from src.backend.auth import AuthHelper, OrgScope
+from src.backend.cache import CacheBackend, CachedResponse, cached_response, get_response_cache
+from src.backend.helpers import Config, get_config
+from src.backend.helpers.serialise import public_page, to_public
 from src.backend.models import (
+    BulkDelete,
+    BulkDeleteResult,
+    BulkResult,
+    Membership,
+    MembershipBatch,
+    MembershipsAdded,
+    MembershipsRemoved,
+    OrganisationsBulkCreate,
     Organisations,
     OrganisationsList,
     Users,
-    get_session,
+    UsersList,
+    UsersPublic,
+    UserToOrgLink,
+    get_async_session,
     OrganisationsPublic,
     OrganisationsCreate,
     OrganisationsPublicWithUsers,
     OrganisationsPublicWithUsersAndApiaries,
 )
+from src.backend.routers.expand import expand_query, load_options, expanded_model
+from src.backend.routers.bulk import bulk_request_body, bulk_write, read_bulk_rows
+from src.backend.routers.deletes import bulk_delete_result, delete_organisations
+from src.backend.routers.listing import ListQuery, list_query
+from src.backend.routers.memberships import add_members, add_membership, remove_members, remove_membership
+from src.backend.routers.scoped_writes import require_admin
+from src.backend.routers.pagination import Pagination, paginate, paginate_rows, wants_ndjson, ndjson_response, NDJSON_RESPONSE
+
+ORG_RELATIONS = ("users", "apiaries")
+ORG_LISTING = list_query(
+    Organisations, Organisations.org_id, OrganisationsPublic, filterable=("org_name",), sortable=("org_name",)
+)
 
 OrgRouter = APIRouter(
     dependencies=[Depends(AuthHelper.bearer_token)],
@@ -27,30 +55,60 @@ OrgRouter = APIRouter(
     "/",
     status_code=status.HTTP_200_OK,
     response_model=OrganisationsList,
+    responses=NDJSON_RESPONSE,
     summary="Get list of all orgs",
-    description="Get list of all orgs",
+    description="Get a page of orgs, or stream every org after the cursor with `Accept: application/x-ndjson`. "
+    "Filter with `filter`, sort with `order_by` and return only some fields with `fields`",
 )
 async def get_organisations_list(
-    db: Annotated[Session, Depends(get_session)],
-) -> OrganisationsList | None:
-    orgs = db.scalars(select(Organisations)).all()
-    return OrganisationsList(orgs=orgs)
+    request: Request,
+    pagination: Annotated[Pagination, Depends()],
+    listing: Annotated[ListQuery, Depends(ORG_LISTING)],
+    db: Annotated[AsyncSession, Depends(get_async_session)],
+    scope: Annotated[OrgScope, Depends(AuthHelper.org_scope)],
+    cached: Annotated[CachedResponse, Depends(cached_response("orgs"))],
+) -> OrganisationsList | StreamingResponse | Response:
+    statement = scope.orgs(listing.statement())
+    if wants_ndjson(request):
+        return ndjson_response(
+            db.bind, statement, Organisations.org_id, pagination, OrganisationsPublic, listing.sort, listing.fields
+        )
+    if (response := await cached.lookup()) is not None:
+        return response
+    if listing.fields is not None:
+        rows, next_cursor = await paginate_rows(db, statement, Organisations.org_id, pagination, listing.sort)
+        return await cached.store_value(listing.projected_page("orgs", rows, next_cursor))
+    orgs, next_cursor = await paginate(db, statement, Organisations.org_id, pagination, listing.sort)
+    return await cached.store(
+        public_page(OrganisationsList, orgs=[to_public(OrganisationsPublic, o) for o in orgs], next_cursor=next_cursor)
+    )
 
 
 @OrgRouter.get(
     "/{org_id}",
     status_code=status.HTTP_200_OK,
     response_model=OrganisationsPublicWithUsersAndApiaries | None,
+    response_model_exclude_unset=True,
     summary="Get a specific org",
-    description="Get a specific org",
+    description="Get a specific org, with the relations chosen by `expand`",
 )
 async def get_organisation_by_id(
     org_id: Annotated[UUID, Path(..., description="Internal ID of a org", example="12345678-1234-1234-1234-123456789012")],
-    db: Annotated[Session, Depends(get_session)],
-) -> type[Organisations | None]:
-    org = db.get(Organisations, org_id)
+    expand: Annotated[set[str], Depends(expand_query(*ORG_RELATIONS))],
+    db: Annotated[AsyncSession, Depends(get_async_session)],
+    scope: Annotated[OrgScope, Depends(AuthHelper.org_scope)],
+    cached: Annotated[CachedResponse, Depends(cached_response("orgs:{org_id}", "orgs:*"))],
+) -> OrganisationsPublicWithUsersAndApiaries | Response:
+    if (response := await cached.lookup()) is not None:
+        return response
+    statement = scope.orgs(select(Organisations).where(Organisations.org_id == org_id)).options(
+        *load_options(Organisations, expand, scope)
+    )
+    org = (await db.scalars(statement)).first()
     if org is not None:
-        return org
+        return await cached.store(
+            expanded_model(OrganisationsPublicWithUsersAndApiaries, org, ORG_RELATIONS, expand), exclude_unset=True
+        )
     raise HTTPException(status_code=404, detail="Org not found")
 
 
@@ -63,47 +121,202 @@ async def get_organisation_by_id(
 )
 async def create_new_organisation(
     organisation: OrganisationsCreate,
-    db: Annotated[Session, Depends(get_session)],
-) -> Organisations:
-    with db.begin():
+    db: Annotated[AsyncSession, Depends(get_async_session)],
+    cache: Annotated[CacheBackend, Depends(get_response_cache)],
+    scope: Annotated[OrgScope, Depends(AuthHelper.org_scope)],
+) -> OrganisationsPublic:
+    require_admin(scope, "Only admins can create orgs")
+    async with db.begin():
         db_org = Organisations.model_validate(organisation)
         db.add(db_org)
-    db.refresh(db_org)
-    return db_org
+    await cache.invalidate("orgs")
+    await db.refresh(db_org)
+    return to_public(OrganisationsPublic, db_org)
+
+
+@OrgRouter.post(
+    "/bulk",
+    status_code=status.HTTP_200_OK,
+    response_model=BulkResult,
+    openapi_extra=bulk_request_body(OrganisationsBulkCreate),
+    summary="Create many orgs",
+    description="Create orgs from a JSON array or an NDJSON stream, written in chunked transactions with a result per "
+    "row. With `upsert` rows whose org_id already exists are updated instead",
+)
+async def bulk_create_organisations(
+    request: Request,
+    config: Annotated[Config, Depends(get_config)],
+    db: Annotated[AsyncSession, Depends(get_async_session)],
+    cache: Annotated[CacheBackend, Depends(get_response_cache)],
+    scope: Annotated[OrgScope, Depends(AuthHelper.org_scope)],
+    upsert: Annotated[bool, Query(description="Update rows whose org_id already exists")] = False,
+) -> BulkResult:
+    require_admin(scope, "Only admins can create orgs")
+    rows = read_bulk_rows(request)
+    result = await bulk_write(db, rows, Organisations, OrganisationsBulkCreate, "org_id", upsert, config.bulk_chunk_size)
+    await cache.invalidate("orgs", "orgs:*", "users:*")
+    return result
 
 
 @OrgRouter.delete("/{org_id}", status_code=status.HTTP_204_NO_CONTENT, summary="Delete an org", description="Delete an org")
 async def delete_organisation_by_id(
     org_id: Annotated[UUID, Path(..., description="Internal ID of a org", example="12345678-1234-1234-1234-123456789012")],
-    db: Annotated[Session, Depends(get_session)],
+    db: Annotated[AsyncSession, Depends(get_async_session)],
+    cache: Annotated[CacheBackend, Depends(get_response_cache)],
+    scope: Annotated[OrgScope, Depends(AuthHelper.org_scope)],
 ) -> None:
-    with db.begin():
-        user = db.get(Organisations, org_id)
-        if user is None:
+    async with db.begin():
+        if not await delete_organisations(db, [org_id], scope):
             raise HTTPException(status_code=404, detail="Org not found")
-        db.delete(user)
+    await cache.invalidate(
+        "orgs", f"orgs:{org_id}", "apiary", "apiary:*", "users", "users:*", "contacts", "contacts:*", "search"
+    )
     return None
 
 
+@OrgRouter.post(
+    "/bulk/delete",
+    status_code=status.HTTP_200_OK,
+    response_model=BulkDeleteResult,
+    summary="Delete many orgs",
+    description="Delete orgs by ID in one transaction. Their apiaries are kept without an org and their users leave them",
+)
+async def bulk_delete_organisations(
+    request: BulkDelete,
+    db: Annotated[AsyncSession, Depends(get_async_session)],
+    cache: Annotated[CacheBackend, Depends(get_response_cache)],
+    scope: Annotated[OrgScope, Depends(AuthHelper.org_scope)],
+) -> BulkDeleteResult:
+    async with db.begin():
+        deleted = await delete_organisations(db, request.ids, scope)
+    await cache.invalidate("orgs", "orgs:*", "apiary", "apiary:*", "users", "users:*", "contacts", "contacts:*", "search")
+    return bulk_delete_result(request.ids, deleted)
+
+
+@OrgRouter.get(
+    "/{org_id}/users",
+    status_code=status.HTTP_200_OK,
+    response_model=UsersList,
+    summary="Get the users in an org",
+    description="Get a page of the org's users, ordered by user_id",
+)
+async def get_organisation_users(
+    org_id: Annotated[UUID, Path(..., description="Internal ID of a org", example="12345678-1234-1234-1234-123456789012")],
+    pagination: Annotated[Pagination, Depends()],
+    db: Annotated[AsyncSession, Depends(get_async_session)],
+    scope: Annotated[OrgScope, Depends(AuthHelper.org_scope)],
+    cached: Annotated[CachedResponse, Depends(cached_response("orgs:{org_id}", "orgs:*"))],
+) -> UsersList | Response:
+    if (response := await cached.lookup()) is not None:
+        return response
+    if await db.scalar(scope.orgs(select(Organisations.org_id).where(Organisations.org_id == org_id))) is None:
+        raise HTTPException(status_code=404, detail="Org not found")
+    statement = select(Users).join(UserToOrgLink, UserToOrgLink.user_id == Users.user_id).where(UserToOrgLink.org_id == org_id)
+    # keyed on the link's user_id so the page is read in order from the (org_id, user_id) index
+    users, next_cursor = await paginate(db, statement, UserToOrgLink.user_id, pagination)
+    return await cached.store(
+        public_page(UsersList, users=[to_public(UsersPublic, u) for u in users], next_cursor=next_cursor)
+    )
+
+
 @OrgRouter.put(
     "/{org_id}/{user_id}",
     status_code=status.HTTP_200_OK,
     response_model=OrganisationsPublicWithUsers,
+    deprecated=True,
     summary="Add a user to an org",
-    description="Add a user to an org",
+    description="Deprecated: use `PUT /orgs/{org_id}/users/{user_id}`, which adds the user without reading every member "
+    "back, and `GET /orgs/{org_id}/users` to page through the members. Adds a user to an org and returns the org with all "
+    "of its users, which takes longer the more members the org has",
 )
 async def add_user_to_org(
     user_id: Annotated[UUID, Path(..., description="Internal ID of a user", example="12345678-1234-1234-1234-123456789012")],
     org_id: Annotated[UUID, Path(..., description="Internal ID of a org", example="12345678-1234-1234-1234-123456789012")],
-    db: Annotated[Session, Depends(get_session)],
-) -> type[Organisations]:
-    with db.begin():
-        org = db.get(Organisations, org_id)
-        if org is None:
-            raise HTTPException(status_code=404, detail="Organisation not found")
-        user = db.get(Users, user_id)
-        if user is None:
-            raise HTTPException(status_code=404, detail="User not found")
-        user.orgs.append(org)
-    db.refresh(org)
-    return org
+    db: Annotated[AsyncSession, Depends(get_async_session)],
+    cache: Annotated[CacheBackend, Depends(get_response_cache)],
+    scope: Annotated[OrgScope, Depends(AuthHelper.org_scope)],
+) -> OrganisationsPublicWithUsers:
+    async with db.begin():
+        await add_membership(db, user_id, org_id, scope)
+    await cache.invalidate("users", f"orgs:{org_id}", f"users:{user_id}")
+    org = await db.get(Organisations, org_id, options=load_options(Organisations, {"users"}, scope))
+    return to_public(OrganisationsPublicWithUsers, org)
+
+
+@OrgRouter.put(
+    "/{org_id}/users/{user_id}",
+    status_code=status.HTTP_200_OK,
+    response_model=Membership,
+    summary="Add a user to an org",
+    description="Add a user to an org, doing nothing if they are already a member",
+)
+async def add_org_membership(
+    user_id: Annotated[UUID, Path(..., description="Internal ID of a user", example="12345678-1234-1234-1234-123456789012")],
+    org_id: Annotated[UUID, Path(..., description="Internal ID of a org", example="12345678-1234-1234-1234-123456789012")],
+    db: Annotated[AsyncSession, Depends(get_async_session)],
+    cache: Annotated[CacheBackend, Depends(get_response_cache)],
+    scope: Annotated[OrgScope, Depends(AuthHelper.org_scope)],
+) -> Membership:
+    async with db.begin():
+        membership = await add_membership(db, user_id, org_id, scope)
+    await cache.invalidate("users", f"orgs:{org_id}", f"users:{user_id}")
+    return membership
+
+
+@OrgRouter.delete(
+    "/{org_id}/users/{user_id}",
+    status_code=status.HTTP_204_NO_CONTENT,
+    summary="Remove a user from an org",
+    description="Remove a user from an org",
+)
+async def remove_org_membership(
+    user_id: Annotated[UUID, Path(..., description="Internal ID of a user", example="12345678-1234-1234-1234-123456789012")],
+    org_id: Annotated[UUID, Path(..., description="Internal ID of a org", example="12345678-1234-1234-1234-123456789012")],
+    db: Annotated[AsyncSession, Depends(get_async_session)],
+    cache: Annotated[CacheBackend, Depends(get_response_cache)],
+    scope: Annotated[OrgScope, Depends(AuthHelper.org_scope)],
+) -> None:
+    async with db.begin():
+        await remove_membership(db, user_id, org_id, scope)
+    await cache.invalidate("users", f"orgs:{org_id}", f"users:{user_id}")
+    return None
+
+
+@OrgRouter.post(
+    "/{org_id}/users/add",
+    status_code=status.HTTP_200_OK,
+    response_model=MembershipsAdded,
+    summary="Add many users to an org",
+    description="Add users to an org in one statement, skipping those already in it",
+)
+async def add_users_to_org(
+    org_id: Annotated[UUID, Path(..., description="Internal ID of a org", example="12345678-1234-1234-1234-123456789012")],
+    batch: MembershipBatch,
+    db: Annotated[AsyncSession, Depends(get_async_session)],
+    cache: Annotated[CacheBackend, Depends(get_response_cache)],
+    scope: Annotated[OrgScope, Depends(AuthHelper.org_scope)],
+) -> MembershipsAdded:
+    async with db.begin():
+        result = await add_members(db, org_id, batch.user_ids, scope)
+    await cache.invalidate("users", "users:*", f"orgs:{org_id}")
+    return result
+
+
+@OrgRouter.post(
+    "/{org_id}/users/remove",
+    status_code=status.HTTP_200_OK,
+    response_model=MembershipsRemoved,
+    summary="Remove many users from an org",
+    description="Remove users from an org in one statement",
+)
+async def remove_users_from_org(
+    org_id: Annotated[UUID, Path(..., description="Internal ID of a org", example="12345678-1234-1234-1234-123456789012")],
+    batch: MembershipBatch,
+    db: Annotated[AsyncSession, Depends(get_async_session)],
+    cache: Annotated[CacheBackend, Depends(get_response_cache)],
+    scope: Annotated[OrgScope, Depends(AuthHelper.org_scope)],
+) -> MembershipsRemoved:
+    async with db.begin():
+        result = await remove_members(db, org_id, batch.user_ids, scope)
+    await cache.invalidate("users", "users:*", f"orgs:{org_id}")
+    return result
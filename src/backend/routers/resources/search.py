@@ -0,0 +1,48 @@
+from typing import Annotated, get_args
+
+from fastapi import APIRouter, Depends, status, Query, Response
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.backend.auth import AuthHelper, OrgScope
+from src.backend.cache import CachedResponse, cached_response
+from src.backend.helpers.serialise import public_page
+from src.backend.models import SearchKind, SearchResults, get_async_session
+from src.backend.routers.pagination import Pagination, decode_offset_cursor, encode_offset_cursor
+from src.backend.search import SearchBackend, get_search_backend
+
+SEARCH_KINDS: tuple[SearchKind, ...] = get_args(SearchKind)
+
+SearchRouter = APIRouter(
+    dependencies=[Depends(AuthHelper.bearer_token)],
+    tags=["Search"],
+    prefix="/search",
+)
+
+
+@SearchRouter.get(
+    "",
+    status_code=status.HTTP_200_OK,
+    response_model=SearchResults,
+    summary="Search contacts and apiaries",
+    description="Full text search over contact names, addresses and notes and apiary names and notes, most relevant "
+    "first. Every term must match and the last matches as a prefix",
+)
+async def search_resources(
+    q: Annotated[str, Query(min_length=1, max_length=256, description="Words to search for", examples=["pooh tree"])],
+    pagination: Annotated[Pagination, Depends()],
+    db: Annotated[AsyncSession, Depends(get_async_session)],
+    scope: Annotated[OrgScope, Depends(AuthHelper.org_scope)],
+    search: Annotated[SearchBackend, Depends(get_search_backend)],
+    cached: Annotated[CachedResponse, Depends(cached_response("search"))],
+    kind: Annotated[
+        list[SearchKind] | None, Query(description="Kinds of object to search, all if unset", examples=[["contact"]])
+    ] = None,
+) -> SearchResults | Response:
+    # ranked results have no stable key to seek from, so the cursor carries an offset
+    offset = decode_offset_cursor(pagination.cursor) if pagination.cursor is not None else 0
+    if (response := await cached.lookup()) is not None:
+        return response
+    kinds = tuple(dict.fromkeys(kind)) if kind else SEARCH_KINDS
+    hits = await search.search(db, q, kinds, scope, pagination.limit + 1, offset)
+    next_cursor = encode_offset_cursor(offset + pagination.limit) if len(hits) > pagination.limit else None
+    return await cached.store(public_page(SearchResults, results=hits[: pagination.limit], next_cursor=next_cursor))
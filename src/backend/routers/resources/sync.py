@@ -0,0 +1,50 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, status, Query, Request, Response
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.backend.auth import AuthHelper, OrgScope
+from src.backend.helpers.serialise import MSGPACK_MEDIA_TYPE, VARY_ACCEPT, packb, wants_msgpack
+from src.backend.models import SyncBatch, get_async_session
+from src.backend.routers.sync import sync_batch
+
+DEFAULT_SYNC_BATCH = 1000
+MAX_SYNC_BATCH = 5000
+
+SyncRouter = APIRouter(
+    dependencies=[Depends(AuthHelper.bearer_token)],
+    tags=["Sync"],
+    prefix="/sync",
+)
+
+
+@SyncRouter.get(
+    "",
+    status_code=status.HTTP_200_OK,
+    response_model=SyncBatch,
+    responses={
+        200: {
+            "content": {MSGPACK_MEDIA_TYPE: {}},
+            "description": "The batch as MessagePack with `Accept: application/msgpack`",
+        }
+    },
+    summary="Get the changes since the last sync",
+    description="Get the orgs, users, memberships, contacts and apiaries created, changed or deleted since `since`, the "
+    "token from the previous batch, or everything without one. Repeat with each batch's token while `more` is true. When "
+    "`reset` is true the batch starts again from nothing, e.g. after the caller's orgs changed",
+)
+async def sync_changes(
+    request: Request,
+    db: Annotated[AsyncSession, Depends(get_async_session)],
+    scope: Annotated[OrgScope, Depends(AuthHelper.org_scope)],
+    since: Annotated[str | None, Query(description="The token from the previous batch, unset to get everything")] = None,
+    limit: Annotated[
+        int,
+        Query(ge=1, le=MAX_SYNC_BATCH, description="Changes per batch, exceeded only to keep one write's changes together"),
+    ] = DEFAULT_SYNC_BATCH,
+) -> SyncBatch | Response:
+    batch = await sync_batch(db, scope, since, limit)
+    # batches change with every write, so they are not kept in the response cache
+    if wants_msgpack(request):
+        return Response(packb(batch.model_dump(mode="json")), media_type=MSGPACK_MEDIA_TYPE, headers=VARY_ACCEPT)
+    return Response(batch.model_dump_json().encode(), media_type="application/json", headers=VARY_ACCEPT)
@@ -1,11 +1,42 @@
 from typing import Annotated
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, status, Path, HTTPException
-from sqlmodel import Session, select
+from fastapi import APIRouter, Depends, status, Path, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from src.backend.auth import AuthHelper
-from src.backend.models import Users, UsersList, Organisations, get_session, UsersPublic, UsersCreate, UsersPublicWithOrgs
+from src.backend.auth import AuthHelper, OrgScope
+from src.backend.cache import CacheBackend, CachedResponse, cached_response, get_response_cache
+from src.backend.helpers import Config, get_config
+from src.backend.helpers.serialise import public_page, to_public
+from src.backend.models import (
+    BulkDelete,
+    BulkDeleteResult,
+    BulkResult,
+    Membership,
+    UsersBulkCreate,
+    Users,
+    UsersList,
+    Organisations,
+    OrganisationsList,
+    OrganisationsPublic,
+    UserToOrgLink,
+    get_async_session,
+    UsersPublic,
+    UsersCreate,
+    UsersPublicWithOrgs,
+)
+from src.backend.routers.expand import expand_query, load_options, expanded_model
+from src.backend.routers.bulk import bulk_request_body, bulk_write, read_bulk_rows
+from src.backend.routers.deletes import bulk_delete_result, delete_users
+from src.backend.routers.listing import ListQuery, list_query
+from src.backend.routers.memberships import add_membership, remove_membership
+from src.backend.routers.scoped_writes import require_admin
+from src.backend.routers.pagination import Pagination, paginate, paginate_rows, wants_ndjson, ndjson_response, NDJSON_RESPONSE
+
+USER_RELATIONS = ("orgs",)
+USER_LISTING = list_query(Users, Users.user_id, UsersPublic, filterable=("username",), sortable=("username",))
 
 UserRouter = APIRouter(
     dependencies=[Depends(AuthHelper.bearer_token)],
@@ -18,28 +49,54 @@ UserRouter = APIRouter(
     "/",
     status_code=status.HTTP_200_OK,
     response_model=UsersList,
+    responses=NDJSON_RESPONSE,
     summary="Get list of all users",
-    description="Get list of all users",
+    description="Get a page of users, or stream every user after the cursor with `Accept: application/x-ndjson`. "
+    "Filter with `filter`, sort with `order_by` and return only some fields with `fields`",
 )
-async def get_users_list(db: Annotated[Session, Depends(get_session)]) -> UsersList | None:
-    users = db.scalars(select(Users)).all()
-    return UsersList(users=users)
+async def get_users_list(
+    request: Request,
+    pagination: Annotated[Pagination, Depends()],
+    listing: Annotated[ListQuery, Depends(USER_LISTING)],
+    db: Annotated[AsyncSession, Depends(get_async_session)],
+    scope: Annotated[OrgScope, Depends(AuthHelper.org_scope)],
+    cached: Annotated[CachedResponse, Depends(cached_response("users"))],
+) -> UsersList | StreamingResponse | Response:
+    statement = scope.users(listing.statement())
+    if wants_ndjson(request):
+        return ndjson_response(db.bind, statement, Users.user_id, pagination, UsersPublic, listing.sort, listing.fields)
+    if (response := await cached.lookup()) is not None:
+        return response
+    if listing.fields is not None:
+        rows, next_cursor = await paginate_rows(db, statement, Users.user_id, pagination, listing.sort)
+        return await cached.store_value(listing.projected_page("users", rows, next_cursor))
+    users, next_cursor = await paginate(db, statement, Users.user_id, pagination, listing.sort)
+    return await cached.store(
+        public_page(UsersList, users=[to_public(UsersPublic, u) for u in users], next_cursor=next_cursor)
+    )
 
 
 @UserRouter.get(
     "/{user_id}",
     status_code=status.HTTP_200_OK,
     response_model=UsersPublicWithOrgs | None,
+    response_model_exclude_unset=True,
     summary="Get a specific user",
-    description="Get a specific user",
+    description="Get a specific user, with the relations chosen by `expand`",
 )
 async def get_user_by_id(
     user_id: Annotated[UUID, Path(..., description="Internal ID of a user", example="12345678-1234-1234-1234-123456789012")],
-    db: Annotated[Session, Depends(get_session)],
-) -> type[Users | None]:
-    user = db.get(Users, user_id)
+    expand: Annotated[set[str], Depends(expand_query(*USER_RELATIONS))],
+    db: Annotated[AsyncSession, Depends(get_async_session)],
+    scope: Annotated[OrgScope, Depends(AuthHelper.org_scope)],
+    cached: Annotated[CachedResponse, Depends(cached_response("users:{user_id}", "users:*"))],
+) -> UsersPublicWithOrgs | Response:
+    if (response := await cached.lookup()) is not None:
+        return response
+    statement = scope.users(select(Users).where(Users.user_id == user_id)).options(*load_options(Users, expand, scope))
+    user = (await db.scalars(statement)).first()
     if user is not None:
-        return user
+        return await cached.store(expanded_model(UsersPublicWithOrgs, user, USER_RELATIONS, expand), exclude_unset=True)
     raise HTTPException(status_code=404, detail="No such User")
 
 
@@ -52,47 +109,165 @@ async def get_user_by_id(
 )
 async def create_new_user(
     user: UsersCreate,
-    db: Annotated[Session, Depends(get_session)],
-) -> Users:
-    with db.begin():
+    db: Annotated[AsyncSession, Depends(get_async_session)],
+    cache: Annotated[CacheBackend, Depends(get_response_cache)],
+    scope: Annotated[OrgScope, Depends(AuthHelper.org_scope)],
+) -> UsersPublic:
+    # a new user is in no org, so only an admin could see it
+    require_admin(scope, "Only admins can create users")
+    async with db.begin():
         db_user = Users.model_validate(user)
         db.add(db_user)
-    db.refresh(db_user)
-    return db_user
+    await cache.invalidate("users")
+    await db.refresh(db_user)
+    return to_public(UsersPublic, db_user)
+
+
+@UserRouter.post(
+    "/bulk",
+    status_code=status.HTTP_200_OK,
+    response_model=BulkResult,
+    openapi_extra=bulk_request_body(UsersBulkCreate),
+    summary="Create many users",
+    description="Create users from a JSON array or an NDJSON stream, written in chunked transactions with a result per "
+    "row. With `upsert` rows whose user_id already exists are updated instead",
+)
+async def bulk_create_users(
+    request: Request,
+    config: Annotated[Config, Depends(get_config)],
+    db: Annotated[AsyncSession, Depends(get_async_session)],
+    cache: Annotated[CacheBackend, Depends(get_response_cache)],
+    scope: Annotated[OrgScope, Depends(AuthHelper.org_scope)],
+    upsert: Annotated[bool, Query(description="Update rows whose user_id already exists")] = False,
+) -> BulkResult:
+    require_admin(scope, "Only admins can create users")
+    rows = read_bulk_rows(request)
+    result = await bulk_write(db, rows, Users, UsersBulkCreate, "user_id", upsert, config.bulk_chunk_size)
+    await cache.invalidate("users", "users:*", "orgs:*")
+    return result
 
 
 @UserRouter.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT, summary="Delete a user", description="Delete a user")
 async def delete_user_by_id(
     user_id: Annotated[UUID, Path(..., description="Internal ID of a user", example="12345678-1234-1234-1234-123456789012")],
-    db: Annotated[Session, Depends(get_session)],
+    db: Annotated[AsyncSession, Depends(get_async_session)],
+    cache: Annotated[CacheBackend, Depends(get_response_cache)],
+    scope: Annotated[OrgScope, Depends(AuthHelper.org_scope)],
 ) -> None:
-    with db.begin():
-        user = db.get(Users, user_id)
-        if user is None:
+    async with db.begin():
+        if not await delete_users(db, [user_id], scope):
             raise HTTPException(status_code=404, detail="User not found")
-        db.delete(user)
+    await cache.invalidate("users", f"users:{user_id}", "orgs:*")
     return None
 
 
+@UserRouter.post(
+    "/bulk/delete",
+    status_code=status.HTTP_200_OK,
+    response_model=BulkDeleteResult,
+    summary="Delete many users",
+    description="Delete users by ID in one transaction, removing them from their orgs",
+)
+async def bulk_delete_users(
+    request: BulkDelete,
+    db: Annotated[AsyncSession, Depends(get_async_session)],
+    cache: Annotated[CacheBackend, Depends(get_response_cache)],
+    scope: Annotated[OrgScope, Depends(AuthHelper.org_scope)],
+) -> BulkDeleteResult:
+    async with db.begin():
+        deleted = await delete_users(db, request.ids, scope)
+    await cache.invalidate("users", "users:*", "orgs:*")
+    return bulk_delete_result(request.ids, deleted)
+
+
+@UserRouter.get(
+    "/{user_id}/orgs",
+    status_code=status.HTTP_200_OK,
+    response_model=OrganisationsList,
+    summary="Get the orgs a user is in",
+    description="Get a page of the user's orgs, ordered by org_id",
+)
+async def get_user_organisations(
+    user_id: Annotated[UUID, Path(..., description="Internal ID of a user", example="12345678-1234-1234-1234-123456789012")],
+    pagination: Annotated[Pagination, Depends()],
+    db: Annotated[AsyncSession, Depends(get_async_session)],
+    scope: Annotated[OrgScope, Depends(AuthHelper.org_scope)],
+    cached: Annotated[CachedResponse, Depends(cached_response("users:{user_id}", "users:*"))],
+) -> OrganisationsList | Response:
+    if (response := await cached.lookup()) is not None:
+        return response
+    if await db.scalar(scope.users(select(Users.user_id).where(Users.user_id == user_id))) is None:
+        raise HTTPException(status_code=404, detail="No such User")
+    statement = scope.orgs(
+        select(Organisations)
+        .join(UserToOrgLink, UserToOrgLink.org_id == Organisations.org_id)
+        .where(UserToOrgLink.user_id == user_id)
+    )
+    # keyed on the link's org_id so the page is read in order from the (user_id, org_id) primary key
+    orgs, next_cursor = await paginate(db, statement, UserToOrgLink.org_id, pagination)
+    return await cached.store(
+        public_page(OrganisationsList, orgs=[to_public(OrganisationsPublic, o) for o in orgs], next_cursor=next_cursor)
+    )
+
+
 @UserRouter.put(
     "/{user_id}/{org_id}",
     status_code=status.HTTP_200_OK,
     response_model=UsersPublicWithOrgs,
+    deprecated=True,
     summary="Add a user to an org",
-    description="Add a user to an org",
+    description="Deprecated: use `PUT /users/{user_id}/orgs/{org_id}`, which adds the user without reading every org "
+    "back, and `GET /users/{user_id}/orgs` to page through the user's orgs. Adds a user to an org and returns the user "
+    "with all of their orgs, which takes longer the more orgs they are in",
 )
 async def add_user_to_org(
     user_id: Annotated[UUID, Path(..., description="Internal ID of a user", example="12345678-1234-1234-1234-123456789012")],
     org_id: Annotated[UUID, Path(..., description="Internal ID of a org", example="12345678-1234-1234-1234-123456789012")],
-    db: Annotated[Session, Depends(get_session)],
-):
-    with db.begin():
-        user = db.get(Users, user_id)
-        if user is None:
-            raise HTTPException(status_code=404, detail="No User to add")
-        org = db.get(Organisations, org_id)
-        if org is None:
-            raise HTTPException(status_code=404, detail="Organisation not found")
-        org.users.append(user)
-    db.refresh(user)
-    return user
+    db: Annotated[AsyncSession, Depends(get_async_session)],
+    cache: Annotated[CacheBackend, Depends(get_response_cache)],
+    scope: Annotated[OrgScope, Depends(AuthHelper.org_scope)],
+) -> UsersPublicWithOrgs:
+    async with db.begin():
+        await add_membership(db, user_id, org_id, scope)
+    await cache.invalidate("users", f"orgs:{org_id}", f"users:{user_id}")
+    user = await db.get(Users, user_id, options=load_options(Users, {"orgs"}, scope))
+    return to_public(UsersPublicWithOrgs, user)
+
+
+@UserRouter.put(
+    "/{user_id}/orgs/{org_id}",
+    status_code=status.HTTP_200_OK,
+    response_model=Membership,
+    summary="Add a user to an org",
+    description="Add a user to an org, doing nothing if they are already a member",
+)
+async def add_user_membership(
+    user_id: Annotated[UUID, Path(..., description="Internal ID of a user", example="12345678-1234-1234-1234-123456789012")],
+    org_id: Annotated[UUID, Path(..., description="Internal ID of a org", example="12345678-1234-1234-1234-123456789012")],
+    db: Annotated[AsyncSession, Depends(get_async_session)],
+    cache: Annotated[CacheBackend, Depends(get_response_cache)],
+    scope: Annotated[OrgScope, Depends(AuthHelper.org_scope)],
+) -> Membership:
+    async with db.begin():
+        membership = await add_membership(db, user_id, org_id, scope)
+    await cache.invalidate("users", f"orgs:{org_id}", f"users:{user_id}")
+    return membership
+
+
+@UserRouter.delete(
+    "/{user_id}/orgs/{org_id}",
+    status_code=status.HTTP_204_NO_CONTENT,
+    summary="Remove a user from an org",
+    description="Remove a user from an org",
+)
+async def remove_user_membership(
+    user_id: Annotated[UUID, Path(..., description="Internal ID of a user", example="12345678-1234-1234-1234-123456789012")],
+    org_id: Annotated[UUID, Path(..., description="Internal ID of a org", example="12345678-1234-1234-1234-123456789012")],
+    db: Annotated[AsyncSession, Depends(get_async_session)],
+    cache: Annotated[CacheBackend, Depends(get_response_cache)],
+    scope: Annotated[OrgScope, Depends(AuthHelper.org_scope)],
+) -> None:
+    async with db.begin():
+        await remove_membership(db, user_id, org_id, scope)
+    await cache.invalidate("users", f"orgs:{org_id}", f"users:{user_id}")
+    return None
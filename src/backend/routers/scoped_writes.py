@@ -0,0 +1,74 @@
+from typing import Any, Awaitable, Callable
+from uuid import UUID
+
+from fastapi import HTTPException, status
+from sqlalchemy import not_, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.backend.auth import OrgScope
+from src.backend.models import Apiary, Contacts
+
+# reads hide other orgs' rows and writes must not reach them either. A write naming a row or org the caller cannot see
+# is answered as if it did not exist, and rows that cannot be put in one of the caller's orgs are only created by admins
+
+RowCheck = Callable[[AsyncSession, OrgScope, list[dict]], Awaitable[list[str | None]]]
+
+
+def require_admin(scope: OrgScope, detail: str) -> None:
+    if scope.org_ids is not None:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=detail)
+
+
+async def writable_ids(db: AsyncSession, scope: OrgScope, key: Any, ids: list[UUID]) -> list[UUID]:
+    condition = scope.writable(key.class_)
+    if condition is None:
+        return ids
+    found = set(await db.scalars(select(key).where(key.in_(ids), condition)))
+    return [id_ for id_ in ids if id_ in found]
+
+
+async def taken_ids(db: AsyncSession, scope: OrgScope, key: Any, ids: list[UUID]) -> set[UUID]:
+    # ids of rows the caller may not change, which an upsert must not overwrite
+    return set(await db.scalars(select(key).where(key.in_(ids), not_(scope.writable(key.class_)))))
+
+
+async def check_apiaries(db: AsyncSession, scope: OrgScope, rows: list[dict]) -> list[str | None]:
+    if scope.org_ids is None:
+        return [None] * len(rows)
+    contact_ids = {row["contact_id"] for row in rows if row.get("contact_id") is not None}
+    statement = scope.contacts(select(Contacts.contact_id).where(Contacts.contact_id.in_(contact_ids)))
+    visible_contacts = set(await db.scalars(statement)) if contact_ids else set()
+    taken = await taken_ids(db, scope, Apiary.apiary_id, [row["apiary_id"] for row in rows])
+    details: list[str | None] = []
+    for row in rows:
+        if row.get("org_id") not in scope.org_ids:
+            details.append("Org not found")
+        elif row.get("contact_id") is not None and row["contact_id"] not in visible_contacts:
+            details.append("Contact not found")
+        elif row["apiary_id"] in taken:
+            details.append("Apiary not found")
+        else:
+            details.append(None)
+    return details
+
+
+async def check_contacts(db: AsyncSession, scope: OrgScope, rows: list[dict]) -> list[str | None]:
+    if scope.org_ids is None:
+        return [None] * len(rows)
+    taken = await taken_ids(db, scope, Contacts.contact_id, [row["contact_id"] for row in rows])
+    details: list[str | None] = []
+    for row in rows:
+        # a contact in no org, or another org, could never be read back by the caller
+        if row.get("org_id") not in scope.org_ids:
+            details.append("Org not found")
+        elif row["contact_id"] in taken:
+            details.append("Contact not found")
+        else:
+            details.append(None)
+    return details
+
+
+async def require_row(db: AsyncSession, scope: OrgScope, check: RowCheck, row: dict) -> None:
+    detail = (await check(db, scope, [row]))[0]
+    if detail is not None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=detail)
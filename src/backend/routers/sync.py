@@ -0,0 +1,159 @@
+import json
+from binascii import Error as Base64Error
+from dataclasses import dataclass
+from hashlib import blake2b
+from typing import Any, Callable
+
+from fastapi import HTTPException, status
+from sqlalchemy import or_, select
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlmodel.sql.expression import SelectOfScalar
+
+from src.backend.auth import OrgScope
+from src.backend.helpers.serialise import public_page, to_public
+from src.backend.models import (
+    Apiary,
+    ApiaryPublic,
+    Contacts,
+    ContactsPublic,
+    MembershipPublic,
+    Organisations,
+    OrganisationsPublic,
+    SyncBatch,
+    SyncDeleted,
+    SyncState,
+    SyncTombstone,
+    committed_version,
+    UserToOrgLink,
+    Users,
+    UsersPublic,
+)
+from src.backend.routers.pagination import urlsafe_decode, urlsafe_encode
+
+
+@dataclass(frozen=True)
+class ChangeSource:
+    name: str
+    model: type[SQLModel]
+    public_model: type[SQLModel] | None
+    scoped: Callable[[OrgScope, Any], Any]
+    key: tuple[Any, ...]
+
+    def changes(self, scope: OrgScope, since: int, until: int) -> SelectOfScalar:
+        version = self.model.version
+        return self.scoped(scope, select(self.model)).where(version > since, version <= until).order_by(version)
+
+
+def scoped_tombstones(scope: OrgScope, statement: SelectOfScalar) -> SelectOfScalar:
+    if scope.org_ids is None:
+        return statement
+    # deleted users and contacts belong to no org and their tombstones go to every caller, ones that left an org go to
+    # that org's callers
+    return statement.where(or_(SyncTombstone.org_id.is_(None), SyncTombstone.org_id.in_(scope.org_ids)))
+
+
+SYNC_SOURCES = (
+    ChangeSource("orgs", Organisations, OrganisationsPublic, OrgScope.orgs, (Organisations.org_id,)),
+    ChangeSource("users", Users, UsersPublic, OrgScope.users, (Users.user_id,)),
+    ChangeSource(
+        "memberships", UserToOrgLink, MembershipPublic, OrgScope.memberships, (UserToOrgLink.user_id, UserToOrgLink.org_id)
+    ),
+    ChangeSource("contacts", Contacts, ContactsPublic, OrgScope.contacts, (Contacts.contact_id,)),
+    ChangeSource("apiaries", Apiary, ApiaryPublic, OrgScope.apiaries, (Apiary.apiary_id,)),
+)
+TOMBSTONES = ChangeSource("deleted", SyncTombstone, None, scoped_tombstones, (SyncTombstone.tombstone_id,))
+
+
+def encode_sync_token(version: int, scope_digest: str) -> str:
+    # the caller's orgs are kept in the token so changes are only ever sent on top of a sync with the same scope
+    return urlsafe_encode(json.dumps([version, scope_digest]).encode())
+
+
+def decode_sync_token(token: str) -> tuple[int, str]:
+    try:
+        version, scope_digest = json.loads(urlsafe_decode(token))
+        if not isinstance(version, int) or version < 0 or not isinstance(scope_digest, str):
+            raise ValueError(version)
+        return version, scope_digest
+    except (Base64Error, ValueError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid sync token")
+
+
+def scope_digest(scope: OrgScope) -> str:
+    return blake2b(scope.key.encode(), digest_size=8).hexdigest()
+
+
+def starting_version(token: str | None, scope: OrgScope, oldest_version: int) -> int | None:
+    if token is None:
+        return None
+    version, digest = decode_sync_token(token)
+    # deletes before the oldest version are forgotten and other orgs' changes were never sent, so those start again
+    if version < oldest_version or digest != scope_digest(scope):
+        return None
+    return version
+
+
+async def read_changes(
+    db: AsyncSession, sources: tuple[ChangeSource, ...], scope: OrgScope, since: int, upper: int, limit: int
+) -> tuple[dict[ChangeSource, list[Any]], int]:
+    fetched = {source: list(await db.scalars(source.changes(scope, since, upper).limit(limit))) for source in sources}
+    versions = sorted(row.version for rows in fetched.values() for row in rows)
+    if len(versions) < limit:
+        return fetched, upper
+    # the batch ends after a whole version so no write is half sent, which can take it over the limit. only a source
+    # that filled its limit on that version can have more rows with it
+    until = versions[limit - 1]
+    for source, rows in fetched.items():
+        if len(rows) == limit and rows[-1].version == until:
+            fetched[source] = list(await db.scalars(source.changes(scope, since, until)))
+        else:
+            fetched[source] = [row for row in rows if row.version <= until]
+    return fetched, until
+
+
+def tombstone_key(tombstone: SyncTombstone) -> tuple[Any, ...]:
+    return (tombstone.object_id, tombstone.org_id) if tombstone.kind == "memberships" else (tombstone.object_id,)
+
+
+async def unseen_tombstones(db: AsyncSession, scope: OrgScope, tombstones: list[SyncTombstone]) -> list[SyncTombstone]:
+    # a row that left one org can still be visible through another, or have come back since, and then it was sent with
+    # its new version instead
+    visible = set()
+    for source in SYNC_SOURCES:
+        keys = {tombstone_key(tombstone) for tombstone in tombstones if tombstone.kind == source.name}
+        if keys:
+            statement = select(*source.key).where(source.key[0].in_({key[0] for key in keys}))
+            visible.update((source.name, *row) for row in await db.execute(source.scoped(scope, statement)))
+    return [tombstone for tombstone in tombstones if (tombstone.kind, *tombstone_key(tombstone)) not in visible]
+
+
+def deleted_rows(tombstones: list[SyncTombstone]) -> SyncDeleted:
+    deleted: dict[str, list[Any]] = {name: [] for name in SyncDeleted.model_fields}
+    # a row that left an org and was then deleted has a tombstone for each, the client drops it once
+    unique = {(tombstone.kind, *tombstone_key(tombstone)): tombstone for tombstone in tombstones}
+    for tombstone in unique.values():
+        if tombstone.kind == "memberships":
+            deleted["memberships"].append(MembershipPublic(user_id=tombstone.object_id, org_id=tombstone.org_id))
+        else:
+            deleted[tombstone.kind].append(tombstone.object_id)
+    return public_page(SyncDeleted, **deleted)
+
+
+async def sync_batch(db: AsyncSession, scope: OrgScope, token: str | None, limit: int) -> SyncBatch:
+    # every row written by transactions that commit after this read has a higher version, so it lands in a later batch
+    committed = committed_version(db.bind.dialect.name)
+    upper, oldest_version = (await db.execute(select(committed, SyncState.oldest_version))).one()
+    since = starting_version(token, scope, oldest_version)
+    # a client starting again gets every row as it is now, so it needs no tombstones
+    sources = SYNC_SOURCES if since is None else (*SYNC_SOURCES, TOMBSTONES)
+    fetched, until = await read_changes(db, sources, scope, since or 0, upper, limit)
+    tombstones = await unseen_tombstones(db, scope, fetched.get(TOMBSTONES, []))
+    return public_page(
+        SyncBatch,
+        reset=since is None,
+        **{source.name: [to_public(source.public_model, row) for row in fetched[source]] for source in SYNC_SOURCES},
+        deleted=deleted_rows(tombstones),
+        token=encode_sync_token(until, scope_digest(scope)),
+        more=until < upper,
+    )
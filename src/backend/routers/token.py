@@ -0,0 +1,54 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, HTTPException, status
+
+from src.backend.auth import AuthHelper, TokenIssuer, TokenIssuerError
+from src.backend.models import Credentials, RefreshRequest, Token
+
+TokenRouter = APIRouter(tags=["Admin"])
+
+
+def token_model(token: dict) -> Token:
+    return Token(
+        token_type=token["token_type"],
+        access_token=token["access_token"],
+        expires_in=token["expires_in"],
+        refresh_expires_in=token["refresh_expires_in"],
+        refresh_token=token["refresh_token"],
+    )
+
+
+@TokenRouter.post(
+    "/gettoken",
+    status_code=status.HTTP_200_OK,
+    response_model=Token,
+    summary="Get a JWT token",
+    description="an end point for getting a JWT token",
+)
+async def gettoken(
+    credentials: Credentials,
+    issuer: Annotated[TokenIssuer, Depends(AuthHelper.get_token_issuer)],
+) -> Token:
+    try:
+        token = await issuer.password_grant(credentials.username, credentials.password)
+    except TokenIssuerError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    return token_model(token)
+
+
+@TokenRouter.post(
+    "/refreshtoken",
+    status_code=status.HTTP_200_OK,
+    response_model=Token,
+    summary="Refresh a JWT token",
+    description="Exchange a refresh token for a new token. Concurrent refreshes of the same token share one upstream call",
+)
+async def refreshtoken(
+    refresh: RefreshRequest,
+    issuer: Annotated[TokenIssuer, Depends(AuthHelper.get_token_issuer)],
+) -> Token:
+    try:
+        token = await issuer.refresh_grant(refresh.refresh_token)
+    except TokenIssuerError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    return token_model(token)
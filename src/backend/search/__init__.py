@@ -0,0 +1,43 @@
+from asyncio import Lock
+from typing import Annotated, Callable
+from weakref import WeakKeyDictionary
+
+from fastapi import Depends
+from sqlalchemy import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from src.backend.helpers import Config, get_config
+from src.backend.models import get_async_db_engine
+
+# from local files
+from .backends import SEARCH_SOURCES, LikeSearchBackend, SearchBackend, SearchSource  # noqa: F401
+from .fts5 import Fts5SearchBackend, fts5_available  # noqa: F401
+
+SEARCH_BACKENDS: dict[str, Callable[[], SearchBackend]] = {
+    "fts5": Fts5SearchBackend,
+    "like": LikeSearchBackend,
+}
+
+# the index lives in the database, so each engine gets its own backend set up against it
+search_backends: WeakKeyDictionary[Engine, SearchBackend] = WeakKeyDictionary()
+search_backends_lock = Lock()
+
+
+async def get_search_backend(
+    config: Annotated[Config, Depends(get_config)],
+    db_engine: Annotated[AsyncEngine, Depends(get_async_db_engine)],
+) -> SearchBackend:
+    backend = search_backends.get(db_engine.sync_engine)
+    if backend is not None:
+        return backend
+    async with search_backends_lock:
+        if db_engine.sync_engine not in search_backends:
+            name = config.search_backend
+            if name == "auto":
+                name = "fts5" if await fts5_available(db_engine) else "like"
+            if name not in SEARCH_BACKENDS:
+                raise ValueError(f"Unknown search backend: {name}")
+            backend = SEARCH_BACKENDS[name]()
+            await backend.setup(db_engine)
+            search_backends[db_engine.sync_engine] = backend
+    return search_backends[db_engine.sync_engine]
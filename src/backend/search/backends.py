@@ -0,0 +1,102 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Any, Callable
+from uuid import UUID
+
+from sqlalchemy import ColumnElement, and_, case, desc, literal, null, or_, select, union_all
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.orm import InstrumentedAttribute
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.backend.auth import OrgScope
+from src.backend.helpers.serialise import to_public
+from src.backend.models import Apiary, Contacts, SearchHit, SearchKind
+
+
+@dataclass(frozen=True)
+class SearchSource:
+    model: type[SQLModel]
+    key: InstrumentedAttribute
+    name: str
+    body: tuple[str, ...]
+    scoped: Callable[[OrgScope, Any], Any]
+
+    def columns(self) -> list[InstrumentedAttribute]:
+        return [getattr(self.model, column) for column in (self.name, *self.body)]
+
+    def body_text(self, row: dict) -> str:
+        return " ".join(row[column] for column in self.body if row.get(column))
+
+
+SEARCH_SOURCES: dict[str, SearchSource] = {
+    "apiary": SearchSource(Apiary, Apiary.apiary_id, "name", ("apiary_notes",), OrgScope.apiaries),
+    "contact": SearchSource(Contacts, Contacts.contact_id, "name", ("address", "contact_notes"), OrgScope.contacts),
+}
+
+
+def search_terms(q: str) -> list[str]:
+    return q.split()
+
+
+class SearchBackend(ABC):
+    @abstractmethod
+    async def setup(self, engine: AsyncEngine) -> None: ...
+
+    @abstractmethod
+    async def index(self, db: AsyncSession, kind: SearchKind, rows: list[dict]) -> None: ...
+
+    @abstractmethod
+    async def remove(self, db: AsyncSession, kind: SearchKind, ids: list[UUID]) -> None: ...
+
+    @abstractmethod
+    async def rebuild(self, db: AsyncSession) -> None: ...
+
+    @abstractmethod
+    async def search(
+        self, db: AsyncSession, q: str, kinds: tuple[SearchKind, ...], scope: OrgScope, limit: int, offset: int
+    ) -> list[SearchHit]: ...
+
+
+class LikeSearchBackend(SearchBackend):
+    # needs no index of its own, so it works on any database but scans the tables for every search
+    async def setup(self, engine: AsyncEngine) -> None:
+        return None
+
+    async def index(self, db: AsyncSession, kind: SearchKind, rows: list[dict]) -> None:
+        return None
+
+    async def remove(self, db: AsyncSession, kind: SearchKind, ids: list[UUID]) -> None:
+        return None
+
+    async def rebuild(self, db: AsyncSession) -> None:
+        return None
+
+    async def search(
+        self, db: AsyncSession, q: str, kinds: tuple[SearchKind, ...], scope: OrgScope, limit: int, offset: int
+    ) -> list[SearchHit]:
+        terms = search_terms(q)
+        if not terms:
+            return []
+        statements = []
+        for kind in kinds:
+            source = SEARCH_SOURCES[kind]
+            name = getattr(source.model, source.name)
+            every_term: list[ColumnElement] = [
+                or_(*(column.icontains(term, autoescape=True) for column in source.columns())) for term in terms
+            ]
+            # a name holding every term ranks above a match that needed the notes
+            score = case((and_(*(name.icontains(term, autoescape=True) for term in terms)), 2.0), else_=1.0)
+            statement = select(
+                literal(kind).label("kind"),
+                source.key.label("id"),
+                name.label("name"),
+                score.label("score"),
+                null().label("snippet"),
+            ).where(*every_term)
+            statements.append(source.scoped(scope, statement))
+        matches = union_all(*statements).subquery()
+        rows = await db.execute(
+            select(matches).order_by(desc(matches.c.score), matches.c.name, matches.c.id).limit(limit).offset(offset)
+        )
+        return [to_public(SearchHit, row) for row in rows]
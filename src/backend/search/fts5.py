@@ -0,0 +1,166 @@
+from uuid import UUID
+
+from sqlalchemy import (
+    Column,
+    ColumnElement,
+    Index,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    Uuid,
+    and_,
+    column,
+    delete,
+    desc,
+    false,
+    func,
+    literal,
+    literal_column,
+    or_,
+    select,
+    table,
+    text,
+    tuple_,
+)
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.backend.auth import OrgScope
+from src.backend.helpers.serialise import to_public
+from src.backend.models import SearchHit, SearchKind
+from .backends import SEARCH_SOURCES, SearchBackend, search_terms
+
+NAME_WEIGHT = 10.0
+BODY_WEIGHT = 1.0
+
+search_metadata = MetaData()
+# the text lives in an ordinary table keyed by (kind, object_id), so writes find their row through an index, and the
+# FTS5 table reads it as external content kept in step by triggers
+search_documents = Table(
+    "search_documents",
+    search_metadata,
+    Column("doc_id", Integer, primary_key=True),
+    Column("kind", String(16), nullable=False),
+    Column("object_id", Uuid, nullable=False),
+    Column("name", String, nullable=False),
+    Column("body", String, nullable=False),
+    Index("ix_search_documents_kind_object_id", "kind", "object_id", unique=True),
+)
+search_index = table("search_index", column("rowid", Integer))
+SEARCH_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5(name, body, content='search_documents', "
+    "content_rowid='doc_id', tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS search_documents_ai AFTER INSERT ON search_documents BEGIN "
+    "INSERT INTO search_index(rowid, name, body) VALUES (new.doc_id, new.name, new.body); END",
+    "CREATE TRIGGER IF NOT EXISTS search_documents_ad AFTER DELETE ON search_documents BEGIN "
+    "INSERT INTO search_index(search_index, rowid, name, body) VALUES ('delete', old.doc_id, old.name, old.body); END",
+    "CREATE TRIGGER IF NOT EXISTS search_documents_au AFTER UPDATE ON search_documents BEGIN "
+    "INSERT INTO search_index(search_index, rowid, name, body) VALUES ('delete', old.doc_id, old.name, old.body); "
+    "INSERT INTO search_index(rowid, name, body) VALUES (new.doc_id, new.name, new.body); END",
+)
+
+
+def match_expression(q: str) -> str:
+    # every term is quoted so user input is never read as FTS5 syntax, the last one matches as a prefix while typing
+    terms = ['"' + term.replace('"', '""') + '"' for term in search_terms(q)]
+    if terms:
+        terms[-1] += "*"
+    return " ".join(terms)
+
+
+async def fts5_available(engine: AsyncEngine) -> bool:
+    if engine.dialect.name != "sqlite":
+        return False
+    async with engine.connect() as conn:
+        options = (await conn.scalars(text("PRAGMA compile_options"))).all()
+    return "ENABLE_FTS5" in options
+
+
+class Fts5SearchBackend(SearchBackend):
+    async def setup(self, engine: AsyncEngine) -> None:
+        async with engine.begin() as conn:
+            exists = await conn.scalar(text("SELECT 1 FROM sqlite_master WHERE name = 'search_index'"))
+            await conn.run_sync(search_metadata.create_all)
+            for ddl in SEARCH_DDL:
+                await conn.execute(text(ddl))
+        # rows written before the index existed are only searchable once it has been filled from the tables
+        if not exists:
+            async with AsyncSession(engine) as session, session.begin():
+                await self.rebuild(session)
+
+    async def index(self, db: AsyncSession, kind: SearchKind, rows: list[dict]) -> None:
+        if not rows:
+            return None
+        source = SEARCH_SOURCES[kind]
+        statement = insert(search_documents)
+        statement = statement.on_conflict_do_update(
+            index_elements=["kind", "object_id"],
+            set_={"name": statement.excluded.name, "body": statement.excluded.body},
+        )
+        await db.execute(
+            statement,
+            [
+                {"kind": kind, "object_id": row[source.key.key], "name": row[source.name], "body": source.body_text(row)}
+                for row in rows
+            ],
+        )
+
+    async def remove(self, db: AsyncSession, kind: SearchKind, ids: list[UUID]) -> None:
+        if ids:
+            await db.execute(
+                delete(search_documents).where(
+                    tuple_(search_documents.c.kind, search_documents.c.object_id).in_([(kind, id_) for id_ in ids])
+                )
+            )
+
+    async def rebuild(self, db: AsyncSession) -> None:
+        await db.execute(delete(search_documents))
+        for kind, source in SEARCH_SOURCES.items():
+            body = literal("")
+            for name in source.body:
+                body = body + func.coalesce(getattr(source.model, name), "") + " "
+            await db.execute(
+                insert(search_documents).from_select(
+                    ["kind", "object_id", "name", "body"],
+                    select(literal(kind), source.key, getattr(source.model, source.name), func.trim(body)),
+                )
+            )
+
+    async def search(
+        self, db: AsyncSession, q: str, kinds: tuple[SearchKind, ...], scope: OrgScope, limit: int, offset: int
+    ) -> list[SearchHit]:
+        match = match_expression(q)
+        if not match:
+            return []
+        fts = literal_column("search_index")
+        # bm25 is lower for better matches, it is negated so the score reads higher is better like the other backends
+        score = -func.bm25(fts, NAME_WEIGHT, BODY_WEIGHT)
+        statement = (
+            select(
+                search_documents.c.kind,
+                search_documents.c.object_id.label("id"),
+                search_documents.c.name,
+                score.label("score"),
+                func.snippet(fts, -1, "[", "]", "…", 12).label("snippet"),
+            )
+            .select_from(search_index.join(search_documents, search_documents.c.doc_id == search_index.c.rowid))
+            .where(fts.op("MATCH")(match), self.visible(kinds, scope))
+            .order_by(desc("score"), search_documents.c.doc_id)
+            .limit(limit)
+            .offset(offset)
+        )
+        rows = await db.execute(statement)
+        return [to_public(SearchHit, row) for row in rows]
+
+    @staticmethod
+    def visible(kinds: tuple[SearchKind, ...], scope: OrgScope) -> ColumnElement[bool]:
+        allowed = []
+        for kind in kinds:
+            source = SEARCH_SOURCES[kind]
+            in_kind = search_documents.c.kind == kind
+            if scope.org_ids is not None:
+                in_kind = and_(in_kind, search_documents.c.object_id.in_(source.scoped(scope, select(source.key))))
+            allowed.append(in_kind)
+        return or_(false(), *allowed)
@@ -0,0 +1,3 @@
+# from local files
+from .retention import prune_sync_tombstones  # noqa: F401
+from .warmup import WARM_UP_STEPS, Readiness, WarmUpStep, import_phases, prefill_pool, warm_up  # noqa: F401
@@ -0,0 +1,27 @@
+import asyncio
+from datetime import timedelta
+
+from fastapi import FastAPI
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.backend.helpers import get_config, get_logger
+from src.backend.models import get_async_db_engine, prune_tombstones
+from src.backend.startup.warmup import overridden
+
+
+async def prune_sync_tombstones(app: FastAPI) -> None:
+    # every worker prunes, which is harmless as a prune that finds nothing expired changes nothing
+    config = get_config()
+    if overridden(app, get_async_db_engine):
+        return
+    retention = timedelta(seconds=config.sync_tombstone_retention)
+    while True:
+        await asyncio.sleep(config.sync_prune_interval)
+        try:
+            async with AsyncSession(await get_async_db_engine(config)) as db:
+                pruned = await prune_tombstones(db, retention)
+        except Exception as e:
+            get_logger().warning(f"Pruning sync tombstones failed: {type(e).__name__}: {e}")
+            continue
+        if pruned:
+            get_logger().info(f"Pruned {pruned} sync tombstones older than {retention}")
@@ -0,0 +1,129 @@
+import asyncio
+from time import perf_counter
+from typing import Any, Awaitable, Callable
+
+from fastapi import FastAPI
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.concurrency import run_in_threadpool
+
+from src.backend.auth import AuthHelper
+from src.backend.cache import get_response_cache, render_spec, spec_encodings
+from src.backend.helpers import Config, get_config, get_logger
+from src.backend.metrics import get_metrics
+from src.backend.models import ReadinessReport, get_async_db_engine
+from src.backend.search import get_search_backend
+
+WarmUpStep = Callable[[FastAPI, Config], Awaitable[None]]
+
+# set once by src.backend as it finishes importing, each app's phases start from it
+import_phases: dict[str, float] = {}
+
+
+class Readiness:
+    def __init__(self) -> None:
+        self.ready = False
+        self.phases: dict[str, float] = {}
+        self.failing: str | None = None
+        for phase, seconds in import_phases.items():
+            self.record(phase, seconds)
+
+    def record(self, phase: str, seconds: float) -> None:
+        self.phases[phase] = round(seconds, 4)
+        get_metrics().startup_seconds.set(seconds, (phase,))
+
+    def report(self) -> ReadinessReport:
+        return ReadinessReport(ready=self.ready, phases=self.phases, failing=self.failing)
+
+
+def overridden(app: FastAPI, *dependencies: Callable[..., Any]) -> bool:
+    # an overridden dependency is supplied from outside, as in the benchmarks, so there is nothing of ours to warm
+    return any(dependency in app.dependency_overrides for dependency in dependencies)
+
+
+async def prefill_pool(engine: AsyncEngine, count: int) -> None:
+    pool = engine.sync_engine.pool
+    # only queue pools are sized, the single connection pools used for sqlite memory dbs hold one
+    count = min(count, pool.size()) if hasattr(pool, "checkedin") else min(count, 1)
+    connections = await asyncio.gather(*(engine.connect().start() for _ in range(count)))
+    await asyncio.gather(*(connection.close() for connection in connections))
+
+
+async def warm_threadpool(app: FastAPI, config: Config) -> None:
+    # sync dependencies run in anyio's worker threads, and its backend is imported by the first one to run
+    await run_in_threadpool(get_config)
+
+
+async def warm_db_engine(app: FastAPI, config: Config) -> None:
+    # the engine creates any missing tables as it is built
+    if not overridden(app, get_async_db_engine):
+        await get_async_db_engine(config)
+
+
+async def warm_db_pool(app: FastAPI, config: Config) -> None:
+    if not overridden(app, get_async_db_engine):
+        prefill = config.db_pool_prefill if config.db_pool_prefill is not None else config.db_pool_size
+        await prefill_pool(await get_async_db_engine(config), prefill)
+
+
+async def warm_search_index(app: FastAPI, config: Config) -> None:
+    # a new full text index is filled from the tables while it is set up
+    if not overridden(app, get_async_db_engine, get_search_backend):
+        await get_search_backend(config, await get_async_db_engine(config))
+
+
+async def warm_caches(app: FastAPI, config: Config) -> None:
+    get_response_cache(config)
+    AuthHelper.get_token_cache(config)
+
+
+async def warm_signing_keys(app: FastAPI, config: Config) -> None:
+    if not overridden(app, AuthHelper.bearer_token, AuthHelper.get_token_verifier):
+        await asyncio.to_thread(AuthHelper.get_token_verifier(config).refresh_keys)
+
+
+async def warm_token_issuer(app: FastAPI, config: Config) -> None:
+    if not overridden(app, AuthHelper.get_token_issuer):
+        # builds the issuer and its pooled http client, connections to the auth server still open on the first login
+        AuthHelper.get_token_issuer(config).client
+
+
+async def warm_openapi(app: FastAPI, config: Config) -> None:
+    app.state.spec_documents = await asyncio.to_thread(render_spec, app, spec_encodings(config))
+
+
+WARM_UP_STEPS: dict[str, WarmUpStep] = {
+    "threadpool": warm_threadpool,
+    "db_engine": warm_db_engine,
+    "db_pool": warm_db_pool,
+    "search_index": warm_search_index,
+    "caches": warm_caches,
+    "signing_keys": warm_signing_keys,
+    "token_issuer": warm_token_issuer,
+    "openapi": warm_openapi,
+}
+
+
+async def run_step(app: FastAPI, config: Config, readiness: Readiness, name: str, step: WarmUpStep) -> None:
+    while True:
+        start = perf_counter()
+        try:
+            await step(app, config)
+        except Exception as e:
+            readiness.failing = f"{name}: {type(e).__name__}: {e}"
+            get_logger().warning(f"Warm up step {readiness.failing}, retrying in {config.warmup_retry_interval}s")
+            await asyncio.sleep(config.warmup_retry_interval)
+            continue
+        readiness.record(name, perf_counter() - start)
+        return
+
+
+async def warm_up(app: FastAPI, readiness: Readiness) -> None:
+    # everything a first request would otherwise build lazily, in the order the request would need it
+    config = get_config()
+    start = perf_counter()
+    for name, step in WARM_UP_STEPS.items():
+        await run_step(app, config, readiness, name, step)
+    readiness.record("warm_up", perf_counter() - start)
+    readiness.failing = None
+    readiness.ready = True
+    get_logger().info(f"Ready, startup phases in seconds: {readiness.phases}")
@@ -0,0 +1,37 @@
+from pathlib import Path
+from time import time
+
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlmodel import SQLModel
+
+from src.backend import create_api
+from src.backend.auth import AuthHelper
+from src.backend.helpers import get_config
+from src.backend.models import configure_engine, engine_options, get_async_db_engine
+
+STUB_USER_ID = "12345678-1234-1234-1234-123456789012"
+
+
+def stub_claims() -> dict:
+    return {"sub": STUB_USER_ID, "exp": int(time()) + 3600, "realm_access": {"roles": ["admin"]}}
+
+
+async def stub_app(db_path: Path) -> tuple[FastAPI, AsyncEngine]:
+    # the app runs in process against its own sqlite file with token verification stubbed out, shared by the tests and
+    # the benchmarks so only the API is exercised
+    config = get_config()
+    db_url = f"sqlite+aiosqlite:///{db_path}"
+    engine = create_async_engine(db_url, **engine_options(config, db_url))
+    configure_engine(engine.sync_engine, config)
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+    app = create_api()
+    app.dependency_overrides[AuthHelper.bearer_token] = stub_claims
+    app.dependency_overrides[get_async_db_engine] = lambda: engine
+    return app, engine
+
+
+def stub_client(app: FastAPI) -> AsyncClient:
+    return AsyncClient(transport=ASGITransport(app=app), base_url="http://test", timeout=None)
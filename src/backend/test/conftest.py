@@ -0,0 +1,57 @@
+from typing import AsyncIterator, Callable
+from uuid import UUID
+
+import pytest
+from fastapi import FastAPI
+from httpx import AsyncClient
+
+from src.backend.auth import AuthHelper
+from src.backend.cache import MemoryCacheBackend, get_response_cache
+from src.backend.test.app import stub_app, stub_client, stub_claims
+from src.backend.test.helpers import Rows
+
+
+@pytest.fixture
+def anyio_backend() -> str:
+    return "asyncio"
+
+
+@pytest.fixture
+def claims() -> dict:
+    # the admin claims the stub app is called with, changed in place by a test to call as someone else
+    return stub_claims()
+
+
+@pytest.fixture
+def call_as(claims: dict) -> Callable[[list[UUID | str] | None], None]:
+    def call_as(org_ids: list[UUID | str] | None) -> None:
+        # None calls as an admin, who reads every org
+        claims.clear()
+        claims.update(stub_claims())
+        if org_ids is not None:
+            del claims["realm_access"]
+            claims["orgs"] = [str(org_id) for org_id in org_ids]
+
+    return call_as
+
+
+@pytest.fixture
+async def app(tmp_path, claims: dict) -> AsyncIterator[FastAPI]:
+    app, engine = await stub_app(tmp_path / "test.sqlite")
+    app.dependency_overrides[AuthHelper.bearer_token] = lambda: claims
+    # each test gets an empty response cache, the shared one would serve another test's responses
+    cache = MemoryCacheBackend()
+    app.dependency_overrides[get_response_cache] = lambda: cache
+    yield app
+    await engine.dispose()
+
+
+@pytest.fixture
+async def client(app: FastAPI) -> AsyncIterator[AsyncClient]:
+    async with stub_client(app) as client:
+        yield client
+
+
+@pytest.fixture
+def rows(client: AsyncClient) -> Rows:
+    return Rows(client)
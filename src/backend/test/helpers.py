@@ -0,0 +1,41 @@
+from dataclasses import dataclass
+from typing import Iterable
+
+from httpx import AsyncClient
+
+
+async def create(client: AsyncClient, resource: str, body: dict) -> str:
+    response = await client.post(f"/resource/{resource}/", json=body)
+    assert response.status_code == 201, response.text
+    return next(value for key, value in response.json().items() if key.endswith("_id") and key[:-3] in resource)
+
+
+async def bulk_create(client: AsyncClient, resource: str, rows: list[dict]) -> list[str]:
+    response = await client.post(f"/resource/{resource}/bulk", json=rows)
+    assert response.status_code == 200, response.text
+    return [result["id"] for result in response.json()["results"]]
+
+
+@dataclass
+class Rows:
+    # creates rows through the API as whoever the client is calling as, filling in what a test does not care about
+    client: AsyncClient
+
+    async def org(self, org_name: str = "O") -> str:
+        return await create(self.client, "orgs", {"org_name": org_name})
+
+    async def user(self, username: str = "U", orgs: Iterable[str] = ()) -> str:
+        user_id = await create(self.client, "users", {"username": username})
+        for org_id in orgs:
+            await self.join(org_id, user_id)
+        return user_id
+
+    async def contact(self, name: str = "C", org_id: str | None = None) -> str:
+        return await create(self.client, "contacts", {"name": name, "org_id": org_id})
+
+    async def apiary(self, name: str = "A", org_id: str | None = None, contact_id: str | None = None) -> str:
+        return await create(self.client, "apiary", {"name": name, "org_id": org_id, "contact_id": contact_id})
+
+    async def join(self, org_id: str, user_id: str) -> None:
+        response = await self.client.put(f"/resource/orgs/{org_id}/users/{user_id}")
+        assert response.status_code == 200, response.text
@@ -0,0 +1,67 @@
+from uuid import uuid4
+
+import pytest
+from httpx import AsyncClient
+
+from src.backend.helpers import Config, get_config
+from src.backend.routers.pagination import NDJSON_MEDIA_TYPE
+from src.backend.test.helpers import create
+
+pytestmark = pytest.mark.anyio
+
+
+def statuses(response) -> list[str]:
+    assert response.status_code == 200, response.text
+    return [result["status"] for result in response.json()["results"]]
+
+
+async def test_rejected_rows_do_not_stop_the_rest_of_their_chunk(app, client: AsyncClient) -> None:
+    app.dependency_overrides[get_config] = lambda: Config(bulk_chunk_size=10)
+    org_id = await create(client, "orgs", {"org_name": "O"})
+    rows = [
+        {"name": "Written", "org_id": org_id},
+        {"org_id": org_id},
+        {"name": "Unknown org", "org_id": str(uuid4())},
+        {"name": "Also written"},
+    ]
+    response = await client.post("/resource/apiary/bulk", json=rows)
+    assert statuses(response) == ["created", "invalid", "failed", "created"]
+    body = response.json()
+    assert body["written"] == 2 and body["rejected"] == 2
+    assert "name" in body["results"][1]["detail"] and body["results"][2]["detail"]
+    names = {apiary["name"] for apiary in (await client.get("/resource/apiary/")).json()["apiaries"]}
+    assert names == {"Written", "Also written"}
+
+
+async def test_a_single_rejected_row_is_reported_not_raised(client: AsyncClient) -> None:
+    response = await client.post("/resource/apiary/bulk", json=[{"name": "Unknown org", "org_id": str(uuid4())}])
+    assert statuses(response) == ["failed"]
+
+
+async def test_a_duplicate_id_fails_only_its_row(client: AsyncClient) -> None:
+    apiary_id = str(uuid4())
+    rows = [{"apiary_id": apiary_id, "name": "First"}, {"apiary_id": apiary_id, "name": "Second"}]
+    response = await client.post("/resource/apiary/bulk", json=rows)
+    assert statuses(response) == ["created", "failed"]
+    assert (await client.get(f"/resource/apiary/{apiary_id}")).json()["name"] == "First"
+
+
+async def test_upsert_updates_rows_that_exist(client: AsyncClient) -> None:
+    apiary_id = await create(client, "apiary", {"name": "Before"})
+    rows = [{"apiary_id": apiary_id, "name": "After"}, {"name": "New"}]
+    response = await client.post("/resource/apiary/bulk", params={"upsert": True}, json=rows)
+    assert statuses(response) == ["upserted", "upserted"]
+    assert (await client.get(f"/resource/apiary/{apiary_id}")).json()["name"] == "After"
+
+
+async def test_ndjson_rows_are_read_line_by_line(client: AsyncClient) -> None:
+    body = b'{"org_name": "A"}\nnot json\n\n{"org_name": "B"}'
+    response = await client.post("/resource/orgs/bulk", content=body, headers={"Content-Type": NDJSON_MEDIA_TYPE})
+    assert statuses(response) == ["created", "invalid", "created"]
+    assert response.json()["results"][1]["detail"].startswith("Invalid JSON")
+
+
+@pytest.mark.parametrize("body", [b"not json", b'{"org_name": "A"}'])
+async def test_a_body_that_is_not_an_array_is_rejected(client: AsyncClient, body: bytes) -> None:
+    response = await client.post("/resource/orgs/bulk", content=body, headers={"Content-Type": "application/json"})
+    assert response.status_code == 400
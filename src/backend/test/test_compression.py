@@ -0,0 +1,54 @@
+import zlib
+
+import brotli
+import pytest
+import zstandard
+
+from src.backend.compression.middleware import FLUSH_THRESHOLD, CompressedSend
+
+pytestmark = pytest.mark.anyio
+
+DECODERS = {
+    "gzip": lambda: zlib.decompressobj(31).decompress,
+    "br": lambda: brotli.Decompressor().process,
+    "zstd": lambda: zstandard.ZstdDecompressor().decompressobj().decompress,
+}
+
+
+def start(media_type: str) -> dict:
+    return {"type": "http.response.start", "status": 200, "headers": [(b"content-type", media_type.encode())]}
+
+
+@pytest.mark.parametrize("encoding", DECODERS)
+async def test_each_ndjson_row_reaches_the_client_as_it_is_sent(encoding: str) -> None:
+    sent: list[dict] = []
+
+    async def send(message: dict) -> None:
+        sent.append(message)
+
+    compressed = CompressedSend(send, encoding, minimum_size=0)
+    decode = DECODERS[encoding]()
+    await compressed(start("application/x-ndjson"))
+    received = b""
+    for i in range(3):
+        await compressed({"type": "http.response.body", "body": b'{"row": %d}\n' % i, "more_body": True})
+        received += decode(sent[-1]["body"])
+        assert received.endswith(b'{"row": %d}\n' % i)
+    await compressed({"type": "http.response.body", "body": b"", "more_body": False})
+    assert received + decode(sent[-1]["body"]) == b"".join(b'{"row": %d}\n' % i for i in range(3))
+
+
+async def test_other_streams_are_flushed_past_the_threshold() -> None:
+    sent: list[dict] = []
+
+    async def send(message: dict) -> None:
+        sent.append(message)
+
+    compressed = CompressedSend(send, "gzip", minimum_size=0)
+    decode = zlib.decompressobj(31).decompress
+    await compressed(start("application/json"))
+    chunk = b"[" + b"1," * 511
+    for _ in range(FLUSH_THRESHOLD // len(chunk) + 1):
+        await compressed({"type": "http.response.body", "body": chunk, "more_body": True})
+    received = b"".join(decode(message["body"]) for message in sent[1:])
+    assert received == chunk * (FLUSH_THRESHOLD // len(chunk) + 1)
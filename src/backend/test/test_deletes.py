@@ -0,0 +1,80 @@
+from uuid import uuid4
+
+import pytest
+from httpx import AsyncClient
+
+from src.backend.test.helpers import Rows, bulk_create
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_deleting_an_org_keeps_its_apiaries_and_members(client: AsyncClient, rows: Rows) -> None:
+    org_id = await rows.org()
+    user_id = await rows.user(orgs=[org_id])
+    apiary_id = await rows.apiary(org_id=org_id)
+    assert (await client.delete(f"/resource/orgs/{org_id}")).status_code == 204
+    assert (await client.get(f"/resource/orgs/{org_id}")).status_code == 404
+    assert (await client.get(f"/resource/apiary/{apiary_id}")).json()["org_id"] is None
+    assert (await client.get(f"/resource/users/{user_id}/orgs")).json()["orgs"] == []
+
+
+async def test_deleting_a_contact_clears_it_from_its_apiaries(client: AsyncClient, rows: Rows) -> None:
+    contact_id = await rows.contact()
+    apiary_id = await rows.apiary(contact_id=contact_id)
+    assert (await client.delete(f"/resource/contacts/{contact_id}")).status_code == 204
+    assert (await client.get(f"/resource/apiary/{apiary_id}")).json()["contact_id"] is None
+
+
+async def test_deleting_a_user_removes_their_memberships(client: AsyncClient, rows: Rows) -> None:
+    org_id = await rows.org()
+    users = [await rows.user(name) for name in ("Leaving", "Staying")]
+    for user_id in users:
+        await rows.join(org_id, user_id)
+    assert (await client.delete(f"/resource/users/{users[0]}")).status_code == 204
+    members = (await client.get(f"/resource/orgs/{org_id}/users")).json()["users"]
+    assert [user["user_id"] for user in members] == [users[1]]
+
+
+@pytest.mark.parametrize("resource", ["orgs", "users", "contacts", "apiary"])
+async def test_deleting_a_missing_row_is_not_found(client: AsyncClient, resource: str) -> None:
+    assert (await client.delete(f"/resource/{resource}/{uuid4()}")).status_code == 404
+
+
+async def test_bulk_delete_reports_deleted_and_missing_ids(client: AsyncClient) -> None:
+    ids = await bulk_create(client, "apiary", [{"name": f"Hive {i}"} for i in range(3)])
+    missing = str(uuid4())
+    response = await client.post("/resource/apiary/bulk/delete", json={"ids": [ids[0], missing, ids[1], ids[0]]})
+    assert response.status_code == 200
+    assert response.json() == {"deleted": ids[:2], "missing": [missing]}
+    remaining = (await client.get("/resource/apiary/")).json()["apiaries"]
+    assert [apiary["apiary_id"] for apiary in remaining] == [ids[2]]
+    hits = (await client.get("/resource/search", params={"q": "hive"})).json()["results"]
+    assert [hit["id"] for hit in hits] == [ids[2]]
+
+
+async def test_bulk_deleting_orgs_cascades_like_single_deletes(client: AsyncClient, rows: Rows) -> None:
+    org_ids = await bulk_create(client, "orgs", [{"org_name": f"Org {i}"} for i in range(2)])
+    user_id = await rows.user()
+    apiaries = [await rows.apiary(org_id=org_id) for org_id in org_ids]
+    for org_id in org_ids:
+        await rows.join(org_id, user_id)
+    response = await client.post("/resource/orgs/bulk/delete", json={"ids": org_ids})
+    assert sorted(response.json()["deleted"]) == sorted(org_ids)
+    for apiary_id in apiaries:
+        assert (await client.get(f"/resource/apiary/{apiary_id}")).json()["org_id"] is None
+    assert (await client.get(f"/resource/users/{user_id}/orgs")).json()["orgs"] == []
+
+
+async def test_deleting_an_org_drops_the_contacts_it_made_visible(client: AsyncClient, rows: Rows, call_as) -> None:
+    org_id = await rows.org()
+    contact_id = await rows.contact("Keeper")
+    await rows.apiary(org_id=org_id, contact_id=contact_id)
+    call_as([org_id])
+    assert len((await client.get("/resource/contacts/")).json()["contacts"]) == 1
+    assert len((await client.get("/resource/search", params={"q": "keeper"})).json()["results"]) == 1
+    call_as(None)
+    await client.delete(f"/resource/orgs/{org_id}")
+    # the cached list and search results from before the delete are not served again
+    call_as([org_id])
+    assert (await client.get("/resource/contacts/")).json()["contacts"] == []
+    assert (await client.get("/resource/search", params={"q": "keeper"})).json()["results"] == []
@@ -0,0 +1,116 @@
+import json
+from pathlib import Path
+from time import time
+
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jwt.algorithms import RSAAlgorithm
+
+from src.backend.auth import JWKSError, JWKSVerifier
+
+ISSUER = "https://auth.example/realms/beekind"
+AUDIENCE = "beekind"
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture(scope="module")
+def keys() -> list[rsa.RSAPrivateKey]:
+    return [rsa.generate_private_key(public_exponent=65537, key_size=2048) for _ in range(2)]
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> Clock:
+    clock = Clock()
+    monkeypatch.setattr("src.backend.auth.jwks.monotonic", clock)
+    return clock
+
+
+@pytest.fixture
+def jwks_file(tmp_path: Path) -> Path:
+    return tmp_path / "jwks.json"
+
+
+def write_jwks(path: Path, keys: dict[str, rsa.RSAPrivateKey], alg: str = "RS256") -> None:
+    jwks = [
+        RSAAlgorithm.to_jwk(key.public_key(), as_dict=True) | {"kid": kid, "alg": alg, "use": "sig"}
+        for kid, key in keys.items()
+    ]
+    path.write_text(json.dumps({"keys": jwks}))
+
+
+def sign(key: rsa.RSAPrivateKey, kid: str, **claims) -> str:
+    claims = {"sub": "user", "exp": int(time()) + 60, "iss": ISSUER, "aud": AUDIENCE} | claims
+    return jwt.encode({name: value for name, value in claims.items() if value is not None}, key, "RS256", headers={"kid": kid})
+
+
+def verifier(jwks_file: Path, **options) -> JWKSVerifier:
+    return JWKSVerifier(jwks_file=str(jwks_file), issuer=ISSUER, audience=AUDIENCE, **options)
+
+
+def test_a_signed_token_is_decoded(keys, jwks_file: Path) -> None:
+    write_jwks(jwks_file, {"one": keys[0]})
+    assert verifier(jwks_file).decode(sign(keys[0], "one"))["sub"] == "user"
+
+
+@pytest.mark.parametrize(
+    "claims, error",
+    [
+        ({"exp": int(time()) - 60}, jwt.ExpiredSignatureError),
+        ({"exp": None}, jwt.MissingRequiredClaimError),
+        ({"aud": "someone else"}, jwt.InvalidAudienceError),
+        ({"iss": "https://elsewhere.example"}, jwt.InvalidIssuerError),
+    ],
+)
+def test_bad_claims_are_rejected(keys, jwks_file: Path, claims: dict, error: type[Exception]) -> None:
+    write_jwks(jwks_file, {"one": keys[0]})
+    with pytest.raises(error):
+        verifier(jwks_file).decode(sign(keys[0], "one", **claims))
+
+
+def test_a_token_signed_by_another_key_is_rejected(keys, jwks_file: Path) -> None:
+    write_jwks(jwks_file, {"one": keys[0]})
+    with pytest.raises(jwt.InvalidSignatureError):
+        verifier(jwks_file).decode(sign(keys[1], "one"))
+
+
+def test_disallowed_algorithms_are_rejected(keys, jwks_file: Path) -> None:
+    write_jwks(jwks_file, {"one": keys[0]}, alg="RS512")
+    with pytest.raises(JWKSError):
+        verifier(jwks_file).decode(sign(keys[0], "one"))
+    write_jwks(jwks_file, {"one": keys[0]})
+    token = jwt.encode({"sub": "user", "exp": int(time()) + 60}, "secret", "HS256", headers={"kid": "one"})
+    with pytest.raises(jwt.InvalidAlgorithmError):
+        verifier(jwks_file).decode(token)
+
+
+def test_an_unknown_kid_refetches_the_keys_at_most_once_per_interval(keys, jwks_file: Path, clock: Clock) -> None:
+    write_jwks(jwks_file, {"one": keys[0]})
+    tokens = verifier(jwks_file, min_refresh_interval=10)
+    tokens.decode(sign(keys[0], "one"))
+    # the realm rotates its keys, a token with the new kid is accepted once the interval has passed
+    write_jwks(jwks_file, {"one": keys[0], "two": keys[1]})
+    with pytest.raises(JWKSError, match="Unknown signing key"):
+        tokens.decode(sign(keys[1], "two"))
+    clock.now += 10
+    assert tokens.decode(sign(keys[1], "two"))["sub"] == "user"
+    assert tokens.key_ids == ["one", "two"]
+
+
+def test_a_failed_first_load_fails_fast_until_the_interval_has_passed(keys, jwks_file: Path, clock: Clock) -> None:
+    tokens = verifier(jwks_file, min_refresh_interval=10)
+    token = sign(keys[0], "one")
+    with pytest.raises(JWKSError, match="Unable to load JWKS"):
+        tokens.decode(token)
+    write_jwks(jwks_file, {"one": keys[0]})
+    with pytest.raises(JWKSError, match="not loaded yet"):
+        tokens.decode(token)
+    clock.now += 10
+    assert tokens.decode(token)["sub"] == "user"
@@ -0,0 +1,87 @@
+from uuid import uuid4
+
+import pytest
+from httpx import AsyncClient
+
+from src.backend.test.helpers import Rows, bulk_create
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_adding_members_in_a_batch_reports_each_user(client: AsyncClient, rows: Rows) -> None:
+    org_id = await rows.org()
+    existing, new = await bulk_create(client, "users", [{"username": "Existing"}, {"username": "New"}])
+    await rows.join(org_id, existing)
+    missing = str(uuid4())
+    response = await client.post(f"/resource/orgs/{org_id}/users/add", json={"user_ids": [existing, new, missing, new]})
+    assert response.status_code == 200
+    assert response.json() == {"added": [new], "already_members": [existing], "missing": [missing]}
+
+
+async def test_removing_members_in_a_batch_reports_each_user(client: AsyncClient, rows: Rows) -> None:
+    org_id = await rows.org()
+    member, other = await bulk_create(client, "users", [{"username": "Member"}, {"username": "Other"}])
+    await rows.join(org_id, member)
+    response = await client.post(f"/resource/orgs/{org_id}/users/remove", json={"user_ids": [member, other]})
+    assert response.json() == {"removed": [member], "not_members": [other]}
+    assert (await client.get(f"/resource/orgs/{org_id}/users")).json()["users"] == []
+
+
+@pytest.mark.parametrize("action", ["add", "remove"])
+async def test_a_batch_for_a_missing_org_is_not_found(client: AsyncClient, action: str) -> None:
+    response = await client.post(f"/resource/orgs/{uuid4()}/users/{action}", json={"user_ids": [str(uuid4())]})
+    assert response.status_code == 404
+
+
+async def test_members_and_orgs_are_paged(client: AsyncClient) -> None:
+    org_ids = await bulk_create(client, "orgs", [{"org_name": f"Org {i}"} for i in range(3)])
+    user_ids = await bulk_create(client, "users", [{"username": f"User {i}"} for i in range(5)])
+    await client.post(f"/resource/orgs/{org_ids[0]}/users/add", json={"user_ids": user_ids})
+    for org_id in org_ids[1:]:
+        await client.put(f"/resource/users/{user_ids[0]}/orgs/{org_id}")
+    members, cursor = [], None
+    while True:
+        params = {"limit": 2} | ({"cursor": cursor} if cursor else {})
+        body = (await client.get(f"/resource/orgs/{org_ids[0]}/users", params=params)).json()
+        members.append([user["user_id"] for user in body["users"]])
+        cursor = body["next_cursor"]
+        if cursor is None:
+            break
+    assert [len(page) for page in members] == [2, 2, 1] and sorted(sum(members, [])) == sorted(user_ids)
+    body = (await client.get(f"/resource/users/{user_ids[0]}/orgs", params={"limit": 5})).json()
+    assert sorted(org["org_id"] for org in body["orgs"]) == sorted(org_ids) and body["next_cursor"] is None
+
+
+async def test_paged_members_of_a_missing_org_are_not_found(client: AsyncClient) -> None:
+    assert (await client.get(f"/resource/orgs/{uuid4()}/users")).status_code == 404
+    assert (await client.get(f"/resource/users/{uuid4()}/orgs")).status_code == 404
+
+
+async def test_the_old_put_routes_return_the_updated_org_and_user(client: AsyncClient, rows: Rows) -> None:
+    org_id = await rows.org()
+    user_id = await rows.user()
+    org = (await client.put(f"/resource/orgs/{org_id}/{user_id}")).json()
+    assert org["org_id"] == org_id and [user["user_id"] for user in org["users"]] == [user_id]
+    user = (await client.put(f"/resource/users/{user_id}/{org_id}")).json()
+    assert user["user_id"] == user_id and [org["org_id"] for org in user["orgs"]] == [org_id]
+
+
+@pytest.mark.parametrize("path", ["/resource/orgs/{org_id}/users/{user_id}", "/resource/users/{user_id}/orgs/{org_id}"])
+async def test_membership_routes_add_and_remove_one_link(client: AsyncClient, rows: Rows, path: str) -> None:
+    ids = {
+        "org_id": await rows.org(),
+        "user_id": await rows.user(),
+    }
+    url = path.format(**ids)
+    assert (await client.put(url)).json() == ids | {"added": True}
+    assert (await client.put(url)).json() == ids | {"added": False}
+    assert (await client.delete(url)).status_code == 204
+    assert (await client.delete(url)).status_code == 404
+
+
+@pytest.mark.parametrize("path", ["/resource/orgs/{org_id}/users/{user_id}", "/resource/users/{user_id}/orgs/{org_id}"])
+async def test_adding_a_missing_user_or_org_is_not_found(client: AsyncClient, rows: Rows, path: str) -> None:
+    org_id = await rows.org()
+    user_id = await rows.user()
+    assert (await client.put(path.format(org_id=org_id, user_id=uuid4()))).status_code == 404
+    assert (await client.put(path.format(org_id=uuid4(), user_id=user_id))).status_code == 404
@@ -0,0 +1,219 @@
+import json
+from dataclasses import dataclass
+
+import pytest
+from httpx import AsyncClient
+
+from src.backend.routers.pagination import NDJSON_MEDIA_TYPE
+from src.backend.test.helpers import Rows
+
+pytestmark = pytest.mark.anyio
+
+
+@dataclass
+class Orgs:
+    # org a and org b each have a member, contact and apiary of their own, and share a user and a contact owned by org a
+    org_a: str
+    org_b: str
+    user_a: str
+    user_b: str
+    shared_user: str
+    contact_a: str
+    contact_b: str
+    shared_contact: str
+    apiary_a: str
+    apiary_b: str
+    shared_apiary_a: str
+    shared_apiary_b: str
+
+
+@pytest.fixture
+async def orgs(client: AsyncClient, rows: Rows) -> Orgs:
+    org_a = await rows.org("Org A")
+    org_b = await rows.org("Org B")
+    users = [
+        await rows.user(name, org_ids)
+        for name, org_ids in (("User A", [org_a]), ("User B", [org_b]), ("Shared user", [org_a, org_b]))
+    ]
+    contacts = [
+        await rows.contact(name, org_id)
+        for name, org_id in (("Contact A", org_a), ("Contact B", org_b), ("Shared contact", org_a))
+    ]
+    apiaries = [
+        await rows.apiary(f"Hive {name}", org_id, contact_id)
+        for name, org_id, contact_id in (
+            ("A", org_a, contacts[0]),
+            ("B", org_b, contacts[1]),
+            ("shared A", org_a, contacts[2]),
+            ("shared B", org_b, contacts[2]),
+        )
+    ]
+    return Orgs(org_a, org_b, *users, *contacts, *apiaries)
+
+
+async def ids(client: AsyncClient, path: str, collection: str, key: str) -> set[str]:
+    response = await client.get(path)
+    assert response.status_code == 200, response.text
+    return {row[key] for row in response.json()[collection]}
+
+
+async def test_lists_hold_only_the_callers_orgs(client: AsyncClient, orgs: Orgs, call_as) -> None:
+    call_as([orgs.org_a])
+    assert await ids(client, "/resource/orgs/", "orgs", "org_id") == {orgs.org_a}
+    assert await ids(client, "/resource/users/", "users", "user_id") == {orgs.user_a, orgs.shared_user}
+    assert await ids(client, "/resource/contacts/", "contacts", "contact_id") == {orgs.contact_a, orgs.shared_contact}
+    assert await ids(client, "/resource/apiary/", "apiaries", "apiary_id") == {orgs.apiary_a, orgs.shared_apiary_a}
+
+
+async def test_streamed_lists_hold_only_the_callers_orgs(client: AsyncClient, orgs: Orgs, call_as) -> None:
+    call_as([orgs.org_b])
+    response = await client.get("/resource/apiary/", headers={"Accept": NDJSON_MEDIA_TYPE})
+    streamed = {json.loads(line)["apiary_id"] for line in response.text.splitlines()}
+    assert streamed == {orgs.apiary_b, orgs.shared_apiary_b}
+
+
+async def test_an_admin_reads_every_org(client: AsyncClient, orgs: Orgs) -> None:
+    assert await ids(client, "/resource/orgs/", "orgs", "org_id") == {orgs.org_a, orgs.org_b}
+
+
+async def test_a_token_without_orgs_reads_the_callers_memberships(client: AsyncClient, orgs: Orgs, claims: dict) -> None:
+    claims.pop("realm_access")
+    claims["sub"] = orgs.user_b
+    assert await ids(client, "/resource/orgs/", "orgs", "org_id") == {orgs.org_b}
+
+
+async def test_cached_lists_are_kept_per_scope(client: AsyncClient, orgs: Orgs, call_as) -> None:
+    assert len(await ids(client, "/resource/apiary/", "apiaries", "apiary_id")) == 4
+    call_as([orgs.org_a])
+    assert await ids(client, "/resource/apiary/", "apiaries", "apiary_id") == {orgs.apiary_a, orgs.shared_apiary_a}
+
+
+@pytest.mark.parametrize(
+    "path, visible",
+    [
+        ("/resource/orgs/{org_b}", "/resource/orgs/{org_a}"),
+        ("/resource/users/{user_b}", "/resource/users/{user_a}"),
+        ("/resource/contacts/{contact_b}", "/resource/contacts/{contact_a}"),
+        ("/resource/apiary/{apiary_b}", "/resource/apiary/{apiary_a}"),
+    ],
+)
+async def test_another_orgs_rows_are_not_found(client: AsyncClient, orgs: Orgs, call_as, path: str, visible: str) -> None:
+    call_as([orgs.org_a])
+    assert (await client.get(visible.format(**vars(orgs)))).status_code == 200
+    assert (await client.get(path.format(**vars(orgs)))).status_code == 404
+
+
+async def test_expanded_relations_hold_only_the_callers_orgs(client: AsyncClient, orgs: Orgs, call_as) -> None:
+    call_as([orgs.org_a])
+    user = (await client.get(f"/resource/users/{orgs.shared_user}", params={"expand": "orgs"})).json()
+    assert [org["org_id"] for org in user["orgs"]] == [orgs.org_a]
+    contact = (await client.get(f"/resource/contacts/{orgs.shared_contact}", params={"expand": "apiaries"})).json()
+    assert [apiary["apiary_id"] for apiary in contact["apiaries"]] == [orgs.shared_apiary_a]
+    org = (await client.get(f"/resource/orgs/{orgs.org_a}")).json()
+    assert {user["user_id"] for user in org["users"]} == {orgs.user_a, orgs.shared_user}
+    assert {apiary["apiary_id"] for apiary in org["apiaries"]} == {orgs.apiary_a, orgs.shared_apiary_a}
+
+
+async def test_adding_a_member_returns_only_the_callers_orgs(client: AsyncClient, orgs: Orgs, call_as) -> None:
+    call_as([orgs.org_a])
+    user = (await client.put(f"/resource/users/{orgs.shared_user}/{orgs.org_a}")).json()
+    assert [org["org_id"] for org in user["orgs"]] == [orgs.org_a]
+
+
+@pytest.mark.parametrize(
+    "path, visible",
+    [
+        ("/resource/orgs/{org_b}", "/resource/orgs/{org_a}"),
+        ("/resource/users/{user_b}", "/resource/users/{user_a}"),
+        ("/resource/contacts/{contact_b}", "/resource/contacts/{contact_a}"),
+        ("/resource/apiary/{apiary_b}", "/resource/apiary/{apiary_a}"),
+    ],
+)
+async def test_another_orgs_rows_cannot_be_deleted(client: AsyncClient, orgs: Orgs, call_as, path: str, visible: str) -> None:
+    call_as([orgs.org_a])
+    assert (await client.delete(path.format(**vars(orgs)))).status_code == 404
+    assert (await client.delete(visible.format(**vars(orgs)))).status_code == 204
+    call_as(None)
+    assert (await client.get(path.format(**vars(orgs)))).status_code == 200
+
+
+async def test_bulk_deletes_skip_another_orgs_rows(client: AsyncClient, orgs: Orgs, call_as) -> None:
+    call_as([orgs.org_a])
+    response = await client.post("/resource/apiary/bulk/delete", json={"ids": [orgs.apiary_a, orgs.apiary_b]})
+    assert response.json() == {"deleted": [orgs.apiary_a], "missing": [orgs.apiary_b]}
+
+
+async def test_a_user_shared_with_another_org_cannot_be_deleted(client: AsyncClient, orgs: Orgs, call_as) -> None:
+    call_as([orgs.org_a])
+    assert (await client.delete(f"/resource/users/{orgs.shared_user}")).status_code == 404
+    call_as([orgs.org_a, orgs.org_b])
+    assert (await client.delete(f"/resource/users/{orgs.shared_user}")).status_code == 204
+
+
+async def test_apiaries_are_created_only_in_the_callers_orgs(client: AsyncClient, rows: Rows, orgs: Orgs, call_as) -> None:
+    call_as([orgs.org_a])
+    response = await client.post("/resource/apiary/", json={"name": "Hive", "org_id": orgs.org_b})
+    assert response.status_code == 404
+    response = await client.post(
+        "/resource/apiary/", json={"name": "Hive", "org_id": orgs.org_a, "contact_id": orgs.contact_b}
+    )
+    assert response.status_code == 404
+    assert await rows.apiary("Hive", orgs.org_a, orgs.contact_a)
+
+
+async def test_bulk_upserts_leave_another_orgs_rows_alone(client: AsyncClient, orgs: Orgs, call_as) -> None:
+    call_as([orgs.org_a])
+    rows = [
+        {"apiary_id": orgs.apiary_b, "name": "Taken", "org_id": orgs.org_a},
+        {"apiary_id": orgs.apiary_a, "name": "Moved", "org_id": orgs.org_b},
+        {"apiary_id": orgs.shared_apiary_a, "name": "Renamed", "org_id": orgs.org_a},
+    ]
+    response = await client.post("/resource/apiary/bulk", params={"upsert": True}, json=rows)
+    assert [result["status"] for result in response.json()["results"]] == ["failed", "failed", "upserted"]
+    call_as(None)
+    assert (await client.get(f"/resource/apiary/{orgs.apiary_b}")).json()["name"] == "Hive B"
+    assert (await client.get(f"/resource/apiary/{orgs.apiary_a}")).json()["org_id"] == orgs.org_a
+
+
+@pytest.mark.parametrize("resource", ["orgs", "users"])
+async def test_only_admins_create_orgs_and_users(client: AsyncClient, orgs: Orgs, call_as, resource: str) -> None:
+    body = {"org_name": "Org C"} if resource == "orgs" else {"username": "New"}
+    call_as([orgs.org_a])
+    assert (await client.post(f"/resource/{resource}/", json=body)).status_code == 403
+    assert (await client.post(f"/resource/{resource}/bulk", json=[body])).status_code == 403
+
+
+async def test_memberships_change_only_in_the_callers_orgs(client: AsyncClient, rows: Rows, orgs: Orgs, call_as) -> None:
+    new_user = await rows.user("New")
+    call_as([orgs.org_a])
+    assert (await client.put(f"/resource/orgs/{orgs.org_b}/users/{orgs.user_a}")).status_code == 404
+    assert (await client.delete(f"/resource/orgs/{orgs.org_b}/users/{orgs.shared_user}")).status_code == 404
+    # another org's user stays hidden, one in no org yet may join
+    assert (await client.put(f"/resource/orgs/{orgs.org_a}/users/{orgs.user_b}")).status_code == 404
+    response = await client.post(f"/resource/orgs/{orgs.org_a}/users/add", json={"user_ids": [orgs.user_b, new_user]})
+    assert response.json() == {"added": [new_user], "already_members": [], "missing": [orgs.user_b]}
+
+
+async def test_search_finds_only_the_callers_orgs(client: AsyncClient, orgs: Orgs, call_as) -> None:
+    call_as([orgs.org_a])
+    hits = (await client.get("/resource/search", params={"q": "hive"})).json()["results"]
+    assert {hit["id"] for hit in hits} == {orgs.apiary_a, orgs.shared_apiary_a}
+    hits = (await client.get("/resource/search", params={"q": "contact", "kind": "contact"})).json()["results"]
+    assert {hit["id"] for hit in hits} == {orgs.contact_a, orgs.shared_contact}
+
+
+async def test_contacts_are_created_only_in_the_callers_orgs(client: AsyncClient, rows: Rows, orgs: Orgs, call_as) -> None:
+    call_as([orgs.org_a])
+    assert (await client.post("/resource/contacts/", json={"name": "Nobody's"})).status_code == 404
+    assert (await client.post("/resource/contacts/", json={"name": "B's", "org_id": orgs.org_b})).status_code == 404
+    contact_id = await rows.contact("A's", orgs.org_a)
+    assert (await client.get(f"/resource/contacts/{contact_id}")).status_code == 200
+
+
+async def test_only_the_owning_org_changes_a_shared_contact(client: AsyncClient, orgs: Orgs, call_as) -> None:
+    call_as([orgs.org_b])
+    assert (await client.get(f"/resource/contacts/{orgs.shared_contact}")).status_code == 200
+    assert (await client.delete(f"/resource/contacts/{orgs.shared_contact}")).status_code == 404
+    row = {"contact_id": orgs.shared_contact, "name": "Taken", "org_id": orgs.org_b}
+    response = await client.post("/resource/contacts/bulk", params={"upsert": True}, json=[row])
+    assert response.json()["results"][0]["status"] == "failed"
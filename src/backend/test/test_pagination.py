@@ -0,0 +1,72 @@
+import json
+
+import pytest
+from httpx import AsyncClient
+
+from src.backend.routers.pagination import NDJSON_MEDIA_TYPE
+from src.backend.test.helpers import bulk_create
+
+pytestmark = pytest.mark.anyio
+
+
+async def walk(client: AsyncClient, path: str, collection: str, **params) -> list[list[dict]]:
+    pages, cursor = [], None
+    while True:
+        response = await client.get(path, params=params | ({"cursor": cursor} if cursor else {}))
+        assert response.status_code == 200, response.text
+        body = response.json()
+        assert body["count"] == len(body[collection])
+        pages.append(body[collection])
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return pages
+
+
+async def test_pages_cover_every_row_once_in_id_order(client: AsyncClient) -> None:
+    ids = await bulk_create(client, "orgs", [{"org_name": f"Org {i}"} for i in range(7)])
+    pages = await walk(client, "/resource/orgs/", "orgs", limit=3)
+    assert [len(page) for page in pages] == [3, 3, 1]
+    assert [org["org_id"] for page in pages for org in page] == sorted(ids)
+
+
+async def test_a_full_last_page_has_no_next_cursor(client: AsyncClient) -> None:
+    await bulk_create(client, "orgs", [{"org_name": f"Org {i}"} for i in range(4)])
+    assert [len(page) for page in await walk(client, "/resource/orgs/", "orgs", limit=2)] == [2, 2]
+
+
+async def test_sorted_pages_neither_skip_nor_repeat_rows_sharing_a_value(client: AsyncClient) -> None:
+    ids = await bulk_create(client, "apiary", [{"name": f"Apiary {i % 3}"} for i in range(10)])
+    pages = await walk(client, "/resource/apiary/", "apiaries", limit=4, order_by="-name")
+    rows = [(apiary["name"], apiary["apiary_id"]) for page in pages for apiary in page]
+    assert sorted(apiary_id for _, apiary_id in rows) == sorted(ids)
+    assert rows == sorted(rows, key=lambda row: (row[0], row[1]), reverse=True)
+
+
+@pytest.mark.parametrize("cursor", ["not a cursor", "AAAA"])
+async def test_a_bad_cursor_is_rejected(client: AsyncClient, cursor: str) -> None:
+    assert (await client.get("/resource/orgs/", params={"cursor": cursor})).status_code == 400
+
+
+async def test_a_cursor_is_tied_to_its_ordering(client: AsyncClient) -> None:
+    await bulk_create(client, "apiary", [{"name": f"Apiary {i}"} for i in range(3)])
+    cursor = (await client.get("/resource/apiary/", params={"limit": 1, "order_by": "name"})).json()["next_cursor"]
+    response = await client.get("/resource/apiary/", params={"limit": 1, "order_by": "-name", "cursor": cursor})
+    assert response.status_code == 400
+
+
+async def test_ndjson_streams_every_row_after_the_cursor(client: AsyncClient) -> None:
+    ids = sorted(await bulk_create(client, "orgs", [{"org_name": f"Org {i}"} for i in range(5)]))
+    cursor = (await client.get("/resource/orgs/", params={"limit": 2})).json()["next_cursor"]
+    response = await client.get("/resource/orgs/", params={"cursor": cursor}, headers={"Accept": NDJSON_MEDIA_TYPE})
+    assert response.headers["content-type"].startswith(NDJSON_MEDIA_TYPE)
+    assert "Accept" in response.headers["vary"].split(", ")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [org["org_id"] for org in rows] == ids[2:]
+
+
+async def test_ndjson_streams_only_the_selected_fields(client: AsyncClient) -> None:
+    await bulk_create(client, "apiary", [{"name": f"Apiary {i}", "site_lat": 51.0} for i in range(3)])
+    response = await client.get(
+        "/resource/apiary/", params={"fields": "name", "order_by": "name"}, headers={"Accept": NDJSON_MEDIA_TYPE}
+    )
+    assert [json.loads(line) for line in response.text.splitlines()] == [{"name": f"Apiary {i}"} for i in range(3)]
@@ -0,0 +1,53 @@
+from pathlib import Path
+
+import pytest
+
+from src.backend.cache import CacheEntry, MemoryCacheBackend, SharedInvalidations
+
+pytestmark = pytest.mark.anyio
+
+ENTRY = CacheEntry(body=b"[]", etag='"etag"', media_type="application/json")
+
+
+def workers(directory: Path, count: int = 2, **options) -> list[SharedInvalidations]:
+    return [SharedInvalidations(MemoryCacheBackend(), directory, **options) for _ in range(count)]
+
+
+async def cache(worker: SharedInvalidations, key: str, *tags: str) -> None:
+    await worker.set(key, ENTRY, tags, await worker.generation())
+
+
+async def test_an_invalidation_on_one_worker_drops_the_others_copies(tmp_path: Path) -> None:
+    first, second = workers(tmp_path)
+    await cache(first, "apiaries", "apiary")
+    await cache(second, "apiaries", "apiary")
+    await cache(second, "orgs", "orgs")
+    await first.invalidate("apiary")
+    assert await first.get("apiaries") is None and await second.get("apiaries") is None
+    assert await second.get("orgs") == ENTRY
+
+
+async def test_a_response_built_across_another_workers_write_is_not_kept(tmp_path: Path) -> None:
+    first, second = workers(tmp_path)
+    generation = await second.generation()
+    await first.invalidate("apiary")
+    await second.set("apiaries", ENTRY, ("apiary",), generation)
+    assert await second.get("apiaries") is None
+
+
+async def test_clearing_one_worker_clears_them_all(tmp_path: Path) -> None:
+    first, second = workers(tmp_path)
+    await cache(second, "orgs", "orgs")
+    await first.clear()
+    assert await second.size() == 0
+
+
+async def test_a_rotated_log_drops_everything_and_is_followed(tmp_path: Path) -> None:
+    first, second = workers(tmp_path, max_log_bytes=64)
+    await cache(second, "orgs", "orgs")
+    for _ in range(3):
+        await first.invalidate("apiary")
+    assert await second.get("orgs") is None
+    await cache(second, "orgs", "orgs")
+    await first.invalidate("orgs")
+    assert await second.get("orgs") is None
@@ -0,0 +1,197 @@
+from datetime import timedelta
+
+import msgpack
+import pytest
+from httpx import AsyncClient
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.backend.helpers.serialise import MSGPACK_MEDIA_TYPE
+from src.backend.models import get_async_db_engine, prune_tombstones
+from src.backend.test.helpers import Rows
+
+pytestmark = pytest.mark.anyio
+
+
+async def sync(client: AsyncClient, token: str | None = None, **params) -> dict:
+    response = await client.get("/resource/sync", params=params | ({"since": token} if token else {}))
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+async def catch_up(client: AsyncClient, token: str | None, **params) -> list[dict]:
+    batches = [await sync(client, token, **params)]
+    while batches[-1]["more"]:
+        batches.append(await sync(client, batches[-1]["token"], **params))
+    return batches
+
+
+async def test_first_sync_sends_everything_and_then_nothing(client: AsyncClient, rows: Rows) -> None:
+    org_id = await rows.org()
+    await rows.apiary(org_id=org_id)
+    first = await sync(client)
+    assert first["reset"] and not first["more"]
+    assert [org["org_id"] for org in first["orgs"]] == [org_id] and len(first["apiaries"]) == 1
+    again = await sync(client, first["token"])
+    assert not again["reset"] and again["apiaries"] == [] and again["token"] == first["token"]
+
+
+async def test_changes_and_deletes_are_sent_once(client: AsyncClient, rows: Rows) -> None:
+    org_id = await rows.org()
+    token = (await sync(client))["token"]
+    kept = await rows.apiary("Kept", org_id)
+    removed = await rows.apiary("Removed", org_id)
+    assert (await client.delete(f"/resource/apiary/{removed}")).status_code == 204
+    batch = await sync(client, token)
+    assert [apiary["apiary_id"] for apiary in batch["apiaries"]] == [kept]
+    assert batch["deleted"]["apiaries"] == [removed]
+    assert (await sync(client, batch["token"]))["deleted"]["apiaries"] == []
+
+
+async def test_batches_follow_the_limit_and_keep_a_write_together(client: AsyncClient, rows: Rows) -> None:
+    org_id = await rows.org()
+    token = (await sync(client))["token"]
+    response = await client.post("/resource/apiary/bulk", json=[{"name": f"Bulk {i}", "org_id": org_id} for i in range(6)])
+    assert response.status_code == 200
+    for i in range(3):
+        await rows.apiary(f"Single {i}", org_id)
+    batches = await catch_up(client, token, limit=2)
+    # the bulk chunk is one transaction, so its six rows come in one batch over the limit
+    assert [len(batch["apiaries"]) for batch in batches] == [6, 2, 1]
+    assert [batch["more"] for batch in batches] == [True, True, False]
+
+
+async def test_a_bad_token_is_rejected(client: AsyncClient) -> None:
+    assert (await client.get("/resource/sync", params={"since": "not a token"})).status_code == 400
+
+
+async def test_a_scope_change_starts_again(client: AsyncClient, rows: Rows, call_as) -> None:
+    org_a = await rows.org("A")
+    org_b = await rows.org("B")
+    call_as([org_a])
+    token = (await sync(client))["token"]
+    call_as([org_a, org_b])
+    batch = await sync(client, token)
+    assert batch["reset"] and {org["org_id"] for org in batch["orgs"]} == {org_a, org_b}
+
+
+async def test_pruned_tombstones_start_older_tokens_again(app, client: AsyncClient, rows: Rows) -> None:
+    org_id = await rows.org()
+    apiary_id = await rows.apiary(org_id=org_id)
+    token = (await sync(client))["token"]
+    await client.delete(f"/resource/apiary/{apiary_id}")
+    async with AsyncSession(app.dependency_overrides[get_async_db_engine]()) as db:
+        assert await prune_tombstones(db, timedelta(days=1)) == 0
+        assert await prune_tombstones(db, timedelta(0)) == 1
+    batch = await sync(client, token)
+    assert batch["reset"] and batch["apiaries"] == []
+
+
+async def test_a_user_joining_an_org_is_sent_to_its_callers(client: AsyncClient, rows: Rows, call_as) -> None:
+    org_a = await rows.org("A")
+    org_b = await rows.org("B")
+    user_id = await rows.user(orgs=[org_a])
+    call_as([org_b])
+    token = (await sync(client))["token"]
+    call_as(None)
+    await rows.join(org_b, user_id)
+    call_as([org_b])
+    batch = await sync(client, token)
+    assert [user["user_id"] for user in batch["users"]] == [user_id]
+    assert batch["memberships"] == [{"user_id": user_id, "org_id": org_b}]
+
+
+async def test_a_user_leaving_an_org_is_deleted_for_its_callers(client: AsyncClient, rows: Rows, call_as) -> None:
+    org_a = await rows.org("A")
+    org_b = await rows.org("B")
+    user_id = await rows.user(orgs=[org_a, org_b])
+    call_as([org_a])
+    token_a = (await sync(client))["token"]
+    call_as([org_b])
+    token_b = (await sync(client))["token"]
+    call_as(None)
+    assert (await client.delete(f"/resource/orgs/{org_b}/users/{user_id}")).status_code == 204
+    call_as([org_b])
+    deleted = (await sync(client, token_b))["deleted"]
+    assert deleted["users"] == [user_id] and deleted["memberships"] == [{"user_id": user_id, "org_id": org_b}]
+    # still a member of the other org, whose callers keep the user
+    call_as([org_a])
+    assert (await sync(client, token_a))["deleted"]["users"] == []
+
+
+async def test_an_apiary_moved_to_another_org_leaves_the_first(client: AsyncClient, rows: Rows, call_as) -> None:
+    org_a = await rows.org("A")
+    org_b = await rows.org("B")
+    contact_id = await rows.contact()
+    apiary_id = await rows.apiary("Moving", org_b, contact_id)
+    call_as([org_a])
+    token_a = (await sync(client))["token"]
+    call_as([org_b])
+    token_b = (await sync(client))["token"]
+    call_as(None)
+    moved = {"apiary_id": apiary_id, "name": "Moving", "org_id": org_a, "contact_id": contact_id}
+    response = await client.post("/resource/apiary/bulk", params={"upsert": True}, json=[moved])
+    assert response.json()["results"][0]["status"] == "upserted"
+    call_as([org_b])
+    batch = await sync(client, token_b)
+    assert batch["apiaries"] == [] and batch["contacts"] == []
+    assert batch["deleted"]["apiaries"] == [apiary_id] and batch["deleted"]["contacts"] == [contact_id]
+    call_as([org_a])
+    batch = await sync(client, token_a)
+    assert [apiary["apiary_id"] for apiary in batch["apiaries"]] == [apiary_id]
+    assert [contact["contact_id"] for contact in batch["contacts"]] == [contact_id]
+    assert batch["deleted"]["apiaries"] == [] and batch["deleted"]["contacts"] == []
+
+
+async def test_a_contact_still_visible_through_another_apiary_is_kept(client: AsyncClient, rows: Rows, call_as) -> None:
+    org_id = await rows.org()
+    contact_id = await rows.contact()
+    await rows.apiary("Staying", org_id, contact_id)
+    leaving = await rows.apiary("Leaving", org_id, contact_id)
+    call_as([org_id])
+    token = (await sync(client))["token"]
+    call_as(None)
+    assert (await client.delete(f"/resource/apiary/{leaving}")).status_code == 204
+    call_as([org_id])
+    deleted = (await sync(client, token))["deleted"]
+    assert deleted["apiaries"] == [leaving] and deleted["contacts"] == []
+
+
+async def test_a_contact_given_to_another_org_leaves_the_first(client: AsyncClient, rows: Rows, call_as) -> None:
+    org_a = await rows.org("A")
+    org_b = await rows.org("B")
+    contact_id = await rows.contact("C", org_a)
+    call_as([org_a])
+    token_a = (await sync(client))["token"]
+    call_as([org_b])
+    token_b = (await sync(client))["token"]
+    call_as(None)
+    moved = {"contact_id": contact_id, "name": "C", "org_id": org_b}
+    response = await client.post("/resource/contacts/bulk", params={"upsert": True}, json=[moved])
+    assert response.json()["results"][0]["status"] == "upserted"
+    call_as([org_a])
+    assert (await sync(client, token_a))["deleted"]["contacts"] == [contact_id]
+    call_as([org_b])
+    assert [contact["contact_id"] for contact in (await sync(client, token_b))["contacts"]] == [contact_id]
+
+
+async def test_deleting_an_org_deletes_its_rows_for_its_callers(client: AsyncClient, rows: Rows, call_as) -> None:
+    org_id = await rows.org()
+    contact_id = await rows.contact("C", org_id)
+    apiary_id = await rows.apiary(org_id=org_id, contact_id=contact_id)
+    user_id = await rows.user(orgs=[org_id])
+    call_as([org_id])
+    token = (await sync(client))["token"]
+    call_as(None)
+    assert (await client.delete(f"/resource/orgs/{org_id}")).status_code == 204
+    call_as([org_id])
+    deleted = (await sync(client, token))["deleted"]
+    assert deleted["orgs"] == [org_id] and deleted["apiaries"] == [apiary_id]
+    assert deleted["contacts"] == [contact_id] and deleted["users"] == [user_id]
+    assert deleted["memberships"] == [{"user_id": user_id, "org_id": org_id}]
+
+
+async def test_a_batch_is_sent_as_msgpack_when_asked(client: AsyncClient, rows: Rows) -> None:
+    await rows.org()
+    response = await client.get("/resource/sync", headers={"Accept": MSGPACK_MEDIA_TYPE})
+    assert response.headers["content-type"] == MSGPACK_MEDIA_TYPE and "Accept" in response.headers["vary"]
+    assert len(msgpack.unpackb(response.content)["orgs"]) == 1